@@ -36,6 +36,14 @@
 ## -Fixed bug that was copying and processing entire input DEM when only one input DEM was specified.
 ## -Update method to add Slope and Depth Grid to map so they load with the correct legend.
 ##
+## rev. 10/18/2026
+## -Smoothing, slope and hillshade are computed with the block-tiled NumPy engine in wetland_raster across a process
+##  pool and written once. The 3 meter and smoothed DEMs are kept in the memory workspace instead of SCRATCH.gdb.
+## -The Depth Grid is computed with a tiled Priority-Flood fill that writes the depression depths directly, instead
+##  of Times, Fill, Minus and Con rasters.
+## -Local DEMs are mosaicked by reading only the windows of each DEM under project_AOI_B and resampling them once into
+##  the tempDEM, instead of ExtractByMask copies of every DEM followed by MosaicToNewRaster or CopyRaster.
+##
 ## ===============================================================================================================
 ## ===============================================================================================================    
 def AddMsgAndPrint(msg, severity=0):
@@ -129,6 +137,7 @@ sys.path.append(scriptPath)
 
 import getSSURGO_WCT_ArcGISpro
 reload(getSSURGO_WCT_ArcGISpro)
+import wetland_raster
 
 
 #### Check out Spatial Analyst license
@@ -257,13 +266,11 @@ try:
 
         tempDEM = scratchGDB + os.sep + "tempDEM"
         tempDEM2 = scratchGDB + os.sep + "tempDEM2"
-        DEMagg = scratchGDB + os.sep + "aggDEM"
-        DEMsmooth = scratchGDB + os.sep + "DEMsmooth"
+        DEMagg = "memory" + os.sep + "aggDEM"
+        DEMsmooth = "memory" + os.sep + "DEMsmooth"
+        DEMslope = "memory" + os.sep + "DEMslope"
         ContoursTemp = scratchGDB + os.sep + "ContoursTemp"
         extendedContours = scratchGDB + os.sep + "extendedContours"
-        Temp_DEMbase = scratchGDB + os.sep + "Temp_DEMbase"
-        Fill_DEMaoi = scratchGDB + os.sep + "Fill_DEMaoi"
-        FilMinus = scratchGDB + os.sep + "FilMinus"
 
         # ArcPro Map Layer Names
         contoursOut = "Site_Contours"
@@ -273,7 +280,7 @@ try:
         hillshadeOut = "Site_Hillshade"
 
         # Temp layers list for cleanup at the start and at the end
-        tempLayers = [pcsAOI, tempDEM, tempDEM2, DEMagg, DEMsmooth, ContoursTemp, extendedContours, Temp_DEMbase, Fill_DEMaoi, FilMinus]
+        tempLayers = [pcsAOI, tempDEM, tempDEM2, DEMagg, DEMsmooth, DEMslope, ContoursTemp, extendedContours]
         deleteTempLayers(tempLayers)
 
 
@@ -371,53 +378,16 @@ try:
 ##            AddMsgAndPrint("\tConverting AOI to coordinate system of input DEM...",0)
 ##            arcpy.Project_management(projectAOI_B, pcsAOI, demSR, transform)
         
-        # Clip out the DEMs that were entered
+        # Check the horizontal units of the DEMs that were entered
         AddMsgAndPrint("\tExtracting input DEM(s)...",0)
-        x = 0
         DEMlist = []
-        while x < DEMcount:
-            raster = inputDEMs[x].replace("'", "")
-            desc = arcpy.Describe(raster)
-            raster_path = desc.CatalogPath
-            sr = desc.SpatialReference
-            units = sr.LinearUnitName
-            if units == "Meter":
-                units = "Meters"
-            elif units == "Foot":
-                units = "Feet"
-            elif units == "Foot_US":
-                units = "Feet"
-            else:
+        for raster in inputDEMs:
+            desc = arcpy.Describe(raster.replace("'", ""))
+            units = desc.SpatialReference.LinearUnitName
+            if not units in ["Meter", "Foot", "Foot_US"]:
                 AddMsgAndPrint("\tHorizontal units of one or more input DEMs do not appear to be feet or meters! Exiting...",2)
                 exit()
-            outClip = tempDEM + "_" + str(x)
-            try:
-                #arcpy.Clip_management(raster, "", outClip, projectAOI, "", "ClippingGeometry")
-##                if matchSR == False:
-##                    extractedDEM = arcpy.sa.ExtractByMask(raster_path, pcsAOI)
-##                else:
-##                    extractedDEM = arcpy.sa.ExtractByMask(raster_path, projectAOI_B)
-                extractedDEM = arcpy.sa.ExtractByMask(raster_path, projectAOI_B)
-                extractedDEM.save(outClip)
-            except:
-                AddMsgAndPrint("\tOne or more input DEMs may have a problem! Please verify that the input DEMs cover the tract area and try to run again. Exiting...",2)
-                sys.exit()
-            if x == 0:
-                mosaicInputs = "" + str(outClip) + ""
-            else:
-                mosaicInputs = mosaicInputs + ";" + str(outClip)
-            DEMlist.append(str(outClip))
-            x += 1
-            del sr
-
-        cellsize = 0
-        # Determine largest cell size
-        for raster in DEMlist:
-            desc = arcpy.Describe(raster)
-            sr = desc.SpatialReference
-            cellwidth = desc.MeanCellWidth
-            if cellwidth > cellsize:
-                cellsize = cellwidth
+            DEMlist.append(desc.CatalogPath)
     ##        #Exit if any DEM is greater than 5m cell size
     ##        if units == "Meters":
     ##            if cellsize > 3:
@@ -427,24 +397,17 @@ try:
     ##            if cellsize > 9.84252:
     ##                AddMsgAndPrint("\nOne or more input DEMs has a cell size greater than 3 meters or 9.84252 feet! Please verify input DEM data and try again. Exiting...",2)
     ##                exit()
-            del sr
-            
-        # Merge the DEMs
+
         if DEMcount > 1:
             AddMsgAndPrint("\nMerging multiple input DEM(s)...",0)
-            arcpy.MosaicToNewRaster_management(mosaicInputs, scratchGDB, "tempDEM", "#", "32_BIT_FLOAT", cellsize, "1", "MEAN", "#")
 
-        # Else just convert the one input DEM to become the tempDEM
-        else:
-            AddMsgAndPrint("\nOnly one input DEM detected. Carrying extract forward for final DEM processing...",0)
-            #firstDEM = scratchGDB + os.sep + "tempDEM_0"
-            firstDEM = DEMlist[0]
-            arcpy.CopyRaster_management(firstDEM, tempDEM)
-
-        # Delete clippedDEM files
-        AddMsgAndPrint("\nDeleting initial temp DEM file(s)...",0)
-        for raster in DEMlist:
-            arcpy.Delete_management(raster)
+        # Mosaic the windows of the DEMs under the buffered AOI into the tempDEM at the largest input cell size,
+        # without extracting a copy of each DEM first
+        try:
+            wetland_raster.mosaicWindows(DEMlist, projectAOI_B, tempDEM, cluSR, transform)
+        except:
+            AddMsgAndPrint("\tOne or more input DEMs may have a problem! Please verify that the input DEMs cover the tract area and try to run again. Exiting...",2)
+            sys.exit()
 
 ##        # Convert the input DEM to the target PCS, if necessary
 ##        if matchSR == False:
@@ -496,16 +459,11 @@ try:
         
         #outAggreg = arcpy.sa.Aggregate(tempDEM, smoothing, "MEAN", "TRUNCATE", "DATA")
         #outAggreg.save(DEMagg)
-        AddMsgAndPrint("\tSmoothing the DEM with Focal Statistics...",0)
-        outFocalStats = arcpy.sa.FocalStatistics(DEMagg, "RECTANGLE 3 3 CELL", "MEAN", "DATA")
-        outFocalStats.save(DEMsmooth)
-        AddMsgAndPrint("\tSuccessful",0)
-
-        # Create Slope Layer
+        # Smooth the DEM (3x3 mean) and create the Slope Layer from it in one tiled pass
         # Use Zfactor to get accurate slope creation. Do not assume this Zfactor with contour processing later
-        AddMsgAndPrint("\nCreating Slope...",0)
-        outSlope = arcpy.sa.Slope(DEMsmooth, "PERCENT_RISE", Zfactor)
-        arcpy.Clip_management(outSlope, "", projectSlope, projectAOI, "", "ClippingGeometry")
+        AddMsgAndPrint("\tSmoothing the DEM and creating Slope...",0)
+        wetland_raster.smoothAndSlope(DEMagg, DEMsmooth, DEMslope, Zfactor)
+        arcpy.Clip_management(DEMslope, "", projectSlope, projectAOI, "", "ClippingGeometry")
         AddMsgAndPrint("\tSuccessful",0)
 
 
@@ -572,32 +530,17 @@ try:
 
         #### Create Hillshade and Depth Grid
         AddMsgAndPrint("\nCreating Hillshade...",0)
-        outHillshade = arcpy.sa.Hillshade(projectDEM, "315", "45", "#", Zfactor)
-        outHillshade.save(projectHillshade)
+        wetland_raster.createHillshade(projectDEM, projectHillshade, Zfactor, 315, 45)
         AddMsgAndPrint("\tSuccessful",0)
 
         AddMsgAndPrint("\nCreating Local Depths...",0)
-        fill = False
         try:
-            # Fills sinks in projectDEM to remove small imperfections in the data.
-            # Convert the projectDEM to a raster with z units in feet to create this layer
-            Temp_DEMbase = arcpy.sa.Times(projectDEM, cZfactor)
-            Fill_DEMaoi = arcpy.sa.Fill(Temp_DEMbase, "")
-            fill = True
+            # Fills sinks in projectDEM and writes the depth of every filled pixel to the Depth Grid.
+            # Depths are computed with z units in feet
+            wetland_raster.fillDepths(projectDEM, projectDepths, cZfactor)
+            AddMsgAndPrint("\tSuccessful",0)
         except:
             pass
-        
-        if fill:
-            FilMinus = arcpy.sa.Minus(Fill_DEMaoi, Temp_DEMbase)
-
-            # Create a Depth Grid whereby any pixel with a difference is written to a new raster
-            tempDepths = arcpy.sa.Con(FilMinus, FilMinus, "", "VALUE > 0")
-            tempDepths.save(projectDepths)
-
-            # Delete temp data
-            del tempDepths
-
-            AddMsgAndPrint("\tSuccessful",0)
 
 
         #### Delete temp data
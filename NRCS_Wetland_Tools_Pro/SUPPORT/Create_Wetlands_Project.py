@@ -134,43 +134,23 @@ def queryIntersect(ws,temp_dir,fc,RESTurl,outFC):
     # Run the query
 ##    try:
     
-    # Set variables
-    query_url = RESTurl + "/query"
-    jfile = temp_dir + os.sep + "jsonFile.json"
-    wmas_fc = ws + os.sep + "wmas_fc"
-    wmas_dis = ws + os.sep + "wmas_dis_fc"
-    wmas_sr = arcpy.SpatialReference(3857)
-
-    # Convert the input feature class to Web Mercator and to JSON
-    arcpy.management.Project(fc, wmas_fc, wmas_sr)
-    arcpy.management.Dissolve(wmas_fc, wmas_dis, "", "", "MULTI_PART", "")
-    jsonPolygon = [row[0] for row in arcpy.da.SearchCursor(wmas_dis, ['SHAPE@JSON'])][0]
+    # Project the input to Web Mercator and dissolve it into the query geometry (reused while the input is unchanged)
+    queryGeometry = getQueryGeometry(fc, ws)
 
     # Setup parameters for query
-    params = urllibEncode({'f': 'json',
-                           'geometry':jsonPolygon,
-                           'geometryType':'esriGeometryPolygon',
-                           'spatialRelationship':'esriSpatialRelIntersects',
-                           'returnGeometry':'true',
-                           'outFields':'*',
-                           'token': portalToken['token']})
+    params = {'f': 'json',
+              **queryGeometry,
+              'spatialRelationship':'esriSpatialRelIntersects',
+              'returnGeometry':'true',
+              'outFields':'*'}
 
-
-    INparams = params.encode('ascii')
-    resp = urllib.request.urlopen(query_url,INparams)
-
-    responseStatus = resp.getcode()
-    responseMsg = resp.msg
-    jsonString = resp.read()
+    responseStatus, results = queryFeatures(RESTurl, params, outFC)
 
     if responseStatus > 200:
         AddMsgAndPrint("\nHost Feature Service " + RESTurl + " may be inaccessible or query may be invalid.",1)
         AddMsgAndPrint("\nReturning to mainline functions...",1)
         return False
 
-    # json --> Python; dictionary containing 1 key with a list of lists
-    results = json.loads(jsonString)
-
     # Check for error in results and exit with message if found.
     if 'error' in results.keys():
         if results['error']['message'] == 'Invalid Token':
@@ -182,16 +162,9 @@ def queryIntersect(ws,temp_dir,fc,RESTurl,outFC):
             return False
     else:
         # Convert results to a feature class
-        if not len(results['features']):
+        if not results['count']:
             return False
         else:
-            with open(jfile, 'w') as outfile:
-                json.dump(results, outfile)
-
-            arcpy.conversion.JSONToFeatures(jfile, outFC)
-            arcpy.management.Delete(jfile)
-            arcpy.management.Delete(wmas_fc)
-            arcpy.management.Delete(wmas_dis)
             return outFC
 
 
@@ -208,6 +181,8 @@ sys.path.append(scriptPath)
 
 from extract_CLU_by_Tract import extract_CLU
 from wetland_utils import addLyrxByConnectionProperties, getPortalTokenInfo, importCLUMetadata
+from wetland_features import getQueryGeometry, queryFeatures
+from wetland_http import setPortalToken
 
 
 #### Inputs
@@ -296,6 +271,7 @@ portalToken = getPortalTokenInfo(nrcsPortal)
 if not portalToken:
     arcpy.AddError("Could not generate Portal token! Please login to GeoPortal! Exiting...")
     exit()
+setPortalToken(portalToken)
 
         
 #### Main procedures
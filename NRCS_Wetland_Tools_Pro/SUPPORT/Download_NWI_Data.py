@@ -89,34 +89,17 @@ def queryIntersect(ws,temp_dir,fc,RESTurl,outFC):
 ##  outFC is the output feature class path/name that is return if the function succeeds AND finds data
 ##  Otherwise False is returned
 
-    # Set variables
-    query_url = RESTurl + "/query"
-    jfile = temp_dir + os.sep + "jsonFile.json"
-    wmas_fc = ws + os.sep + "wmas_fc"
-    wmas_dis = ws + os.sep + "wmas_dis_fc"
-    wmas_sr = arcpy.SpatialReference(3857)
-
-    # Convert the input feature class to Web Mercator and to JSON
-    arcpy.management.Project(fc, wmas_fc, wmas_sr)
-    arcpy.management.Dissolve(wmas_fc, wmas_dis, "", "", "MULTI_PART", "")
-    jsonPolygon = [row[0] for row in arcpy.da.SearchCursor(wmas_dis, ['SHAPE@JSON'])][0]
+    # Project the input to Web Mercator and dissolve it into the query geometry (reused while the input is unchanged)
+    queryGeometry = getQueryGeometry(fc, ws)
 
     # Setup parameters for query
-    params = urllibEncode({'f': 'json',
-                           'geometry':jsonPolygon,
-                           'geometryType':'esriGeometryPolygon',
-                           'spatialRelationship':'esriSpatialRelOverlaps',
-                           'returnGeometry':'true',
-                           'outFields':'*'})
+    params = {'f': 'json',
+              **queryGeometry,
+              'spatialRelationship':'esriSpatialRelOverlaps',
+              'returnGeometry':'true',
+              'outFields':'*'}
 
-    INparams = params.encode('ascii')
-    resp = urllib.request.urlopen(query_url,INparams)
-
-    responseStatus = resp.getcode()
-    jsonString = resp.read()
-
-    # json --> Python; dictionary containing 1 key with a list of lists
-    results = json.loads(jsonString)
+    responseStatus, results = queryFeatures(RESTurl, params, outFC, useToken=False)
 
     # Check for error in results and exit with message if found.
     if 'error' in results.keys():
@@ -126,16 +109,9 @@ def queryIntersect(ws,temp_dir,fc,RESTurl,outFC):
             exit()
     else:
         # Convert results to a feature class
-        if not len(results['features']):
+        if not results['count']:
             return False
         else:
-            with open(jfile, 'w') as outfile:
-                json.dump(results, outfile)
-
-            arcpy.conversion.JSONToFeatures(jfile, outFC)
-            arcpy.management.Delete(jfile)
-            arcpy.management.Delete(wmas_fc)
-            arcpy.management.Delete(wmas_dis)
             return outFC
             
 ## ===============================================================================================================
@@ -152,6 +128,8 @@ sys.dont_write_bytecode=True
 scriptPath = os.path.dirname(sys.argv[0])
 sys.path.append(scriptPath)
 
+from wetland_features import getQueryGeometry, queryFeatures
+
 
 #### Update Environments
 arcpy.AddMessage("Setting Environments...\n")
@@ -44,6 +44,10 @@
 ## - Added survey version to the output table (per the getSSURGO_WCT_ArcGISpro tool).
 ## - Changed SSURGO Date output on layout to Survey Area Version, per feedback and policy team
 ##
+## rev. 10/18/2026
+## - Added an optional local SSURGO database (SQLite export) input to build the soils layers offline. It is read from
+##   an optional fourth parameter, which still has to be added to the tool in NRCS_Wetland_Tools_Pro.tbx.
+##
 ## ===============================================================================================================
 ## ===============================================================================================================    
 def AddMsgAndPrint(msg, severity=0):
@@ -155,6 +159,7 @@ try:
     sourceCLU = arcpy.GetParameterAsText(0)
     dataExtent = arcpy.GetParameterAsText(1)
     propertyList = arcpy.GetParameter(2)
+    localSSURGO = arcpy.GetParameterAsText(3) if arcpy.GetArgumentCount() > 3 else ''
 
 
 
@@ -258,9 +263,13 @@ try:
 
 
     #### Call SSURGO download script if it was selected
-    AddMsgAndPrint("\nDownloading soils from SDA......",0)
-    arcpy.SetProgressorLabel("Downloading soils from SDA...")
-    getSSURGO_WCT_ArcGISpro.start(projectAOI, propertyList, basedataGDB_path)
+    if localSSURGO:
+        AddMsgAndPrint("\nBuilding soils from local SSURGO database......",0)
+        arcpy.SetProgressorLabel("Building soils from local SSURGO database...")
+    else:
+        AddMsgAndPrint("\nDownloading soils from SDA......",0)
+        arcpy.SetProgressorLabel("Downloading soils from SDA...")
+    getSSURGO_WCT_ArcGISpro.start(projectAOI, propertyList, basedataGDB_path, localSSURGO or None)
 
     # Update SSURGO version on Soil Map Layout
     AddMsgAndPrint("\nUpdating Survey Version on Soil Map layout...",0)
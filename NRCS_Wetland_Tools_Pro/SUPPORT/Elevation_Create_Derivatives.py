@@ -30,23 +30,39 @@
 ##      -Fixed bug that was copying and processing entire input DEM when only one input DEM was specified.
 ##      -Update method to add Slope and Depth Grid to map so they load with the correct legend.
 ## 
+## rev. 10/18/2026
+## -Smoothing, slope and hillshade are computed with the block-tiled NumPy engine in wetland_raster across a process
+##  pool and written once. The 3 meter and smoothed DEMs are kept in the memory workspace instead of SCRATCH.gdb.
+## -The Depth Grid is computed with a tiled Priority-Flood fill that writes the depression depths directly, instead
+##  of Times, Fill, Minus and Con rasters.
+## -Local DEMs are mosaicked by reading only the windows of each DEM under project_AOI_B and resampling them once into
+##  the tempDEM, instead of ExtractByMask copies of every DEM followed by MosaicToNewRaster or CopyRaster.
+## -The downloaded or mosaicked DEM is cached per user (wetland_dem_cache), keyed by the DEM source, the AOI geometry,
+##  the coordinate systems and the cell size. Re-runs for the same tract only rebuild the derivatives.
+## -Image service DEMs are downloaded as exportImage tiles of the service's maximum image size on parallel requests
+##  and written to disk as GeoTIFFs that are mosaicked into WGS84_DEM (wetland_image_service), instead of one Clip
+##  of the whole extent.
 ##
 ## ===============================================================================================================
 from getpass import getuser
+from http.client import HTTPException
 from os import path
 from sys import argv
 from time import ctime
 
-from arcpy import CheckExtension, CheckOutExtension, Describe, env, Exists, GetParameterAsText, ListDatasets, \
-    ListFields, SetParameterAsText, SetProgressorLabel
+from arcpy import CheckExtension, CheckOutExtension, Describe, env, ExecuteError, Exists, GetParameterAsText, \
+    ListDatasets, ListFields, SetParameterAsText, SetProgressorLabel
 from arcpy.analysis import Buffer, Clip as Clip_a
-from arcpy.management import AddField, CalculateField, Clip, Compact, CopyFeatures, CopyRaster, Delete, DeleteField, \
-    MakeFeatureLayer, MosaicToNewRaster, Project, ProjectRaster, SelectLayerByAttribute
+from arcpy.management import AddField, CalculateField, Clip, Compact, CopyFeatures, Delete, DeleteField, \
+    MakeFeatureLayer, Project, ProjectRaster, SelectLayerByAttribute
 from arcpy.mp import ArcGISProject
 from arcpy.da import Editor
-from arcpy.sa import Con, Contour, ExtractByMask, Fill, FocalStatistics, Hillshade, Minus, Slope, Times
+from arcpy.sa import Contour
 from arcpy.mp import ArcGISProject, LayerFile
 
+from wetland_dem_cache import demCacheKey, readDEMCache, writeDEMCache
+from wetland_image_service import downloadImageService
+from wetland_raster import createHillshade, fillDepths, mosaicWindows, smoothAndSlope
 from wetland_utils import AddMsgAndPrint, deleteTempLayers, errorMsg
 
 
@@ -165,13 +181,11 @@ try:
     WGS84_DEM = path.join(scratchGDB, 'WGS84_DEM')
     tempDEM = path.join(scratchGDB, 'tempDEM')
     tempDEM2 = path.join(scratchGDB, 'tempDEM2')
-    DEMagg = path.join(scratchGDB, 'aggDEM')
-    DEMsmooth = path.join(scratchGDB, 'DEMsmooth')
+    DEMagg = path.join('memory', 'aggDEM')
+    DEMsmooth = path.join('memory', 'DEMsmooth')
+    DEMslope = path.join('memory', 'DEMslope')
     ContoursTemp = path.join(scratchGDB, 'ContoursTemp')
     extendedContours = path.join(scratchGDB, 'extendedContours')
-    Temp_DEMbase = path.join(scratchGDB, 'Temp_DEMbase')
-    Fill_DEMaoi = path.join(scratchGDB, 'Fill_DEMaoi')
-    FilMinus = path.join(scratchGDB, 'FilMinus')
 
     # If NRCS Image Service selected, set path to lyrx file
     if '0.5m' in nrcsService:
@@ -193,7 +207,7 @@ try:
     hillshadeOut = 'Site_Hillshade'
     
     # Temp layers list for cleanup at the start and at the end
-    tempLayers = [pcsAOI, wgs_AOI, WGS84_DEM, tempDEM, tempDEM2, DEMagg, DEMsmooth, ContoursTemp, extendedContours, Temp_DEMbase, Fill_DEMaoi, FilMinus]
+    tempLayers = [pcsAOI, wgs_AOI, WGS84_DEM, tempDEM, tempDEM2, DEMagg, DEMsmooth, DEMslope, ContoursTemp, extendedContours]
     AddMsgAndPrint('Deleting Temp layers...')
     SetProgressorLabel('Deleting Temp layers...')
     deleteTempLayers(tempLayers)
@@ -260,26 +274,43 @@ try:
             AddMsgAndPrint('\nAn output DEM cell size was not specified. Exiting...', 2)
             exit()
         else:
-            AddMsgAndPrint('\nProjecting AOI to match input DEM...')
-            SetProgressorLabel('Projecting AOI to match input DEM...')
-            #wgs_CS = SpatialReference(4326)  # WGS 1984 Geographic
-            #wgs_CS = SpatialReference(3857)   # Web Mercator Auxilliary Sphere
-            wgs_CS = demSR
-            Project(projectAOI_B, wgs_AOI, wgs_CS)
+            # Reuse the DEM downloaded by a previous run with the same service, AOI, coordinate systems and cell size
+            demKey = demCacheKey(sourceService, projectAOI_B, f"{demSR};{cluSR}", sourceCellsize)
+            if readDEMCache(demKey, tempDEM):
+                AddMsgAndPrint('\nUsing the DEM downloaded by a previous run for this extent...')
+            else:
+                AddMsgAndPrint('\nProjecting AOI to match input DEM...')
+                SetProgressorLabel('Projecting AOI to match input DEM...')
+                #wgs_CS = SpatialReference(4326)  # WGS 1984 Geographic
+                #wgs_CS = SpatialReference(3857)   # Web Mercator Auxilliary Sphere
+                wgs_CS = demSR
+                Project(projectAOI_B, wgs_AOI, wgs_CS)
             
-            AddMsgAndPrint('\nDownloading DEM data...')
-            SetProgressorLabel('Downloading DEM data...')
-            aoi_ext = Describe(wgs_AOI).extent
-            xMin = aoi_ext.XMin
-            yMin = aoi_ext.YMin
-            xMax = aoi_ext.XMax
-            yMax = aoi_ext.YMax
-            clip_ext = f"{str(xMin)} {str(yMin)} {str(xMax)} {str(yMax)}"
-            Clip(sourceService, clip_ext, WGS84_DEM, '', '', '', 'NO_MAINTAIN_EXTENT')
-
-            AddMsgAndPrint('\nProjecting downloaded DEM...')
-            SetProgressorLabel('Projecting downloaded DEM...')
-            ProjectRaster(WGS84_DEM, tempDEM, cluSR, 'BILINEAR', sourceCellsize)
+                AddMsgAndPrint('\nDownloading DEM data...')
+                SetProgressorLabel('Downloading DEM data...')
+                aoi_ext = Describe(wgs_AOI).extent
+                xMin = aoi_ext.XMin
+                yMin = aoi_ext.YMin
+                xMax = aoi_ext.XMax
+                yMax = aoi_ext.YMax
+                clip_ext = f"{str(xMin)} {str(yMin)} {str(xMax)} {str(yMax)}"
+
+                # Download the extent as parallel anonymous exportImage tiles. The Bare Earth services are public, and
+                # the portal token is never sent to other hosts. Fall back to a single Clip of the service if the tiled
+                # download fails.
+                try:
+                    downloadImageService(sourceService, wgs_AOI, WGS84_DEM)
+                except (OSError, HTTPException, RuntimeError, ValueError, ExecuteError) as e:
+                    AddMsgAndPrint(f'\tTiled download from the image service failed ({e}). Downloading the extent in one request...', 1)
+                    if Exists(WGS84_DEM):
+                        Delete(WGS84_DEM)
+                    Clip(sourceService, clip_ext, WGS84_DEM, '', '', '', 'NO_MAINTAIN_EXTENT')
+
+                AddMsgAndPrint('\nProjecting downloaded DEM...')
+                SetProgressorLabel('Projecting downloaded DEM...')
+                ProjectRaster(WGS84_DEM, tempDEM, cluSR, 'BILINEAR', sourceCellsize)
+                if not writeDEMCache(demKey, tempDEM):
+                    AddMsgAndPrint('\tThe DEM could not be saved to the DEM cache. Continuing...', 1)
 
     # Else, extract the local file DEMs
     else:
@@ -290,68 +321,36 @@ try:
         else:
             env.geographicTransformations = 'WGS_1984_(ITRF00)_To_NAD_1983'
         
-        # Clip out the DEMs that were entered
+        # Check the horizontal units of the DEMs that were entered
         AddMsgAndPrint('\tExtracting input DEM(s)...')
         SetProgressorLabel('Extracting input DEM(s)...')
-        x = 0
         DEMlist = []
-        while x < DEMcount:
-            raster = inputDEMs[x].replace("'", '')
-            desc = Describe(raster)
-            raster_path = desc.CatalogPath
-            sr = desc.SpatialReference
-            units = sr.LinearUnitName
-            if units == 'Meter':
-                units = 'Meters'
-            elif units == 'Foot':
-                units = 'Feet'
-            elif units == 'Foot_US':
-                units = 'Feet'
-            else:
+        for raster in inputDEMs:
+            desc = Describe(raster.replace("'", ''))
+            units = desc.SpatialReference.LinearUnitName
+            if units not in ['Meter', 'Foot', 'Foot_US']:
                 AddMsgAndPrint('\nHorizontal units of one or more input DEMs do not appear to be feet or meters! Exiting...', 2)
                 exit()
-            outClip = f"{tempDEM}_{str(x)}"
+            DEMlist.append(desc.CatalogPath)
+
+        # Reuse the DEM mosaicked by a previous run from the same DEM files, AOI and coordinate system
+        demKey = demCacheKey(DEMlist, projectAOI_B, f"{cluSR};{env.geographicTransformations}")
+        if readDEMCache(demKey, tempDEM):
+            AddMsgAndPrint('\nUsing the DEM mosaicked by a previous run for this extent...')
+        else:
+            if DEMcount > 1:
+                AddMsgAndPrint('\nMerging multiple input DEM(s)...')
+                SetProgressorLabel('Merging multiple input DEM(s)...')
+
+            # Mosaic the windows of the DEMs under the buffered AOI into the tempDEM at the largest input cell size,
+            # without extracting a copy of each DEM first
             try:
-                extractedDEM = ExtractByMask(raster_path, projectAOI_B)
-                extractedDEM.save(outClip)
+                mosaicWindows(DEMlist, projectAOI_B, tempDEM, cluSR, env.geographicTransformations)
             except:
                 AddMsgAndPrint('\nOne or more input DEMs may have a problem! Please verify that the input DEMs cover the tract area and try to run again. Exiting...', 2)
                 exit()
-            if x == 0:
-                mosaicInputs = str(outClip)
-            else:
-                mosaicInputs = f"{mosaicInputs};{str(outClip)}"
-            DEMlist.append(str(outClip))
-            x += 1
-            del sr
-
-        cellsize = 0
-        # Determine largest cell size
-        for raster in DEMlist:
-            desc = Describe(raster)
-            sr = desc.SpatialReference
-            cellwidth = desc.MeanCellWidth
-            if cellwidth > cellsize:
-                cellsize = cellwidth
-            del sr
-
-        # Merge the DEMs
-        if DEMcount > 1:
-            AddMsgAndPrint('\nMerging multiple input DEM(s)...')
-            SetProgressorLabel('Merging multiple input DEM(s)...')
-            MosaicToNewRaster(mosaicInputs, scratchGDB, 'tempDEM', '#', '32_BIT_FLOAT', cellsize, '1', 'MEAN', '#')
-
-        # Else just convert the one input DEM to become the tempDEM
-        else:
-            AddMsgAndPrint('\nOnly one input DEM detected. Carrying extract forward for final DEM processing...')
-            firstDEM = DEMlist[0]
-            CopyRaster(firstDEM, tempDEM)
-
-        # Delete clippedDEM files
-        AddMsgAndPrint('\nDeleting temp DEM file(s)...')
-        SetProgressorLabel('Deleting temp DEM file(s)...')
-        for raster in DEMlist:
-            Delete(raster)
+            if not writeDEMCache(demKey, tempDEM):
+                AddMsgAndPrint('\tThe DEM could not be saved to the DEM cache. Continuing...', 1)
         
     # Gather info on the final temp DEM
     desc = Describe(tempDEM)
@@ -394,18 +393,12 @@ try:
     SetProgressorLabel('Creating 3-meter resolution DEM...')
     ProjectRaster(tempDEM, DEMagg, cluSR, 'BILINEAR', '3', '#', '#', '#')
 
-    AddMsgAndPrint('\tSmoothing the DEM with Focal Statistics...')
-    SetProgressorLabel('Smoothing DEM with Focal Stats...')
-    outFocalStats = FocalStatistics(DEMagg, 'RECTANGLE 3 3 CELL', 'MEAN', 'DATA')
-    outFocalStats.save(DEMsmooth)
-    AddMsgAndPrint('\tSuccessful')
-
-    # Create Slope Layer
+    # Smooth the DEM (3x3 mean) and create the Slope Layer from it in one tiled pass
     # Use Zfactor to get accurate slope creation. Do not assume this Zfactor with contour processing later
-    AddMsgAndPrint('\nCreating Slope...')
-    SetProgressorLabel('Creating Slope...')
-    outSlope = Slope(DEMsmooth, 'PERCENT_RISE', Zfactor)
-    Clip(outSlope, '', projectSlope, projectAOI, '', 'ClippingGeometry')
+    AddMsgAndPrint('\tSmoothing the DEM and creating Slope...')
+    SetProgressorLabel('Smoothing DEM and creating Slope...')
+    smoothAndSlope(DEMagg, DEMsmooth, DEMslope, Zfactor)
+    Clip(DEMslope, '', projectSlope, projectAOI, '', 'ClippingGeometry')
     AddMsgAndPrint('\tSuccessful')
 
     #### Create contours
@@ -471,34 +464,19 @@ try:
     #### Create Hillshade and Depth Grid
     AddMsgAndPrint('\nCreating Hillshade...')
     SetProgressorLabel('Creating Hillshade...')
-    outHillshade = Hillshade(projectDEM, '315', '45', '#', Zfactor)
-    outHillshade.save(projectHillshade)
+    createHillshade(projectDEM, projectHillshade, Zfactor, 315, 45)
     AddMsgAndPrint('\tSuccessful')
 
     if depthGrid == 'true':
         AddMsgAndPrint('\nCreating Depth Grid...')
         SetProgressorLabel('Creating Depth Grid...')
-        fill = False
         try:
-            # Fills sinks in projectDEM to remove small imperfections in the data.
-            # Convert the projectDEM to a raster with z units in feet to create this layer
-            Temp_DEMbase = Times(projectDEM, cZfactor)
-            Fill_DEMaoi = Fill(Temp_DEMbase, '')
-            fill = True
+            # Fills sinks in projectDEM and writes the depth of every filled pixel to the Depth Grid.
+            # Depths are computed with z units in feet
+            fillDepths(projectDEM, projectDepths, cZfactor)
+            AddMsgAndPrint('\tSuccessful')
         except:
             pass
-        
-        if fill:
-            FilMinus = Minus(Fill_DEMaoi, Temp_DEMbase)
-
-            # Create a Depth Grid whereby any pixel with a difference is written to a new raster
-            tempDepths = Con(FilMinus, FilMinus, '', 'VALUE > 0')
-            tempDepths.save(projectDepths)
-
-            # Delete temp data
-            del tempDepths
-
-            AddMsgAndPrint('\tSuccessful')
 
 
     #### Delete temp data
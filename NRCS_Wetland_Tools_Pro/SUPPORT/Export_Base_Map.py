@@ -108,32 +108,9 @@ def logBasicSettings():
     f.close
     del f
 
-## ===============================================================================================================
-def submitFSquery(url,INparams):
-    INparams = INparams.encode('ascii')
-    resp = urllib.request.urlopen(url,INparams)
-    
-    responseStatus = resp.getcode()
-    responseMsg = resp.msg
-    jsonString = resp.read()
-    results = json.loads(jsonString)
-
-    if 'error' in results.keys():
-        AddMsgAndPrint("\tPLSS Query failed.",0)
-        return False
-
-    else:
-        return results
-
 ## ===============================================================================================================
 def getPLSS(plss_point):
 
-    # URLs for Section/Township/Range services
-    tr_svc = 'https://gis.sc.egov.usda.gov/appserver/rest/services/cadastral/plss/MapServer/0/query'   # Town and Range
-    sec_svc = 'https://gis.sc.egov.usda.gov/appserver/rest/services/cadastral/plss/MapServer/1/query'  # Sections
-
-    trs_text = ''
-    
     # If the plssPoint input is not a point, exit
     AddMsgAndPrint("\tChecking input PLSS reference point...",0)
     plssDesc = arcpy.Describe(plss_point)
@@ -158,68 +135,13 @@ def getPLSS(plss_point):
     # The input is a single point. Continue.
     AddMsgAndPrint("\tInput PLSS location reference is a single point. Using point to query PLSS services...",0)
 
-    # Get the x,y of the input point
-    jsonPoint = [row[0] for row in arcpy.da.SearchCursor(plss_fc, ['SHAPE@JSON'])][0]
-
-    # Set input parameters for a query to get a count of results
-    params = urllibEncode({'f': 'json',
-                           'geometry':jsonPoint,
-                           'geometryType':'esriGeometryPoint',
-                           'returnCountOnly':'true'})
-    
-    # Run and check the count query
-    AddMsgAndPrint("\tQuerying Township and Range Layer...",0)
-    mer_txt = ''
-    countQuery = submitFSquery(tr_svc,params)
-    if countQuery:
-        returned_records = countQuery['count']
-        if returned_records > 0:
-            # Run actual query for the town and range fields
-            params = urllibEncode({'f': 'json',
-                           'geometry':jsonPoint,
-                           'geometryType':'esriGeometryPoint',
-                           'returnGeometry':'false',
-                           'outFields':'PRINMER,TWNSHPNO,TWNSHPDIR,RANGENO,RANGEDIR'})
-            trQuery = submitFSquery(tr_svc,params)
-
-            # Read the results
-            rdict = trQuery['features'][0]
-            adict = rdict['attributes']
-            mer_txt = adict["PRINMER"]
-            town_no = int(adict["TWNSHPNO"])
-            town_dir = adict["TWNSHPDIR"]
-            range_no = int(adict["RANGENO"])
-            range_dir = adict["RANGEDIR"]
-
-            # Check the results
-            if len(mer_txt) > 0 and town_no > 0 and range_no > 0:
-                # Query count the sections service
-                params = urllibEncode({'f': 'json',
-                           'geometry':jsonPoint,
-                           'geometryType':'esriGeometryPoint',
-                           'returnCountOnly':'true'})
-                # Run and check the count query
-                AddMsgAndPrint("\tQuerying Sections Layer...",0)
-                countQuery = submitFSquery(sec_svc,params)
-                if countQuery:
-                    returned_records = countQuery['count']
-                    if returned_records > 0:
-                        # Run actual query for the section field
-                        params = urllibEncode({'f': 'json',
-                                   'geometry':jsonPoint,
-                                   'geometryType':'esriGeometryPoint',
-                                   'returnGeometry':'false',
-                                   'outFields':'FRSTDIVNO'})
-                        secQuery = submitFSquery(sec_svc,params)
-
-                        #Read the results
-                        rdict = secQuery['features'][0]
-                        adict = rdict['attributes']
-                        section_no = int(adict["FRSTDIVNO"])
-
-                        # Check the results
-                        if section_no > 0:
-                            trs_text = "Location: T" + str(town_no) + town_dir + ", R" + str(range_no) + range_dir + ", Sec " + str(section_no) + "\n" + mer_txt 
+    # Get the input point and look up its location, from the local PLSS cache when it was looked up recently
+    point = [row[0] for row in arcpy.da.SearchCursor(plss_fc, ['SHAPE@'])][0]
+    AddMsgAndPrint("\tQuerying Township and Range and Sections Layers...",0)
+    trs_text = lookupPLSS(point)
+    if trs_text is None:
+        AddMsgAndPrint("\tPLSS Query failed.",0)
+        trs_text = ''
     return trs_text
 
 ## ================================================================================================================
@@ -363,6 +285,12 @@ from urllib.error import HTTPError as httpErrors
 urllibEncode = urllib.parse.urlencode
 parseQueryString = urllib.parse.parse_qsl
 
+sys.dont_write_bytecode=True
+scriptPath = os.path.dirname(sys.argv[0])
+sys.path.append(scriptPath)
+
+from wetland_plss import lookupPLSS
+
 
 #### Update Environments
 arcpy.AddMessage("Setting Environments...\n")
@@ -39,6 +39,14 @@
 ## - Replaced intersects with overlaps in query function.
 ## - Created advanced logic for polygon and point replacement in the update_polys function
 ##
+## rev. 10/18/2026
+## - Replaced per layer Append and field mappings with staged edits sent as one applyEdits request per service
+## - Staged the purge of the current job as object ID deletes in each service's applyEdits request, so a service that
+##   fails to upload rolls back its purge along with its adds. Services are sent separately, so a failure can still
+##   leave other services updated. Re-running the upload purges and re-sends the job on every layer.
+## - Removed local_temp (*_Server) recovery, which the staged purge replaces
+## - Added change detection against an upload manifest in the project _WC.gdb to send only inserts, updates and deletes
+##
 ## ===============================================================================================================
 ## ===============================================================================================================    
 def AddMsgAndPrint(msg, severity=0):
@@ -111,21 +119,12 @@ def queryCount(sqlQuery, RESTurl):
 ##    try:
     query_url = RESTurl + "/query"
 
-    params = urllibEncode({'where':sqlQuery,
-                           'returnCountOnly':'true',
-                           'token': portalToken['token']})
-
-    INparams = params.encode('ascii')
-    
-    resp = urllib.request.urlopen(query_url,INparams)
+    params = {'f': 'json',
+              'where':sqlQuery,
+              'returnCountOnly':'true'}
 
-    responseStatus = resp.getcode()
-    responseMsg = resp.msg
-    jsonString = resp.read()
+    responseStatus, results = postForm(query_url, params, idempotent=True)
     
-    # json --> Python; dictionary containing 1 key with a list of lists
-    results = json.loads(jsonString)
-
     # Check for error in results and exit with message if found.
     if 'error' in results.keys():
         if results['error']['message'] == 'Invalid Token':
@@ -150,30 +149,42 @@ def queryCount(sqlQuery, RESTurl):
 ##            return False
 
 ## ===============================================================================================================
-def del_by_attributes(sqlQuery, RESTurl):
-## This function deletes features via the REST API with an SQL Query
-## The delete results are grouped whereby if any delete fails, the function exits the script with an error message
-## If the deletes are successful, the function returns a status of True
-
-##    try:
-    delete_url = RESTurl + "/deleteFeatures"
+def stage_purge_all(edits, sqlQuery, RESTurls):
+## This function stages the features matching an SQL Query in several hosted layers as object ID deletes
+## The object IDs are queried concurrently on a bounded thread pool. Nothing is deleted until apply_edits sends the
+## deletes in the same applyEdits request as the adds of each service, so a failed upload rolls the purge back.
+## Any error exits the script with an error message, otherwise it returns a status of True
+
+    queries = [(RESTurl, {'where': sqlQuery}) for RESTurl in RESTurls]
+    for RESTurl, (responseStatus, results) in zip(RESTurls, queryObjectIdsConcurrent(queries)):
+        # Check for error in results and exit with message if found.
+        if 'error' in results.keys():
+            if results['error']['message'] == 'Invalid Token':
+                AddMsgAndPrint("\nSign-in token expired. Sign-out and sign-in to the portal again and then re-run. Exiting...",2)
+                exit()
+            else:
+                AddMsgAndPrint("\nUnknown error encountered. Make sure you are online and signed in and that the portal is online. Exiting...",2)
+                AddMsgAndPrint("\nResponse status code: " + str(responseStatus),2)
+                exit()
+        stage_edits(edits, RESTurl, [], results['objectIds'])
+    return True
 
-    params = urllibEncode({'f': 'json',
-                           'where': sqlQuery,
-                           'rollbackOnFailure': 'true',
-                           'returnDeleteResults': 'false',
-                           'token': portalToken['token']})
+## ===============================================================================================================
+def ids_by_intersect(ws, fc, RESTurl, where='1=1'):
+## This function uses the REST API to get the object IDs of hosted features that intersect an input feature class
+## The IDs are staged as deletes for the applyEdits request that replaces the overlapped features
+## where is an optional SQL query to limit the features, such as excluding the features of the current job
+## Any error exits the script with an error message, otherwise the list of object IDs is returned (may be empty)
 
-    INparams = params.encode('ascii')
+    # Project the input to Web Mercator and dissolve it into the query geometry (reused while the input is unchanged)
+    queryGeometry = getQueryGeometry(fc, ws)
 
-    resp = urllib.request.urlopen(delete_url,INparams)
-    
-    responseStatus = resp.getcode()
-    responseMsg = resp.msg
-    jsonString = resp.read()
+    # Setup parameters for the object ID query
+    params = {'where':where,
+              **queryGeometry,
+              'spatialRelationship':'esriSpatialRelIntersects'}
 
-    # json --> Python; dictionary containing 1 key with a list of lists
-    results = json.loads(jsonString)
+    responseStatus, results = queryObjectIds(RESTurl, params)
 
     # Check for error in results and exit with message if found.
     if 'error' in results.keys():
@@ -185,71 +196,33 @@ def del_by_attributes(sqlQuery, RESTurl):
             AddMsgAndPrint("\nResponse status code: " + str(responseStatus),2)
             exit()
 
-    elif 'false' in results.values():
-        AddMsgAndPrint("\nFeatures found but one or more features could not be deleted for replacement. Confirm your write access. Exiting...",2)
-        exit()
-
-    else:
-        return True
-    
-##    else:
-##        if 'true' in results.values():
-##            AddMsgAndPrint("\nNo existing features were found to delete!",0)
-##        else:
-##            AddMsgAndPrint("\nFeatures were found to be deleted and replaced!",0)
-##        return True
-        
-##    except httpErrors as e:
-##        if int(e.code) >= 400:
-##            AddMsgAndPrint("\nUnknown error encountered. Exiting...",2)
-##            AddMsgAndPrint("\nHTTP Error = " + str(e.code),2)
-##            errorMsg()
-##            exit()
-##        else:
-##            errorMsg()
-##            return False
+    return results['objectIds']
 
 ## ===============================================================================================================
-def del_by_intersect(ws, temp_dir, fc, RESTurl):
-## This function deletes features via the REST API with a spatial overlap
-## This is only called if intersecting features are known to exist using the returned shapes from queryIntersect
-## If the deletes are successful, the function returns a status of True, otherwise it gives an error and is false
-
-##    try:
-    # Set variables
-    delete_url = RESTurl + "/deleteFeatures"
-    wmas_fc = ws + os.sep + "wmas_fc"
-    wmas_dis = ws + os.sep + "wmas_dis_fc"
-    wmas_sr = arcpy.SpatialReference(3857)
+def stage_edits(edits, RESTurl, fcs=[], deletes=[]):
+## This function stages local feature classes as adds and server object IDs as deletes for a hosted layer
+## Nothing is sent to the server here. All staged edits are sent together by apply_edits at the end of the tool
+## Field names are matched between the local and hosted layers, so no field mapping is needed
 
-    # Convert the input feature class to Web Mercator and to JSON
-    arcpy.management.Project(fc, wmas_fc, wmas_sr)
-    arcpy.management.Dissolve(wmas_fc, wmas_dis, "", "", "MULTI_PART", "")
-    jsonPolygon = [row[0] for row in arcpy.da.SearchCursor(wmas_dis, ['SHAPE@JSON'])][0]
+    results = addLayerEdits(edits, RESTurl, fcs, deletes)
 
-    #Logic types for spatial relationship for testing:
-    #'spatialRelationship':'esriSpatialRelOverlaps',
-    #'spatialRelationship':'esriSpatialRelIntersects',
-    
-    # Setup parameters for deletion
-    params = urllibEncode({'f': 'json',
-                           'geometry':jsonPolygon,
-                           'geometryType':'esriGeometryPolygon',
-                           'spatialRelationship':'esriSpatialRelIntersects',
-                           'rollbackOnFailure':'true',
-                           'returnDeleteResults':'false',
-                           'token': portalToken['token']})
-
-    INparams = params.encode('ascii')
-
-    resp = urllib.request.urlopen(delete_url,INparams)
+    # Check for error in results and exit with message if found.
+    if 'error' in results.keys():
+        if results['error']['message'] == 'Invalid Token':
+            AddMsgAndPrint("\nSign-in token expired. Sign-out and sign-in to the portal again and then re-run. Exiting...",2)
+            exit()
+        else:
+            AddMsgAndPrint("\nUnknown error encountered reading " + RESTurl + ". Make sure you are online and signed in and that the portal is online. Exiting...",2)
+            exit()
+    return True
 
-    responseStatus = resp.getcode()
-    responseMsg = resp.msg
-    jsonString = resp.read()
+## ===============================================================================================================
+def stage_features(edits, RESTurl, fc):
+## This function stages the features of a project layer for a hosted layer and tracks them in the upload manifest
+## If the layer has a verified manifest from the last upload of this job (global manifests), only the features that
+## were added, changed or removed since then are staged. Otherwise every feature is staged as an add.
 
-    # json --> Python; dictionary containing 1 key with a list of lists
-    results = json.loads(jsonString)
+    results = addLayerFeatures(edits, RESTurl, fc, manifests.get(RESTurl))
 
     # Check for error in results and exit with message if found.
     if 'error' in results.keys():
@@ -257,83 +230,83 @@ def del_by_intersect(ws, temp_dir, fc, RESTurl):
             AddMsgAndPrint("\nSign-in token expired. Sign-out and sign-in to the portal again and then re-run. Exiting...",2)
             exit()
         else:
-            AddMsgAndPrint("\nUnknown error encountered. Make sure you are online and signed in and that the portal is online. Exiting...",2)
-            AddMsgAndPrint("\nResponse status code: " + str(responseStatus),2)
+            AddMsgAndPrint("\nUnknown error encountered reading " + RESTurl + ". Make sure you are online and signed in and that the portal is online. Exiting...",2)
             exit()
+    return True
 
-    elif 'false' in results.values():
-        AddMsgAndPrint("\nFeatures found but one or more features could not be deleted for replacement. Confirm your write access. Exiting...",2)
-        exit()
+## ===============================================================================================================
+def load_manifests(table, job_id, RESTurls):
+## This function reads the upload manifest of the job from the last successful upload and verifies each layer's entry
+## A layer's manifest is only used if the server still holds exactly the features recorded for this job. Layers that
+## don't match (edited elsewhere, failed upload, first upload) are left out and get the full purge and re-upload.
+
+    verified = {}
+    stored = readManifest(table, job_id)
+    for RESTurl in RESTurls:
+        if RESTurl in stored:
+            responseStatus, results = queryObjectIds(RESTurl, {'where': "job_id = '" + job_id + "'"})
+            if 'error' not in results.keys():
+                if set(results['objectIds']) == set(oid for feature_hash, oid in stored[RESTurl].values()):
+                    verified[RESTurl] = stored[RESTurl]
+    return verified
 
-    else:
-        return True
-    
-##    else:
-##        if 'true' in results.values():
-##            AddMsgAndPrint("\nNo existing features were found to delete!",0)
-##        else:
-##            AddMsgAndPrint("\nFeatures were found to delete and replace!",0)
-##        return True
-        
-##    except httpErrors as e:
-##        if int(e.code) >= 400:
-##            AddMsgAndPrint("\nUnknown error encountered. Exiting...",2)
-##            AddMsgAndPrint("\nHTTP Error = " + str(e.code),2)
-##            errorMsg()
-##            exit()
-##        else:
-##            errorMsg()
-##            return False
+## ===============================================================================================================
+def apply_edits(edits):
+## This function sends all staged edits as one applyEdits request per feature service, with rollbackOnFailure
+## Each service either takes all of its adds, job purge and overlap deletes or none of them, so a failed service keeps
+## its previous features. Any failure exits the script with an error message.
+## On success, the results are returned to build the upload manifest.
+
+    responses = applyEdits(edits)
+    for service_url, responseStatus, results in responses:
+        # Check for error in results and exit with message if found.
+        if 'error' in results:
+            if results['error']['message'] == 'Invalid Token':
+                AddMsgAndPrint("\nSign-in token expired. Sign-out and sign-in to the portal again and then re-run. Exiting...",2)
+                exit()
+            else:
+                AddMsgAndPrint("\nUpload to " + service_url + " failed and was rolled back. Make sure you are online and signed in and that the portal is online. Exiting...",2)
+                AddMsgAndPrint("\nResponse status code: " + str(responseStatus),2)
+                exit()
+
+        for layer_results in results:
+            for edit_result in layer_results.get('addResults', []) + layer_results.get('updateResults', []) + layer_results.get('deleteResults', []):
+                if not edit_result['success']:
+                    AddMsgAndPrint("\nOne or more features could not be uploaded to " + service_url + ". Confirm your write access. Exiting...",2)
+                    exit()
+    return responses
 
 ##  ===============================================================================================================
-def queryIntersect(ws, temp_dir, fc, RESTurl, outFC):
+def queryIntersect(ws, temp_dir, fc, RESTurl, outFC, where='1=1'):
 ##  This function uses a REST API query to retrieve geometry from that overlap an input feature class from a
 ##  hosted feature service.
 ##  Relies on a global variable of portalToken to exist and be active (checked before running this function)
 ##  ws is a file geodatabase workspace to store temp files for processing
 ##  fc is the input feature class. Should be a polygon feature class, but technically shouldn't fail if other types
 ##  RESTurl is the url for the query where the target hosted data resides
-##  outFC is the output feature class path/name that is return if the function succeeds AND finds data
-##  Otherwise False is returned
+##  where is an optional SQL query to limit the features returned
+##  outFC is the output feature class path/name that is return if the function succeeds AND finds data, along with the
+##  server object IDs of the returned features. Otherwise False and an empty list are returned
 
     # Run the query
 ##    try:
         
-    # Set variables
-    query_url = RESTurl + "/query"
-    jfile = temp_dir + os.sep + "jsonFile.json"
-    wmas_fc = ws + os.sep + "wmas_fc"
-    wmas_dis = ws + os.sep + "wmas_dis_fc"
-    wmas_sr = arcpy.SpatialReference(3857)
-
-    # Convert the input feature class to Web Mercator and to JSON
-    arcpy.management.Project(fc, wmas_fc, wmas_sr)
-    arcpy.management.Dissolve(wmas_fc, wmas_dis, "", "", "MULTI_PART", "")
-    jsonPolygon = [row[0] for row in arcpy.da.SearchCursor(wmas_dis, ['SHAPE@JSON'])][0]
+    # Project the input to Web Mercator and dissolve it into the query geometry (reused while the input is unchanged)
+    queryGeometry = getQueryGeometry(fc, ws)
 
     #Logic types for spatial relationship for testing:
     #'spatialRelationship':'esriSpatialRelOverlaps',
     #'spatialRelationship':'esriSpatialRelIntersects',
     
     # Setup parameters for query
-    params = urllibEncode({'f': 'json',
-                           'geometry':jsonPolygon,
-                           'geometryType':'esriGeometryPolygon',
-                           'spatialRelationship':'esriSpatialRelIntersects',
-                           'returnGeometry':'true',
-                           'outFields':'*',
-                           'token': portalToken['token']})
-
-
-    INparams = params.encode('ascii')
-    resp = urllib.request.urlopen(query_url,INparams)
+    params = {'f': 'json',
+              'where':where,
+              **queryGeometry,
+              'spatialRelationship':'esriSpatialRelIntersects',
+              'returnGeometry':'true',
+              'outFields':'*'}
 
-    responseStatus = resp.getcode()
-    responseMsg = resp.msg
-    jsonString = resp.read()
-
-    # json --> Python; dictionary containing 1 key with a list of lists
-    results = json.loads(jsonString)
+    responseStatus, results = queryFeatures(RESTurl, params, outFC)
 
     # Check for error in results and exit with message if found.
     if 'error' in results.keys():
@@ -346,19 +319,10 @@ def queryIntersect(ws, temp_dir, fc, RESTurl, outFC):
             exit()
     else:
         # Convert results to a feature class
-        if not len(results['features']):
-            return False
+        if not results['count']:
+            return False, []
         else:
-            with open(jfile, 'w') as outfile:
-                json.dump(results, outfile)
-
-            arcpy.conversion.JSONToFeatures(jfile, outFC)
-            # Cleanup temp stuff from this function
-            files_to_del = [jfile, wmas_fc, wmas_dis]
-            for item in files_to_del:
-                if arcpy.Exists(item):
-                    arcpy.management.Delete(item)
-            return outFC
+            return outFC, results['objectIds']
 
 ##    except httpErrors as e:
 ##        if int(e.code) >= 400:
@@ -371,57 +335,24 @@ def queryIntersect(ws, temp_dir, fc, RESTurl, outFC):
 ##            return False
 
 ## ===============================================================================================================
-def update_polys_and_points(up_ws, up_temp_dir, proj_fc, up_RESTurl, local_temp, proj_pts = '', ptsURL = '', fldmapping=''):
-## Queries polygon layer for intersects. If none found, appends proceed.
+def update_polys_and_points(up_ws, up_temp_dir, proj_fc, up_RESTurl, edits, proj_pts = '', ptsURL = ''):
+## Queries polygon layer for intersects. If none found, the new features are staged as adds.
 ## If intersection is found, query returns the geometry for local processing to split the old areas from the new.
-## Once local processing is complete the two pieces are put through Delete intersect and then re-uploaded.
+## The overlapped server features are staged as deletes, and the remnant and new features as adds, so the replacement
+## is applied by apply_edits in a single transaction.
+## Only features of other jobs are considered for overlaps. The current job's own features are synced by stage_features.
 ## If the related pts and ptsURL variables are populated, the remnant poly data is used to check and move points
 ## as needed to maintain points. This effectively moves the existing points, if they are not completely
 ## overwritten, into the remnant poly areas.
     
-##    try:
     # set variables
     int_fc = up_ws + os.sep + "int_fc"
     test_fc = up_ws + os.sep + "test_fc"
     pts_temp = up_ws + os.sep + "pts_temp"
 
-    # Manage the local_temp file in case of previous run of tool that had an error or crashed
-    if arcpy.Exists(local_temp):
-        # Query local temp against the server to see if data is still there. If nothing returned,
-        # then append the local temp to the server to restore "deleted" features
-        overlapCheck = queryIntersect(up_ws, up_temp_dir, local_temp, up_RESTurl, int_fc)
-        if arcpy.Exists(int_fc):
-            # Do another intersect to see if there is actual overlap and not just coincident edges
-            arcpy.analysis.Intersect([local_temp,overlapCheck], test_fc, "NO_FID", "#", "INPUT")
-            if int(arcpy.GetCount_management(test_fc).getOutput(0)) == 0:
-                # Features were lost from the server. Restore the local_temp onto the server without the field mapping setting (not needed)
-                # Then delete local temps
-                arcpy.management.Append(local_temp, up_RESTurl, "NO_TEST")
-                # Also handle proj_pts again to make sure they remain restored on the server if necessary
-                if proj_pts != '':
-                    # Convert local temp to points
-                    arcpy.management.FeatureToPoint(local_temp, pts_temp, "INSIDE")
-                    # Delete server points
-                    del_by_intersect(up_ws, up_temp_dir, local_temp, ptsURL)
-                    # Append updated server points
-                    arcpy.management.Append(pts_temp, ptsURL, "NO_TEST", fldmapping)
-                    arcpy.management.Delete(pts_temp)
-                    arcpy.management.Delete(test_fc)
-                arcpy.management.Delete(local_temp)
-                arcpy.management.Delete(test_fc)
-                arcpy.management.Delete(int_fc)
-            else:
-                # Server features take precedence. Delete local_temp. It will be re-created, if needed, in the next step.
-                arcpy.management.Delete(local_temp)
-                arcpy.management.Delete(test_fc)
-                arcpy.management.Delete(int_fc)
-        else:
-            # Server features take precedence. Delete local_temp. It will be re-created, if needed, in the next step.
-            arcpy.management.Delete(local_temp)
-            
     # Check whether the input project area data overlaps anything on the server
-    test_results = queryIntersect(up_ws, up_temp_dir, proj_fc, up_RESTurl, int_fc)
-    if arcpy.Exists(int_fc):
+    test_results, overlap_ids = queryIntersect(up_ws, up_temp_dir, proj_fc, up_RESTurl, int_fc, other_jobs_query)
+    if test_results:
         # Do another intersect to see if there is actual overlap and not just coincident edges
         arcpy.analysis.Intersect([proj_fc,test_results], test_fc, "NO_FID", "#", "INPUT")
         if int(arcpy.GetCount_management(test_fc).getOutput(0)) > 0:
@@ -435,174 +366,50 @@ def update_polys_and_points(up_ws, up_temp_dir, proj_fc, up_RESTurl, local_temp,
                 expression = "round(!Shape.Area@acres!,2)"
                 arcpy.management.CalculateField(poly_single, "acres", expression, "PYTHON_9.3")
                 del expression
-                # Copy the residual features to the local temp layer to be used in re-upload later in the process
-                arcpy.management.CopyFeatures(poly_single, local_temp)
-                ## Also process the points layer if there is overlap
-                if proj_pts != '':
-                    # Create a new set of points to upload
-                    arcpy.management.FeatureToPoint(local_temp, pts_temp, "INSIDE")
-
-                # Overlaps exist between new features and remnant features. Do deletes and then uploads of both.
-                del_by_intersect(up_ws, up_temp_dir, proj_fc, up_RESTurl)
-                arcpy.management.Append(local_temp, up_RESTurl, "NO_TEST")
-                if fldmapping != '':
-                    arcpy.management.Append(proj_fc, up_RESTurl, "NO_TEST", fldmapping)
-                else:
-                    arcpy.management.Append(proj_fc, up_RESTurl, "NO_TEST")
-
-                # Also delete and upload remnant and new points if that parameter was called
+
+                # Overlaps exist between new features and remnant features. Replace the overlapped features with both.
+                stage_edits(edits, up_RESTurl, [poly_single], overlap_ids)
+                stage_features(edits, up_RESTurl, proj_fc)
+
+                # Also replace the points in the new areas and in the remnant areas if that parameter was called
                 if proj_pts != '':
-                    # Delete any points in the new areas (to be replaced)
-                    del_by_intersect(up_ws, up_temp_dir, proj_fc, ptsURL)
-                    # Delete any points in the remnant areas (to be restored from pts_temp)
-                    del_by_intersect(up_ws, up_temp_dir, local_temp, ptsURL)
-                    if fldmapping != '':
-                        arcpy.management.Append(pts_temp, ptsURL, "NO_TEST", fldmapping)
-                        arcpy.management.Append(proj_pts, ptsURL, "NO_TEST", fldmapping)
-                    else:
-                        arcpy.management.Append(pts_temp, ptsURL, "NO_TEST")
-                        arcpy.management.Append(proj_pts, ptsURL, "NO_TEST")
+                    arcpy.management.FeatureToPoint(poly_single, pts_temp, "INSIDE")
+                    pts_ids = ids_by_intersect(up_ws, proj_fc, ptsURL, other_jobs_query) + ids_by_intersect(up_ws, poly_single, ptsURL, other_jobs_query)
+                    stage_edits(edits, ptsURL, [pts_temp], pts_ids)
+                    stage_features(edits, ptsURL, proj_pts)
             else:
                 # A 100% replace, delete and then do uploads of new features, without remnant features
-                del_by_intersect(up_ws, up_temp_dir, proj_fc, up_RESTurl)
-                if fldmapping != '':
-                    arcpy.management.Append(proj_fc, up_RESTurl, "NO_TEST", fldmapping)
-                else:
-                    arcpy.management.Append(proj_fc, up_RESTurl, "NO_TEST")
-
+                stage_edits(edits, up_RESTurl, [], overlap_ids)
+                stage_features(edits, up_RESTurl, proj_fc)
                 if proj_pts != '':
-                    del_by_intersect(up_ws, up_temp_dir, proj_fc, ptsURL)
-                    if fldmapping != '':
-                        arcpy.management.Append(proj_pts, ptsURL, "NO_TEST", fldmapping)
-                    else:
-                        arcpy.management.Append(proj_pts, ptsURL, "NO_TEST")
+                    stage_edits(edits, ptsURL, [], ids_by_intersect(up_ws, proj_fc, ptsURL, other_jobs_query))
+                    stage_features(edits, ptsURL, proj_pts)
 
         else:
             # No actual overlaps, probably just touching edges. Do the standard upload with no deletes.
-            if fldmapping != '':
-                arcpy.management.Append(proj_fc, up_RESTurl, "NO_TEST", fldmapping)
-            else:
-                arcpy.management.Append(proj_fc, up_RESTurl, "NO_TEST")
+            stage_features(edits, up_RESTurl, proj_fc)
             if proj_pts != '':
-                if fldmapping != '':
-                    arcpy.management.Append(proj_pts, ptsURL, "NO_TEST", fldmapping)
-                else:
-                    arcpy.management.Append(proj_pts, ptsURL, "NO_TEST")
+                stage_features(edits, ptsURL, proj_pts)
             
     else:
-        # Catch all if the intersect query returns false. Just Append the new data.
-        if fldmapping != '':
-            arcpy.management.Append(proj_fc, up_RESTurl, "NO_TEST", fldmapping)
-        else:
-            arcpy.management.Append(proj_fc, up_RESTurl, "NO_TEST")
+        # Catch all if the intersect query returns false. Just upload the new data.
+        stage_features(edits, up_RESTurl, proj_fc)
         if proj_pts != '':
-            if fldmapping != '':
-                arcpy.management.Append(proj_pts, ptsURL, "NO_TEST", fldmapping)
-            else:
-                arcpy.management.Append(proj_pts, ptsURL, "NO_TEST")
+            stage_features(edits, ptsURL, proj_pts)
 
-    files_to_del = [int_fc, test_fc, local_temp, pts_temp]
+    files_to_del = [int_fc, test_fc, pts_temp]
     for item in files_to_del:
         try:
             arcpy.management.Delete(item)
         except:
             pass
 
-##    except:
-##        AddMsgAndPrint("\nSomething went wrong during upload of " + proj_fc + "!. Exiting...",2)
-##        exit()
-
 ## ===============================================================================================================
-def update_polys(up_ws, up_temp_dir, proj_fc, up_RESTurl, local_temp, fldmapping=''):
-## Queries polygon layer for intersects. If none found, appends proceed.
-## If intersection is found, query returns the geometry for local processing to split the old areas from the new.
-## Once local processing is complete the two pieces are put through Delete intersect and then re-uploaded.
-    
-##    try:
-    # set variables
-    int_fc = up_ws + os.sep + "int_fc"
-    test_fc = up_ws + os.sep + "test_fc"
+def update_polys(up_ws, up_temp_dir, proj_fc, up_RESTurl, edits):
+## Queries polygon layer for intersects and stages the replacement edits, without any related points layer.
+## See update_polys_and_points.
 
-    # Manage the local_temp file in case of previous run of tool that had an error or crashed
-    if arcpy.Exists(local_temp):
-        # Query local temp against the server to see if data is still there. If nothing returned,
-        # then append the local temp to the server to restore "deleted" features
-        overlapCheck = queryIntersect(up_ws, up_temp_dir, local_temp, up_RESTurl, int_fc)
-        if arcpy.Exists(int_fc):
-            # Do another intersect to see if there is actual overlap and not just coincident edges
-            arcpy.analysis.Intersect([local_temp,overlapCheck], test_fc, "NO_FID", "#", "INPUT")
-            if int(arcpy.GetCount_management(test_fc).getOutput(0)) == 0:
-                # Features were lost from the server. Restore the local_temp onto the server without the field mapping setting (not needed)
-                # Then delete local temps
-                arcpy.management.Append(local_temp, up_RESTurl, "NO_TEST")
-                arcpy.management.Delete(local_temp)
-                arcpy.management.Delete(test_fc)
-                arcpy.management.Delete(int_fc)
-            else:
-                # Server features take precedence. Delete local_temp. It will be re-created, if needed, in the next step.
-                arcpy.management.Delete(local_temp)
-                arcpy.management.Delete(test_fc)
-                arcpy.management.Delete(int_fc)
-        else:
-            # Server features take precedence. Delete local_temp. It will be re-created, if needed, in the next step.
-            arcpy.management.Delete(local_temp)
-            
-    # Check whether the input project area data overlaps anything on the server
-    test_results = queryIntersect(up_ws, up_temp_dir, proj_fc, up_RESTurl, int_fc)
-    if arcpy.Exists(int_fc):
-        # Do another intersect to see if there is actual overlap and not just coincident edges
-        arcpy.analysis.Intersect([proj_fc,test_results], test_fc, "NO_FID", "#", "INPUT")
-        if int(arcpy.GetCount_management(test_fc).getOutput(0)) > 0:
-            ## Features found. Process the geometry changes locally to prep layers for upload.
-            # Use the proj_fc to erase overlapping area from the downloaded polygons and check results
-            arcpy.analysis.Erase(test_results, proj_fc, poly_multi)
-            result = int(arcpy.management.GetCount(poly_multi).getOutput(0))
-            if result > 0:
-                # Not a 100% replace. Change to single part and update acres
-                arcpy.management.MultipartToSinglepart(poly_multi, poly_single)
-                expression = "round(!Shape.Area@acres!,2)"
-                arcpy.management.CalculateField(poly_single, "acres", expression, "PYTHON_9.3")
-                del expression
-                # Copy the residual features to the local temp layer to be used in re-upload later in the process
-                arcpy.management.CopyFeatures(poly_single, local_temp)
-
-                # Overlaps exist between new features and remnant features. Do deletes and then uploads of both.
-                del_by_intersect(up_ws, up_temp_dir, proj_fc, up_RESTurl)
-                arcpy.management.Append(local_temp, up_RESTurl, "NO_TEST")
-                if fldmapping != '':
-                    arcpy.management.Append(proj_fc, up_RESTurl, "NO_TEST", fldmapping)
-                else:
-                    arcpy.management.Append(proj_fc, up_RESTurl, "NO_TEST")
-            else:
-                # A 100% replace, delete and then do uploads of new features, without remnant features
-                del_by_intersect(up_ws, up_temp_dir, proj_fc, up_RESTurl)
-                if fldmapping != '':
-                    arcpy.management.Append(proj_fc, up_RESTurl, "NO_TEST", fldmapping)
-                else:
-                    arcpy.management.Append(proj_fc, up_RESTurl, "NO_TEST")
-        else:
-            # No actual overlaps, probably just touching edges. Do the standard upload with no deletes.
-            if fldmapping != '':
-                arcpy.management.Append(proj_fc, up_RESTurl, "NO_TEST", fldmapping)
-            else:
-                arcpy.management.Append(proj_fc, up_RESTurl, "NO_TEST")
-    else:
-        # Catch all if the intersect query returns false. Just Append the new data.
-        if fldmapping != '':
-            arcpy.management.Append(proj_fc, up_RESTurl, "NO_TEST", fldmapping)
-        else:
-            arcpy.management.Append(proj_fc, up_RESTurl, "NO_TEST")
-
-    files_to_del = [int_fc, test_fc, local_temp]
-    for item in files_to_del:
-        try:
-            arcpy.management.Delete(item)
-        except:
-            pass
-
-##    except:
-##        AddMsgAndPrint("\nSomething went wrong during upload of " + proj_fc + "!. Exiting...",2)
-##        exit()
+    update_polys_and_points(up_ws, up_temp_dir, proj_fc, up_RESTurl, edits)
         
 #### ===============================================================================================================
 ##def update_polys(up_ws, up_temp_dir, proj_fc, up_RESTurl, local_temp, fldmapping=''):
@@ -726,6 +533,9 @@ scriptPath = os.path.dirname(sys.argv[0])
 sys.path.append(scriptPath)
 
 from wetland_utils import getPortalTokenInfo
+from wetland_features import addLayerEdits, addLayerFeatures, applyEdits, buildManifest
+from wetland_features import getQueryGeometry, queryFeatures, queryObjectIds, queryObjectIdsConcurrent, readManifest, writeManifest
+from wetland_http import postForm, setPortalToken
 
 
 #### Update Environments
@@ -748,6 +558,7 @@ portalToken = getPortalTokenInfo(nrcsPortal)
 if not portalToken:
     arcpy.AddError("Could not generate Portal token! Please login or switch active portal to GeoPortal States 10.8.1! Exiting...")
     exit()
+setPortalToken(portalToken)
     
 
 #### Main procedures
@@ -814,6 +625,7 @@ try:
     projectTable = basedataGDB_path + os.sep + "Table_" + projectName
     wetDetTableName = "Admin_Table"
     wetDetTable = wcGDB_path + os.sep + wetDetTableName
+    manifestTable = wcGDB_path + os.sep + "Upload_Manifest"
     
     extentName = "Request_Extent"
     extentPtsName = "Request_Extent_Points"
@@ -856,7 +668,8 @@ try:
     poly_single = scratchGDB + os.sep + "poly_single"
 
     # Temp layers list for cleanup at the start and at the end
-    tempLayers = [poly_multi, poly_single]
+    # The *_Server copies were only used by older versions of this tool to recover from failed uploads
+    tempLayers = [poly_multi, poly_single, ext_server_copy, su_server_copy, cwd_server_copy, clucwd_server_copy]
     #deleteTempLayers(tempLayers)
 
 
@@ -968,104 +781,86 @@ try:
 
     # Build a query out of the job_id
     job_query = "job_id = '" + cur_id + "'"
+    other_jobs_query = "job_id <> '" + cur_id + "'"
     
 
-    #### Build field mapping objects that will be needed
-    AddMsgAndPrint("\nBuilding field mappings...",0)
-    arcpy.SetProgressorLabel("Building field mappings...")
-    field_mapping_cwd_to_hfs="globalid \"GlobalID\" false false true 38 GlobalID 0 0,First,#,Site_CWD,GlobalID,-1,-1;job_id \"Job ID\" true true false 128 Text 0 0,First,#,Site_CWD,job_id,0,128;admin_state \"Admin State\" true true false 2 Text 0 0,First,#,Site_CWD,admin_state,0,2;admin_state_name \"Admin State Name\" true true false 64 Text 0 0,First,#,Site_CWD,admin_state_name,0,64;admin_county \"Admin County\" true true false 3 Text 0 0,First,#,Site_CWD,admin_county,0,3;admin_county_name \"Admin County Name\" true true false 64 Text 0 0,First,#,Site_CWD,admin_county_name,0,64;state_code \"State Code\" true true false 2 Text 0 0,First,#,Site_CWD,state_code,0,2;state_name \"State Name\" true true false 64 Text 0 0,First,#,Site_CWD,state_name,0,64;county_code \"County Code\" true true false 3 Text 0 0,First,#,Site_CWD,county_code,0,3;county_name \"County Name\" true true false 64 Text 0 0,First,#,Site_CWD,county_name,0,64;farm_number \"Farm Number\" true true false 7 Text 0 0,First,#,Site_CWD,farm_number,0,7;tract_number \"Tract Number\" true true false 7 Text 0 0,First,#,Site_CWD,tract_number,0,7;eval_status \"Evaluation Status\" true true false 24 Text 0 0,First,#,Site_CWD,eval_status,0,24;wetland_label \"Wetland Label\" true true false 12 Text 0 0,First,#,Site_CWD,wetland_label,0,12;occur_year \"Occurrence Year\" true true false 4 Text 0 0,First,#,Site_CWD,occur_year,0,4;acres \"Acres\" true true false 0 Double 0 0,First,#,Site_CWD,acres,-1,-1;three_factors \"3-Factors\" true true false 1 Text 0 0,First,#,Site_CWD,three_factors,0,1;request_date \"Request Date\" true true false 29 Date 0 0,First,#,Site_CWD,request_date,-1,-1;request_type \"Request Type\" true true false 12 Text 0 0,First,#,Site_CWD,request_type,0,12;deter_method \"Determination Method\" true true false 24 Text 0 0,First,#,Site_CWD,deter_method,0,24;deter_staff \"Determination Staff\" true true false 100 Text 0 0,First,#,Site_CWD,deter_staff,0,100;dig_staff \"Digitizing Staff\" true true false 100 Text 0 0,First,#,Site_CWD,dig_staff,0,100;dig_date \"Digitizing Date\" true true false 29 Date 0 0,First,#,Site_CWD,dig_date,-1,-1;cwd_comments \"Comments\" true true false 255 Text 0 0,First,#,Site_CWD,cwd_comments,0,255;cert_date \"Certification Date\" true true false 0 Double 0 0,First,#,Site_CWD,cert_date,-1,-1"
-    field_mapping_su_to_hfs="globalid \"GlobalID\" false false false 38 GlobalID 0 0,First,#,Site_Sampling_Units,GlobalID,-1,-1;job_id \"Job ID\" true true false 128 Text 0 0,First,#,Site_Sampling_Units,job_id,0,128;admin_state \"Admin State\" true true false 2 Text 0 0,First,#,Site_Sampling_Units,admin_state,0,2;admin_state_name \"Admin State Name\" true true false 64 Text 0 0,First,#,Site_Sampling_Units,admin_state_name,0,64;admin_county \"Admin County\" true true false 3 Text 0 0,First,#,Site_Sampling_Units,admin_county,0,3;admin_county_name \"Admin County Name\" true true false 64 Text 0 0,First,#,Site_Sampling_Units,admin_county_name,0,64;state_code \"State Code\" true true false 2 Text 0 0,First,#,Site_Sampling_Units,state_code,0,2;state_name \"State Name\" true true false 64 Text 0 0,First,#,Site_Sampling_Units,state_name,0,64;county_code \"County Code\" true true false 3 Text 0 0,First,#,Site_Sampling_Units,county_code,0,3;county_name \"County Name\" true true false 64 Text 0 0,First,#,Site_Sampling_Units,county_name,0,64;farm_number \"Farm Number\" true true false 7 Text 0 0,First,#,Site_Sampling_Units,farm_number,0,7;tract_number \"Tract Number\" true true false 7 Text 0 0,First,#,Site_Sampling_Units,tract_number,0,7;eval_status \"Evaluation Status\" true true false 24 Text 0 0,First,#,Site_Sampling_Units,eval_status,0,24;su_number \"Sampling Unit Number\" true true false 0 Long 0 0,First,#,Site_Sampling_Units,su_number,-1,-1;su_letter \"Sampling Unit Letter\" true true false 3 Text 0 0,First,#,Site_Sampling_Units,su_letter,0,3;acres \"Acres\" true true false 0 Double 0 0,First,#,Site_Sampling_Units,acres,-1,-1;associated_rop \"Associated ROP\" true true false 0 Long 0 0,First,#,Site_Sampling_Units,associated_rop,-1,-1;associated_ref \"Associated Reference Points\" true true false 255 Text 0 0,First,#,Site_Sampling_Units,associated_ref,0,255;three_factors \"3-Factors?\" true true false 1 Text 0 0,First,#,Site_Sampling_Units,three_factors,0,1;request_date \"Request_Date\" true true false 29 Date 0 0,First,#,Site_Sampling_Units,request_date,-1,-1;request_type \"Request Type\" true true false 24 Text 0 0,First,#,Site_Sampling_Units,request_type,0,24;deter_method \"Determination Method\" true true false 24 Text 0 0,First,#,Site_Sampling_Units,deter_method,0,24;deter_staff \"Determination Staff\" true true false 100 Text 0 0,First,#,Site_Sampling_Units,deter_staff,0,100;dig_staff \"Digitizing Staff\" true true false 100 Text 0 0,First,#,Site_Sampling_Units,dig_staff,0,100;dig_date \"Digitizing Date\" true true false 29 Date 0 0,First,#,Site_Sampling_Units,dig_date,-1,-1;su_comments \"Comments\" true true false 255 Text 0 0,First,#,Site_Sampling_Units,su_comments,0,255"
-    field_mapping_rop_to_hfs="globalid \"GlobalID\" false false false 38 GlobalID 0 0,First,#,Site_ROPs,GlobalID,-1,-1;job_id \"Job ID\" true true false 128 Text 0 0,First,#,Site_ROPs,job_id,0,128;admin_state \"Admin State\" true true false 2 Text 0 0,First,#,Site_ROPs,admin_state,0,2;admin_state_name \"Admin State Name\" true true false 64 Text 0 0,First,#,Site_ROPs,admin_state_name,0,64;admin_county \"Admin County\" true true false 3 Text 0 0,First,#,Site_ROPs,admin_county,0,3;admin_county_name \"Admin County Name\" true true false 64 Text 0 0,First,#,Site_ROPs,admin_county_name,0,64;state_code \"State Code\" true true false 2 Text 0 0,First,#,Site_ROPs,state_code,0,2;state_name \"State Name\" true true false 64 Text 0 0,First,#,Site_ROPs,state_name,0,64;county_code \"County Code\" true true false 3 Text 0 0,First,#,Site_ROPs,county_code,0,3;county_name \"County Name\" true true false 64 Text 0 0,First,#,Site_ROPs,county_name,0,64;farm_number \"Farm Number\" true true false 7 Text 0 0,First,#,Site_ROPs,farm_number,0,7;tract_number \"Tract Number\" true true false 7 Text 0 0,First,#,Site_ROPs,tract_number,0,7;rop_number \"ROP Number\" true true false 0 Long 0 0,First,#,Site_ROPs,rop_number,-1,-1;associated_su \"Associated Sampling Units\" true true false 255 Text 0 0,First,#,Site_ROPs,associated_su,0,255;rop_comments \"Comments\" true true false 255 Text 0 0,First,#,Site_ROPs,rop_comments,0,255"
-    field_mapping_ref_to_hfs="globalid \"GlobalID\" false false false 38 GlobalID 0 0,First,#,Site_Reference_Points,GlobalID,-1,-1;job_id \"Job ID\" true true false 128 Text 0 0,First,#,Site_Reference_Points,job_id,0,128;admin_state \"Admin State\" true true false 2 Text 0 0,First,#,Site_Reference_Points,admin_state,0,2;admin_state_name \"Admin State Name\" true true false 64 Text 0 0,First,#,Site_Reference_Points,admin_state_name,0,64;admin_county \"Admin County\" true true false 3 Text 0 0,First,#,Site_Reference_Points,admin_county,0,3;admin_county_name \"Admin County Name\" true true false 64 Text 0 0,First,#,Site_Reference_Points,admin_county_name,0,64;state_code \"State Code\" true true false 2 Text 0 0,First,#,Site_Reference_Points,state_code,0,2;state_name \"State Name\" true true false 64 Text 0 0,First,#,Site_Reference_Points,state_name,0,64;county_code \"County Code\" true true false 3 Text 0 0,First,#,Site_Reference_Points,county_code,0,3;county_name \"County Name\" true true false 64 Text 0 0,First,#,Site_Reference_Points,county_name,0,64;farm_number \"Farm Number\" true true false 7 Text 0 0,First,#,Site_Reference_Points,farm_number,0,7;tract_number \"Tract Number\" true true false 7 Text 0 0,First,#,Site_Reference_Points,tract_number,0,7;ref_number \"Reference Point Number\" true true false 0 Long 0 0,First,#,Site_Reference_Points,ref_number,-1,-1;parent_rop \"Parent ROP\" true true false 0 Long 0 0,First,#,Site_Reference_Points,parent_rop,-1,-1;hydro \"Documents Hydrology?\" true true false 3 Text 0 0,First,#,Site_Reference_Points,hydro,0,3;veg \"Documents Vegetation?\" true true false 3 Text 0 0,First,#,Site_Reference_Points,veg,0,3;soil \"Documents Soil?\" true true false 3 Text 0 0,First,#,Site_Reference_Points,soil,0,3;ref_comments \"Comments\" true true false 255 Text 0 0,First,#,Site_Reference_Points,ref_comments,0,255"
-    field_mapping_dl_to_hfs="globalid \"GlobalID\" false false false 38 GlobalID 0 0,First,#,Site_Drainage_Lines,GlobalID,-1,-1;job_id \"Job ID\" true true false 128 Text 0 0,First,#,Site_Drainage_Lines,job_id,0,128;admin_state \"Admin State\" true true false 2 Text 0 0,First,#,Site_Drainage_Lines,admin_state,0,2;admin_state_name \"Admin State Name\" true true false 64 Text 0 0,First,#,Site_Drainage_Lines,admin_state_name,0,64;admin_county \"Admin County\" true true false 3 Text 0 0,First,#,Site_Drainage_Lines,admin_county,0,3;admin_county_name \"Admin County Name\" true true false 64 Text 0 0,First,#,Site_Drainage_Lines,admin_county_name,0,64;state_code \"State Code\" true true false 2 Text 0 0,First,#,Site_Drainage_Lines,state_code,0,2;state_name \"State Name\" true true false 64 Text 0 0,First,#,Site_Drainage_Lines,state_name,0,64;county_code \"County Code\" true true false 3 Text 0 0,First,#,Site_Drainage_Lines,county_code,0,3;county_name \"County Name\" true true false 64 Text 0 0,First,#,Site_Drainage_Lines,county_name,0,64;farm_number \"Farm Number\" true true false 7 Text 0 0,First,#,Site_Drainage_Lines,farm_number,0,7;tract_number \"Tract Number\" true true false 7 Text 0 0,First,#,Site_Drainage_Lines,tract_number,0,7;line_type \"Line Type\" true true false 50 Text 0 0,First,#,Site_Drainage_Lines,line_type,0,50;manip_era \"Era\" true true false 12 Text 0 0,First,#,Site_Drainage_Lines,manip_era,0,12;manip_year \"Manipulation Year\" true true false 4 Text 0 0,First,#,Site_Drainage_Lines,manip_year,0,4;line_length \"Length (ft)\" true true false 0 Double 0 0,First,#,Site_Drainage_Lines,line_length,-1,-1;depth \"Depth (ft)\" true true false 0 Double 0 0,First,#,Site_Drainage_Lines,depth,-1,-1;width \"Width (ft)\" true true false 0 Double 0 0,First,#,Site_Drainage_Lines,width,-1,-1;drain_comments \"Comments\" true true false 255 Text 0 0,First,#,Site_Drainage_Lines,drain_comments,0,255"
-    field_mapping_clucwd_to_hfs="globalid \"GlobalID\" false false false 38 GlobalID 0 0,First,#,Site_CLU_CWD,GlobalID,-1,-1;job_id \"Job ID\" true true false 128 Text 0 0,First,#,Site_CLU_CWD,job_id,0,128;admin_state \"Admin State\" true true false 2 Text 0 0,First,#,Site_CLU_CWD,admin_state,0,2;admin_state_name \"Admin State Name\" true true false 64 Text 0 0,First,#,Site_CLU_CWD,admin_state_name,0,64;admin_county \"Admin County\" true true false 3 Text 0 0,First,#,Site_CLU_CWD,admin_county,0,3;admin_county_name \"Admin County Name\" true true false 64 Text 0 0,First,#,Site_CLU_CWD,admin_county_name,0,64;state_code \"State Code\" true true false 2 Text 0 0,First,#,Site_CLU_CWD,state_code,0,2;state_name \"State Name\" true true false 64 Text 0 0,First,#,Site_CLU_CWD,state_name,0,64;county_code \"County Code\" true true false 3 Text 0 0,First,#,Site_CLU_CWD,county_code,0,3;county_name \"County Name\" true true false 64 Text 0 0,First,#,Site_CLU_CWD,county_name,0,64;farm_number \"Farm Number\" true true false 7 Text 0 0,First,#,Site_CLU_CWD,farm_number,0,7;tract_number \"Tract Number\" true true false 7 Text 0 0,First,#,Site_CLU_CWD,tract_number,0,7;clu_number \"CLU Number\" true true false 7 Text 0 0,First,#,Site_CLU_CWD,clu_number,0,7;eval_status \"Evaluation Status\" true true false 24 Text 0 0,First,#,Site_CLU_CWD,eval_status,0,24;wetland_label \"Wetland Label\" true true false 12 Text 0 0,First,#,Site_CLU_CWD,wetland_label,0,12;occur_year \"Occurrence Year\" true true false 4 Text 0 0,First,#,Site_CLU_CWD,occur_year,0,4;acres \"Acres\" true true false 0 Double 0 0,First,#,Site_CLU_CWD,acres,-1,-1;three_factors \"3-Factors\" true true false 1 Text 0 0,First,#,Site_CLU_CWD,three_factors,0,1;request_date \"Request Date\" true true false 29 Date 0 0,First,#,Site_CLU_CWD,request_date,-1,-1;request_type \"Request Type\" true true false 12 Text 0 0,First,#,Site_CLU_CWD,request_type,0,12;deter_method \"Determination Method\" true true false 24 Text 0 0,First,#,Site_CLU_CWD,deter_method,0,24;deter_staff \"Determination Staff\" true true false 100 Text 0 0,First,#,Site_CLU_CWD,deter_staff,0,100;dig_staff \"Digitizing Staff\" true true false 100 Text 0 0,First,#,Site_CLU_CWD,dig_staff,0,100;dig_date \"Digitizing Date\" true true false 29 Date 0 0,First,#,Site_CLU_CWD,dig_date,-1,-1;clucwd_comments \"Comments\" true true false 255 Text 0 0,First,#,Site_CLU_CWD,clucwd_comments,0,255;cert_date \"Certification Date\" true true false 29 Date 0 0,First,#,Site_CLU_CWD,cert_date,-1,-1"
-
-
-    #### Find features with matching job ids and delete them
+    #### Find features with matching job ids and stage them for deletion
     AddMsgAndPrint("\nProcessing matching JobIDs...",0)
     arcpy.SetProgressorLabel("Processing matching JobIDs...")
 
-    AddMsgAndPrint("\nProcessing Matching Request Extents in Archive...",0)
-    arcpy.SetProgressorLabel("Processing Matching Request Extents in Archive...")
-    del_by_attributes(job_query, extA_HFS)
-
-    AddMsgAndPrint("\nProcessing Matching Request Extents on Live...",0)
-    arcpy.SetProgressorLabel("Processing Matching Request Extents on Live...")
-    del_by_attributes(job_query, ext_HFS)
-
-    AddMsgAndPrint("\nProcessing Matching Request Extent Points in Archive...",0)
-    arcpy.SetProgressorLabel("Processing Matching Request Extent Points in Archive...")
-    del_by_attributes(job_query, reqptsA_HFS)
-
-    AddMsgAndPrint("\nProcessing Matching Request Extent Points on Live...",0)
-    arcpy.SetProgressorLabel("Processing Matching Request Extent Points on Live...")
-    del_by_attributes(job_query, reqpts_HFS)
-    
-    del_by_attributes(job_query, suA_HFS)
-    del_by_attributes(job_query, su_HFS)
-    del_by_attributes(job_query, ropA_HFS)
-    del_by_attributes(job_query, rop_HFS)
-    del_by_attributes(job_query, cwdA_HFS)
-    del_by_attributes(job_query, cwd_HFS)
-    del_by_attributes(job_query, clucwdA_HFS)
-    del_by_attributes(job_query, clucwd_HFS)
-    del_by_attributes(job_query, clucwdptsA_HFS)
-    del_by_attributes(job_query, clucwdpts_HFS)
+    # Purge the job from every Live and Archive layer, staged as deletes in the applyEdits request of each service
+    job_HFS = [extA_HFS, ext_HFS, reqptsA_HFS, reqpts_HFS, suA_HFS, su_HFS, ropA_HFS, rop_HFS, cwdA_HFS, cwd_HFS,
+               clucwdA_HFS, clucwd_HFS, clucwdptsA_HFS, clucwdpts_HFS]
     if ref_count > 0:
-        del_by_attributes(job_query, rpA_HFS)
-        del_by_attributes(job_query, rp_HFS)
+        job_HFS += [rpA_HFS, rp_HFS]
     if dl_count > 0:
-        del_by_attributes(job_query, drainsA_HFS)
-        del_by_attributes(job_query, drains_HFS)
+        job_HFS += [drainsA_HFS, drains_HFS]
     if pjw_count > 0:
-        del_by_attributes(job_query, pjwA_HFS)
-        del_by_attributes(job_query, pjw_HFS)
+        job_HFS += [pjwA_HFS, pjw_HFS]
+
+    # Layers with a verified manifest from the last upload of this job are synced by change detection instead
+    manifests = load_manifests(manifestTable, cur_id, job_HFS)
+    purge_HFS = [RESTurl for RESTurl in job_HFS if RESTurl not in manifests]
+    if manifests:
+        AddMsgAndPrint("\nOnly changes since the last upload will be sent for " + str(len(manifests)) + " layers...",0)
 
+    # Nothing is sent to the server until all layers are staged. The edits are then applied in one transaction per service.
+    edits = {}
 
-    #### Append current work to the Archive Feature Services (other than matching current job, overlap is allowed)
-    AddMsgAndPrint("\nUploading to Archive Layers...",0)
-    arcpy.SetProgressorLabel("Uploading to Archive Layers...")
+    AddMsgAndPrint("\nStaging removal of Matching JobIDs from " + str(len(purge_HFS)) + " Live and Archive Layers...",0)
+    arcpy.SetProgressorLabel("Staging removal of Matching JobIDs from Live and Archive Layers...")
+    stage_purge_all(edits, job_query, purge_HFS)
+
+
+    #### Stage current work for the Archive Feature Services (other than matching current job, overlap is allowed)
+
+    AddMsgAndPrint("\nPreparing uploads to Archive Layers...",0)
+    arcpy.SetProgressorLabel("Preparing uploads to Archive Layers...")
     
-    arcpy.Append_management(projectSum, extA_HFS, "NO_TEST")
-    arcpy.Append_management(projectSumPts, reqptsA_HFS, "NO_TEST")
-    arcpy.Append_management(projectSU, suA_HFS, "NO_TEST", field_mapping_su_to_hfs)
-    arcpy.Append_management(projectROP, ropA_HFS, "NO_TEST", field_mapping_rop_to_hfs)
-    arcpy.Append_management(projectCWD, cwdA_HFS, "NO_TEST", field_mapping_cwd_to_hfs)
-    arcpy.Append_management(projectCLUCWD, clucwdA_HFS, "NO_TEST", field_mapping_clucwd_to_hfs)
-    arcpy.Append_management(cluCWDpts, clucwdptsA_HFS, "NO_TEST", field_mapping_clucwd_to_hfs)
+    stage_features(edits, extA_HFS, projectSum)
+    stage_features(edits, reqptsA_HFS, projectSumPts)
+    stage_features(edits, suA_HFS, projectSU)
+    stage_features(edits, ropA_HFS, projectROP)
+    stage_features(edits, cwdA_HFS, projectCWD)
+    stage_features(edits, clucwdA_HFS, projectCLUCWD)
+    stage_features(edits, clucwdptsA_HFS, cluCWDpts)
     if ref_count > 0:
-        arcpy.Append_management(projectREF, rpA_HFS, "NO_TEST", field_mapping_ref_to_hfs)
+        stage_features(edits, rpA_HFS, projectREF)
     if dl_count > 0:
-        arcpy.Append_management(projectLines, drainsA_HFS, "NO_TEST", field_mapping_dl_to_hfs)
+        stage_features(edits, drainsA_HFS, projectLines)
     if pjw_count > 0:
-        arcpy.Append_management(projectPJW, pjwA_HFS, "NO_TEST")
+        stage_features(edits, pjwA_HFS, projectPJW)
 
 
     #### Process the Active Data Layers
-    AddMsgAndPrint("\nUploading to Active Layers...",0)
-    arcpy.SetProgressorLabel("Uploading to Active Layers...")
+    AddMsgAndPrint("\nPreparing uploads to Active Layers...",0)
+    arcpy.SetProgressorLabel("Preparing uploads to Active Layers...")
     
     # Polygon find and replace function syntax references
-    # update_polys(up_ws, up_temp_dir, proj_fc, up_RESTurl, local_temp, fldmapping='')
-    update_polys(scratchGDB, wetDir, projectSU, su_HFS, su_server_copy, field_mapping_su_to_hfs)        # Sampling Units Layer
-    update_polys(scratchGDB, wetDir, projectCWD, cwd_HFS, cwd_server_copy, field_mapping_cwd_to_hfs)    # CWD Layer
-    
-    # update_polys_and_points(up_ws, up_temp_dir, proj_fc, up_RESTurl, local_temp, proj_pts = '', ptsURL = '', fldmapping='')
-    update_polys_and_points(scratchGDB, wetDir, projectSum, ext_HFS, ext_server_copy, projectSumPts, reqpts_HFS)    # Summary Extent Layer and points
-    update_polys_and_points(scratchGDB, wetDir, projectCLUCWD, clucwd_HFS, clucwd_server_copy, cluCWDpts, clucwdpts_HFS, field_mapping_clucwd_to_hfs)  # CLU CWD Layer and points
-
-    #arcpy.Append_management(projectSumPts, reqpts_HFS, "NO_TEST", field_mapping_ref_to_hfs)         # Summary points
-    arcpy.Append_management(projectROP, rop_HFS, "NO_TEST", field_mapping_rop_to_hfs)           # ROPs Layer
-    # replace_pts_by_area(scratchGDB, wetDir, projectROP, projectSU, rop_HFS, field_mapping_rop_to_hfs)             # ROPs Layer - can't do it this way due to legacy ramifications (split SUs)
-    #arcpy.Append_management(cluCWDpts, clucwdpts_HFS, "NO_TEST", field_mapping_clucwd_to_hfs)   # CLU CWD Points Layer
-    # replace_pts_by_area(scratchGDB, wetDir, cluCWDpts, projectCWD, clucwdpts_HFS, field_mapping_clucwd_to_hfs)    # CLU CWD Pts Layer - can't do it this way due to legacy ramifications (split CLUs or CWDs)
+    # update_polys(up_ws, up_temp_dir, proj_fc, up_RESTurl, edits)
+    update_polys(scratchGDB, wetDir, projectSU, su_HFS, edits)        # Sampling Units Layer
+    update_polys(scratchGDB, wetDir, projectCWD, cwd_HFS, edits)      # CWD Layer
     
+    # update_polys_and_points(up_ws, up_temp_dir, proj_fc, up_RESTurl, edits, proj_pts = '', ptsURL = '')
+    update_polys_and_points(scratchGDB, wetDir, projectSum, ext_HFS, edits, projectSumPts, reqpts_HFS)           # Summary Extent Layer and points
+    update_polys_and_points(scratchGDB, wetDir, projectCLUCWD, clucwd_HFS, edits, cluCWDpts, clucwdpts_HFS)      # CLU CWD Layer and points
+
+    stage_features(edits, rop_HFS, projectROP)              # ROPs Layer
     if ref_count > 0:
-        arcpy.Append_management(projectREF, rp_HFS, "NO_TEST", field_mapping_ref_to_hfs)        # Reference Points
+        stage_features(edits, rp_HFS, projectREF)           # Reference Points
     if dl_count > 0:
-        arcpy.Append_management(projectLines, drains_HFS, "NO_TEST", field_mapping_dl_to_hfs)   # Drainage Lines Layer
+        stage_features(edits, drains_HFS, projectLines)     # Drainage Lines Layer
     if pjw_count > 0:
-        arcpy.Append_management(projectPJW, pjw_HFS, "NO_TEST")                                 # PJW Layer
+        stage_features(edits, pjw_HFS, projectPJW)          # PJW Layer
+
+
+    #### Upload all staged edits
+    AddMsgAndPrint("\nUploading to Archive and Active Layers...",0)
+    arcpy.SetProgressorLabel("Uploading to Archive and Active Layers...")
+    responses = apply_edits(edits)
+
+    # Record what was uploaded so the next upload of this job only sends the changes
+    writeManifest(manifestTable, cur_id, buildManifest(edits, responses))
 
 
     #### Clean up Temporary Datasets
@@ -55,6 +55,34 @@
 # - Updated the AddSSURGOLayersToArcGISPro function to replace the .name method with the
 #   .longName method.  Using .name to query a layer that was part of a group caused problems.
 
+# ==========================================================================================
+# Updated  10/18/2026
+# - Soil property queries that don't create temp tables are sent to Soil Data Access in
+#   one request and the returned tables (Table, Table1...) are split back out per property.
+# - The remaining property queries are sent concurrently (maxSDAWorkers) and their results
+#   are applied to the layer in property list order.
+# - Property values are cached locally per mukey and tabular version (wetland_ssurgo_cache)
+#   and only the mukeys that miss the cache are queried from Soil Data Access.
+# - Mapunit polygons are cached locally per survey area and spatial version and clipped
+#   to the AOI locally; SDA is only asked for the spatial versions and mapunit attributes.
+# - All property results are joined to the SSURGO layer at once: one AddFields call and
+#   one UpdateCursor pass instead of one of each per property.
+# - Large or elongated AOIs are split into tiles (maxTileDegrees) that are requested from
+#   SDA concurrently, and the returned polygons are merged and deduplicated.
+# - 'By Component' and 'coecoclass' queries are single set-based GROUP BY statements without
+#   temp tables, so they are now batched with the other property queries.  Query templates
+#   can be checked offline against a sample SQLite database with tools/wetland_sda_benchmark.py.
+# - Offline mode: start() accepts a local SSURGO database (SQLite export).  The mapunits are
+#   clipped from its mupolygon feature class and every aggregation is computed locally
+#   with NumPy (wetland_ssurgo_local), in the same fields the SDA queries return.  The script
+#   tool reads the database from an optional fourth parameter; that parameter still has to
+#   be added to SSURGO_WCT_ArcGISPro.tbx in ArcGIS Pro.
+# - Metadata edits to the SSURGO layer (basic metadata and property descriptions) are
+#   gathered in memory (layerMetadata) and written with one load and save per run.
+# - The SSURGO_WCT_*.lyrx files are parsed once per session (lyrxDefinitions) and combined
+#   into one layer file whose symbology is built from a single read of the renderer fields;
+#   the layers are then added to the 'SSURGO Layers' group in one call.
+
 
 #-------------------------------------------------------------------------------
 
@@ -101,7 +129,7 @@ def errorMsg():
         pass
 
 # ==============================================================================================================================
-def getSSURGOgeometryFromSDA(aoi, outputWS, outputName="SSURGO_SDA"):
+def getSSURGOgeometryFromSDA(aoi, outputWS, outputName="SSURGO_SDA", localDatabase=None):
     # Description:
     # This function will create a spatial layer of SSURGO geometry from Soil Data Access using
     # the minimum bounding coordinates from the inFC (input Feature Class)
@@ -114,6 +142,8 @@ def getSSURGOgeometryFromSDA(aoi, outputWS, outputName="SSURGO_SDA"):
     # outputWS - the location of where the SSURGO geometry will be written to.
     #            If the outputWS is a FGDB then the output layer will be a FGDB feature class.
     #            If the outputWS is a folder then the output layer will ba a Shapefile.
+    # localDatabase - optional local SSURGO database (SQLite export) to clip the mapunits
+    #            from instead of Soil Data Access.  No request is sent to SDA when it is set.
 
     # Prior to the query request, a feature class called "SSURGO_WCT" will be created in WGS84
     # with an MUKEY field.  The original subfunction also created a .lyr file from the feature class
@@ -246,56 +276,44 @@ def getSSURGOgeometryFromSDA(aoi, outputWS, outputName="SSURGO_SDA"):
         now = datetime.datetime.now()
         timeStamp = now.strftime('%Y-%m-%d T%H:%M:%S')
 
-        header = """/** SDA Query application "Wetland Compliance Tool" **/"""
-        gQry = header + "\n-- " + timeStamp
-
-        gQry += """
-        ~DeclareGeometry(@aoi)~
-        select @aoi = geometry::STPolyFromText('POLYGON (( """ + coorStr + """))', 4326)
-        ~DeclareIdGeomTable(@intersectedPolygonGeometries)~
-        ~GetClippedMapunits(@aoi,polygon,geo,@intersectedPolygonGeometries)~
-
-        SELECT L.areasymbol, M.musym, M.muname, id AS mukey,
-        SA.saversion, CONVERT(varchar(10), [SA].[saverest], 126) AS surveyareadate,
-        S.spatialversion, CONVERT(varchar(10), [S].[spatialverest], 126) AS spatialdate,
-        T.tabularversion, CONVERT(varchar(10), [T].[tabularverest], 126) AS tabulardate, geom
-
-        FROM @intersectedPolygonGeometries
-        INNER JOIN mapunit M ON id = M.mukey
-        INNER JOIN legend L ON M.lkey = L.lkey
-        INNER JOIN sacatalog AS SA ON L.areasymbol = SA.areasymbol
-        INNER JOIN saspatialver AS S ON L.areasymbol = S.areasymbol
-        INNER JOIN satabularver AS T ON L.areasymbol = T.areasymbol"""
+        gQry = compileGeometryQuery(coorStr,timeStamp)
 
         #AddMsgAndPrint(str(gQry))
 
-        # SDA url
-        url = "https://SDMDataAccess.sc.egov.usda.gov/Tabular/post.rest"
-        AddMsgAndPrint('.\nSending coordinates to Soil Data Access')
+        # Clip the mapunits from the local SSURGO database in offline mode, otherwise from the
+        # local geometry cache when possible
+        qData = False
+        if localDatabase:
+            qData = getSSURGOgeometryFromLocal("POLYGON ((" + coorStr + "))",localDatabase)
 
-        # Create request using JSON, return data as JSON
-        request = {}
-        request["format"] = "JSON+COLUMNNAME+METADATA"
-        request["query"] = gQry
+        elif cacheSSURGOgeometry:
+            qData = getSSURGOgeometryFromCache("POLYGON ((" + coorStr + "))")
 
-        #json.dumps = serialize obj (request dictionary) to a JSON formatted str
-        data = json.dumps(request)
+        # Large or elongated AOIs are split into tiles that are requested from SDA concurrently
+        aoiTiles = list()
+        if not qData and not localDatabase:
+            aoiTiles = getAOItiles(aoi)
 
-        # Send request to SDA Tabular service using urllib library
-        # because we are passing the "data" argument, this is a POST request, not a GET
+        if not qData and len(aoiTiles) > 1:
+            AddMsgAndPrint('.\nSending ' + str(len(aoiTiles)) + ' AOI tiles to Soil Data Access')
+            qData = getSSURGOgeometryTiles(aoiTiles,timeStamp)
 
-        # ArcPro Request
-        data = data.encode('ascii')
-        response = urllib.request.urlopen(url,data)
+        elif not qData and not localDatabase:
+            # SDA url
+            url = "https://SDMDataAccess.sc.egov.usda.gov/Tabular/post.rest"
+            AddMsgAndPrint('.\nSending coordinates to Soil Data Access')
 
-        # read query results
-        qResults = response.read()
+            # Create request using JSON, return data as JSON
+            request = {}
+            request["format"] = "JSON+COLUMNNAME+METADATA"
+            request["query"] = gQry
 
-        # Convert the returned JSON string into a Python dictionary.
-        qData = json.loads(qResults)
+            # Send request to SDA Tabular service as a POST over the shared keep-alive connection
+            # and convert the returned JSON string into a Python dictionary.
+            responseStatus, qData = postJSON(url, request, idempotent=True)
 
         # if dictionary key "Table" is found
-        if "Table" in qData:
+        if qData and "Table" in qData:
 
             # extract 'Data' List from dictionary to create list of lists
             # [u'455458',
@@ -339,21 +357,17 @@ def getSSURGOgeometryFromSDA(aoi, outputWS, outputName="SSURGO_SDA"):
             AddMsgAndPrint(".\nSuccessfully Created SSURGO Layer from Soil Data Access")
             AddMsgAndPrint(".\tOutput location: " + str(outSSURGOlayerPath))
 
-            # Update Basic Metadata for the SSURGO_WCT layer
-            ssurgoWCTmetadata = md.Metadata(outSSURGOlayerPath)
-
-            if not ssurgoWCTmetadata.isReadOnly:
-                AddMsgAndPrint(".\tUpdating Metadata for " + outSSURGOlayerPath)
-                newSSURGOmeta = md.Metadata()
-                newSSURGOmeta.title = "SSURGO WCT"
-                newSSURGOmeta.tags = "USDA, NRCS, Soil and Plant Science Division, Wetland Compliance Tool"
-                newSSURGOmeta.summary = "SSURGO Layer used for Wetland Compliance reference - Created: " + timeStamp
-                newSSURGOmeta.credits = "USDA - NRCS, Soil and Plant Science Division"
-                newSSURGOmeta.description = "\
+            # Basic Metadata for the SSURGO_WCT layer; written with the property descriptions by writeLayerMetadata
+            layerMetadata[outSSURGOlayerPath] = newSSURGOmeta = dict()
+            newSSURGOmeta['title'] = "SSURGO WCT"
+            newSSURGOmeta['tags'] = "USDA, NRCS, Soil and Plant Science Division, Wetland Compliance Tool"
+            newSSURGOmeta['summary'] = "SSURGO Layer used for Wetland Compliance reference - Created: " + timeStamp
+            newSSURGOmeta['credits'] = "USDA - NRCS, Soil and Plant Science Division"
+            newSSURGOmeta['description'] = "\
 This layer was produced using SSURGO (Soil Survey Geographic Database)\n\
 data derived from Soil Data Access.\n\
 "
-                newSSURGOmeta.accessConstraints = "\
+            newSSURGOmeta['accessConstraints'] = "\
 Soil survey data seldom contain detailed, site-specific information.\n\
 They are not intended for use as primary regulatory tools in site-\n\
 specific permitting decisions. They are, however, useful for broad\n\
@@ -366,9 +380,6 @@ as a tool for planning onsite investigation. Understanding the\n\
 capability and limitations of the different types of soil data is\n\
 essential for making the best conservation-planning decisions."
 
-                ssurgoWCTmetadata.copy(newSSURGOmeta)
-                ssurgoWCTmetadata.save()
-
             return outSSURGOlayerPath
 
         else:
@@ -397,6 +408,302 @@ essential for making the best conservation-planning decisions."
         errorMsg()
         return False
 
+# ==============================================================================================================================
+def compileGeometryQuery(coorStr,timeStamp):
+    # Description
+    # This function compiles the SDA query that returns the SSURGO mapunit polygons clipped
+    # to a polygon, with their survey area, spatial and tabular versions.
+
+    # Parameters
+    # coorStr - closed ring of 'longitude latitude' WGS84 coordinates separated by commas
+    # timeStamp - time stamp written to the query header
+
+    # Returns
+    # This function returns the SQL query in ascii format.
+
+    header = """/** SDA Query application "Wetland Compliance Tool" **/"""
+    gQry = header + "\n-- " + timeStamp
+
+    gQry += """
+        ~DeclareGeometry(@aoi)~
+        select @aoi = geometry::STPolyFromText('POLYGON (( """ + coorStr + """))', 4326)
+        ~DeclareIdGeomTable(@intersectedPolygonGeometries)~
+        ~GetClippedMapunits(@aoi,polygon,geo,@intersectedPolygonGeometries)~
+
+        SELECT L.areasymbol, M.musym, M.muname, id AS mukey,
+        SA.saversion, CONVERT(varchar(10), [SA].[saverest], 126) AS surveyareadate,
+        S.spatialversion, CONVERT(varchar(10), [S].[spatialverest], 126) AS spatialdate,
+        T.tabularversion, CONVERT(varchar(10), [T].[tabularverest], 126) AS tabulardate, geom
+
+        FROM @intersectedPolygonGeometries
+        INNER JOIN mapunit M ON id = M.mukey
+        INNER JOIN legend L ON M.lkey = L.lkey
+        INNER JOIN sacatalog AS SA ON L.areasymbol = SA.areasymbol
+        INNER JOIN saspatialver AS S ON L.areasymbol = S.areasymbol
+        INNER JOIN satabularver AS T ON L.areasymbol = T.areasymbol"""
+
+    return gQry
+
+# ==============================================================================================================================
+def getAOItiles(aoi):
+    # Description
+    # This function splits the AOI into tiles for SDA geometry requests.  Each polygon part
+    # of the AOI gets its own envelope, and envelopes larger than maxTileDegrees in either
+    # direction are split into a grid.  Grid cells that don't touch the AOI are dropped, so
+    # an elongated or scattered AOI requests far less area than its overall envelope.
+
+    # Parameters
+    # aoi - input area of interest
+
+    # Returns
+    # This function returns a list of closed coordinate rings (see compileGeometryQuery), one
+    # per tile.  An empty list is returned if the AOI could not be tiled.
+
+    try:
+        wgs84 = arcpy.SpatialReference(4326)
+        aoiShape = None
+        with arcpy.da.SearchCursor(aoi,['SHAPE@'],spatial_reference=wgs84) as rows:
+            for row in rows:
+                if row[0]:
+                    aoiShape = row[0] if aoiShape is None else aoiShape.union(row[0])
+
+        if aoiShape is None:
+            return []
+
+        tiles = list()
+        for i in range(aoiShape.partCount):
+            part = arcpy.Polygon(aoiShape.getPart(i),wgs84)
+            ext = part.extent
+            xTiles = max(1,int(math.ceil(ext.width / maxTileDegrees)))
+            yTiles = max(1,int(math.ceil(ext.height / maxTileDegrees)))
+            tileWidth = ext.width / xTiles
+            tileHeight = ext.height / yTiles
+
+            for x in range(xTiles):
+                for y in range(yTiles):
+                    xmin = ext.XMin + x * tileWidth
+                    ymin = ext.YMin + y * tileHeight
+                    xmax = ext.XMax if x == xTiles - 1 else xmin + tileWidth
+                    ymax = ext.YMax if y == yTiles - 1 else ymin + tileHeight
+                    corners = [(xmin,ymin),(xmin,ymax),(xmax,ymax),(xmax,ymin),(xmin,ymin)]
+
+                    tile = arcpy.Polygon(arcpy.Array([arcpy.Point(*corner) for corner in corners]),wgs84)
+                    if (xTiles > 1 or yTiles > 1) and tile.disjoint(part):
+                        continue
+                    tiles.append(",".join([str(cx) + " " + str(cy) for cx, cy in corners]))
+
+        return tiles
+
+    except:
+        errorMsg()
+        return []
+
+# ==============================================================================================================================
+def isTileEdgePiece(piece,shape,edgeZone):
+    # Description
+    # This function checks whether two polygons of the same mapunit from different AOI tiles
+    # belong to one SSURGO polygon: they overlap, or part of their shared boundary runs along
+    # a tile edge.  A shared boundary that only crosses a tile edge, or a shared vertex, is
+    # not enough.
+
+    # Parameters
+    # piece, shape - arcpy polygons in WGS84
+    # edgeZone - polygon of the tile edges buffered by tileEdgeTolerance
+
+    # Returns
+    # This function returns True if the polygons should be merged.
+
+    if piece.disjoint(shape):
+        return False
+    if piece.intersect(shape,4).area > 0:
+        return True
+    sharedBoundary = piece.intersect(shape,2)
+    if sharedBoundary.length == 0:
+        return False
+    return sharedBoundary.intersect(edgeZone,2).length > 4 * tileEdgeTolerance
+
+# ==============================================================================================================================
+def getSSURGOgeometryTiles(aoiTiles,timeStamp):
+    # Description
+    # This function requests the clipped SSURGO mapunit polygons of every AOI tile from SDA
+    # concurrently (maxSDAWorkers at a time) and merges them.  Polygons returned by more than
+    # one tile are kept once, and the pieces of a polygon that were cut apart by a tile edge
+    # are put back together.  Polygons of the same mapunit that only touch away from the tile
+    # edges are kept apart, as they are in a single request.
+
+    # Parameters
+    # aoiTiles - list of closed coordinate rings from getAOItiles
+    # timeStamp - time stamp written to the query headers
+
+    # Returns
+    # This function returns a dictionary in the same form as the SDA response to a single
+    # geometry query: {"Table": [column names, column info, rows...]}, or an empty
+    # dictionary if no mapunits were found.
+    # This function returns False if any tile request failed.
+
+    with ThreadPoolExecutor(max_workers=maxSDAWorkers) as executor:
+        tileResults = list(executor.map(lambda coorStr: submitSDAquery(compileGeometryQuery(coorStr,timeStamp)),aoiTiles))
+
+    if not all(isinstance(result,dict) for result in tileResults):
+        AddMsgAndPrint(".\nFailed to get SSURGO geometry for one or more AOI tiles",2)
+        return False
+
+    tables = [result["Table"] for result in tileResults if "Table" in result]
+    if not tables:
+        return {}
+
+    try:
+        # Group the polygon WKT of every tile by mapunit record; dict keys drop exact duplicates
+        wgs84 = arcpy.SpatialReference(4326)
+        mapunitPolygons = dict()
+
+        # Band around the tile edges, where SDA cut the polygons apart
+        tileEdges = None
+        for coorStr in aoiTiles:
+            corners = [arcpy.Point(*[float(c) for c in corner.split()]) for corner in coorStr.split(",")]
+            edge = arcpy.Polygon(arcpy.Array(corners),wgs84).boundary()
+            tileEdges = edge if tileEdges is None else tileEdges.union(edge)
+        edgeZone = tileEdges.buffer(tileEdgeTolerance)
+        for table in tables:
+            for rec in table[2:]:
+                mapunitPolygons.setdefault(tuple(rec[:-1]),dict())[rec[-1]] = None
+
+        queryData = [tables[0][0], tables[0][1]]
+        for attributes, polygons in mapunitPolygons.items():
+            pieces = list()
+            for wkt in polygons:
+                shape = arcpy.FromWKT(wkt,wgs84)
+
+                # Merge the polygon with the pieces it overlaps (tiles of overlapping AOI parts) or
+                # shares a boundary with along a tile edge
+                for piece in [piece for piece in pieces if isTileEdgePiece(piece,shape,edgeZone)]:
+                    pieces.remove(piece)
+                    shape = shape.union(piece)
+                pieces.append(shape)
+
+            for piece in pieces:
+                queryData.append(list(attributes) + [piece.WKT])
+
+        return {"Table": queryData}
+
+    except:
+        errorMsg()
+        return False
+
+# ==============================================================================================================================
+def getSurveyAreaPolygons(areaSym):
+    # Description
+    # This function downloads the mapunit polygons of a survey area from Soil Data Access in
+    # pages of cachePageSize polygons, ordered by mupolygonkey, so that no single request
+    # runs into the SDA response size or timeout limits of a large survey area.
+
+    # Parameters
+    # areaSym - areasymbol of the survey area
+
+    # Returns
+    # This function returns a list of [mukey, WGS84 WKT] rows, or False if a page could
+    # not be downloaded.
+
+    polygons = list()
+    lastKey = 0
+    while True:
+        polyQuery = "SELECT TOP " + str(cachePageSize) + " mupolygonkey, mukey, mupolygongeo.STAsText() AS geom\n"\
+        " FROM mupolygon WHERE areasymbol = '" + areaSym + "' AND mupolygonkey > " + str(lastKey) + "\n"\
+        " ORDER BY mupolygonkey"
+
+        # SDA returns an empty document for a page without rows
+        polyData = submitSDAquery(polyQuery)
+        if not isinstance(polyData,dict):
+            return False
+
+        rows = polyData.get("Table",[])[2:]
+        polygons.extend([[row[1],row[2]] for row in rows])
+        if len(rows) < cachePageSize:
+            return polygons
+        lastKey = int(rows[-1][0])
+
+# ==============================================================================================================================
+def getSSURGOgeometryFromCache(aoiWKT):
+    # Description
+    # This function returns the SSURGO mapunit polygons under the AOI from the local mapunit
+    # geometry cache (wetland_ssurgo_cache), clipped to the AOI.  Soil Data Access is only
+    # asked for the spatial version of the survey areas under the AOI and for the current
+    # mapunit attributes.  A survey area that is not cached, or was cached at an older spatial
+    # version, is downloaded from SDA and cached first.
+
+    # Parameters
+    # aoiWKT - WKT polygon of the AOI in WGS84
+
+    # Returns
+    # This function returns a dictionary in the same form as the SDA response to the
+    # GetClippedMapunits query: {"Table": [column names, column info, rows...]} with the
+    # polygon WKT as the last column.
+    # This function returns False if SDA could not be reached or a survey area could not be
+    # cached.  The caller then falls back to having SDA clip the mapunits.
+
+    try:
+        # Survey areas under the AOI and their current spatial version
+        areaQuery = "SELECT S.areasymbol, S.spatialversion\n"\
+        " FROM SDA_Get_Areasymbol_from_intersection_with_WktWgs84('" + aoiWKT + "') AS A\n"\
+        " INNER JOIN saspatialver AS S ON A.areasymbol = S.areasymbol"
+
+        qData = submitSDAquery(areaQuery)
+        if not qData or "Table" not in qData:
+            return False
+
+        surveyAreas = dict([(row[0],row[1]) for row in qData["Table"][2:]])
+
+        # Download any survey area that isn't cached at its current spatial version
+        for areaSym, spatialVer in surveyAreas.items():
+            if isSurveyAreaCached(areaSym,spatialVer):
+                continue
+
+            AddMsgAndPrint(".\nCaching SSURGO mapunit polygons for " + areaSym + " (spatial version " + str(spatialVer) + ")")
+            polygons = getSurveyAreaPolygons(areaSym)
+            if polygons is False:
+                AddMsgAndPrint(".\nCould not download the mapunit polygons of " + areaSym + ". Soil Data Access will clip the mapunits instead",1)
+                return False
+            cacheSurveyArea(areaSym,spatialVer,polygons)
+
+        # Clip the cached polygons to the AOI
+        AddMsgAndPrint(".\nClipping cached SSURGO mapunit polygons to the AOI")
+        aoiPolygon = arcpy.FromWKT(aoiWKT,arcpy.SpatialReference(4326))
+        polygons = clipSurveyAreas(list(surveyAreas),aoiPolygon)
+        if not polygons:
+            return False
+
+        # Mapunit attributes and versions, current as of today's tabular version
+        keys = ",".join(set([str(mukey) for mukey, wkt in polygons]))
+        attQuery = "SELECT L.areasymbol, M.musym, M.muname, M.mukey AS mukey,\n"\
+        " SA.saversion, CONVERT(varchar(10), [SA].[saverest], 126) AS surveyareadate,\n"\
+        " S.spatialversion, CONVERT(varchar(10), [S].[spatialverest], 126) AS spatialdate,\n"\
+        " T.tabularversion, CONVERT(varchar(10), [T].[tabularverest], 126) AS tabulardate\n"\
+        " FROM mapunit M\n"\
+        " INNER JOIN legend L ON M.lkey = L.lkey\n"\
+        " INNER JOIN sacatalog AS SA ON L.areasymbol = SA.areasymbol\n"\
+        " INNER JOIN saspatialver AS S ON L.areasymbol = S.areasymbol\n"\
+        " INNER JOIN satabularver AS T ON L.areasymbol = T.areasymbol\n"\
+        " WHERE M.mukey IN (" + keys + ")"
+
+        attData = submitSDAquery(attQuery)
+        if not attData or "Table" not in attData:
+            return False
+
+        attTable = attData["Table"]
+        mukeyAttributes = dict([(str(row[3]),row) for row in attTable[2:]])
+
+        # Same layout as the GetClippedMapunits response; the geometry column info is dropped by the caller
+        queryData = [attTable[0] + ['geom'], attTable[1] + ['']]
+        for mukey, wkt in polygons:
+            if mukey in mukeyAttributes:
+                queryData.append(mukeyAttributes[mukey] + [wkt])
+
+        return {"Table": queryData}
+
+    except:
+        errorMsg()
+        return False
+
 # ==============================================================================================================================
 def updateMetadataDescription(ssurgoProperty,layerPath):
 
@@ -565,31 +872,65 @@ vegetation."}
             AddMsgAndPrint(".\t.\tCould not update metadata description for " + ssurgoProperty)
             return False
 
-        # Update Metadata description for the SSURGO_WCT layer
+        # Queue the description for the SSURGO_WCT layer; writeLayerMetadata appends it to the layer description
+        layerMetadata.setdefault(layerPath,dict()).setdefault('propertyDescriptions',list()).append((ssurgoProperty,propertyDescriptionDict[ssurgoProperty]))
+        return True
+
+    except:
+        errorMsg()
+        return False
+
+# ==============================================================================================================================
+def writeLayerMetadata(layerPath):
+
+    # Description:
+    # Writes the metadata edits gathered in layerMetadata for a layer: the basic metadata set by
+    # getSSURGOgeometryFromSDA and the property descriptions queued by updateMetadataDescription.
+    # The layer metadata is loaded, updated and saved once instead of once per edit.
+
+    try:
+
+        pendingMetadata = layerMetadata.pop(layerPath,None)
+        if not pendingMetadata:
+            return True
+
+        propertyDescriptions = pendingMetadata.pop('propertyDescriptions',list())
+
         lyrMetadata = md.Metadata(layerPath)
 
         if not lyrMetadata.isReadOnly:
+            AddMsgAndPrint(".\nUpdating Metadata for " + layerPath)
 
-            lyrDescription = lyrMetadata.description
             updatedMetadata = md.Metadata()           # New metadata
 
             # preserve existing metadata by coping all elements into new one
             updatedMetadata.copy(lyrMetadata)
 
-            # Append to current description if currently populated
-            if lyrDescription is None or len(str(lyrDescription)) < 1:
-                updatedMetadata.description = propertyDescriptionDict[ssurgoProperty]
-            else:
-                updatedMetadata.description = lyrDescription + "\n" + (77 * "-") + "\n" + propertyDescriptionDict[ssurgoProperty]
+            # Basic metadata replaces the existing elements
+            for element, value in pendingMetadata.items():
+                setattr(updatedMetadata, element, value)
+
+            # Append each property description to the description if currently populated
+            lyrDescription = pendingMetadata.get('description',lyrMetadata.description)
+            for ssurgoProperty, propertyDescription in propertyDescriptions:
+                if lyrDescription is None or len(str(lyrDescription)) < 1:
+                    lyrDescription = propertyDescription
+                else:
+                    lyrDescription = lyrDescription + "\n" + (77 * "-") + "\n" + propertyDescription
+            updatedMetadata.description = lyrDescription
 
             lyrMetadata.copy(updatedMetadata)
             lyrMetadata.save()
-            arcpy.SetProgressorLabel("Successfully updated metadata for " + ssurgoProperty)
-            AddMsgAndPrint(".\t.\tSuccessfully updated metadata for " + ssurgoProperty)
+
+            for ssurgoProperty, propertyDescription in propertyDescriptions:
+                AddMsgAndPrint(".\t.\tSuccessfully updated metadata for " + ssurgoProperty)
+            arcpy.SetProgressorLabel("Successfully updated metadata for " + os.path.basename(layerPath))
             return True
 
         else:
-            AddMsgAndPrint(".\t.\tMetadata is Read-only.  Could not update Description metadata for: " + ssurgoProperty,1)
+            for ssurgoProperty, propertyDescription in propertyDescriptions:
+                AddMsgAndPrint(".\t.\tMetadata is Read-only.  Could not update Description metadata for: " + ssurgoProperty,1)
+            return False
 
     except:
         errorMsg()
@@ -642,73 +983,49 @@ def compileSQLquery(ssurgoProperty,aggregationMethod,mukeyList):
         # Table using the 'Dominant Condition' aggregation method and only returning
         # ecological class names that pertain to the the NRCS classification type
         if aggregationMethod == 'coecoclass':
+            # Sum the component percentages of each ecological class value in a mapunit and keep
+            # the value(s) with the largest sum.  The largest sum is a windowed MAX over the
+            # grouped sums, so this is one statement without temp tables.
             # If you want to see the sum of the components and the maximum sum of the components
-            # substitute the following SELECT statement with the last SELECT statement
-            # " SELECT #domcondition.areasymbol, #domcondition.mukey, #domcondition.musym, #domcondition.sumofcomppct_r, #domcondition2.maxsumofcomppct_R, #domcondition." + ssurgoFld + "\n"\
+            # add dc.sumofcomppct_r, dc.maxsumofcomppct_R to the outer SELECT statement
 
-            pQry = "SELECT areasymbol, mapunit.mukey, musym, SUM(comppct_r) as sumofcomppct_r, " + ssurgoFld + "\n"\
-            " INTO #domcondition\n"\
+            pQry = "SELECT dc.areasymbol, dc.mukey, dc.musym, dc." + ssurgoFld + "\n"\
+            " FROM (SELECT areasymbol, mapunit.mukey, musym, " + ssurgoFld + ", SUM(comppct_r) as sumofcomppct_r,\n"\
+            " MAX(SUM(comppct_r)) OVER (PARTITION BY mapunit.mukey) as maxsumofcomppct_R\n"\
             " FROM legend\n"\
             " JOIN mapunit on mapunit.lkey = legend.lkey\n"\
             " AND mapunit.mukey IN (" + keys + ")\n"\
             " JOIN component on component.mukey = mapunit.mukey\n"\
             " LEFT OUTER JOIN coecoclass ON component.cokey = coecoclass.cokey\n"\
             " AND ecoclasstypename LIKE 'NRCS%'\n"\
-            " GROUP BY  areasymbol, mapunit.mukey, musym, " + ssurgoFld + "\n"\
-            " order by areasymbol, musym, mapunit.mukey\n"\
-            " SELECT areasymbol, mukey, musym, max(sumofcomppct_r) as maxsumofcomppct_R\n"\
-            " INTO #domcondition2\n"\
-            " from #domcondition\n"\
-            " GROUP BY areasymbol,mukey, musym\n"\
-            " SELECT #domcondition.areasymbol, #domcondition.mukey, #domcondition.musym, #domcondition." + ssurgoFld + "\n"\
-            " FROM #domcondition\n"\
-            " JOIN #domcondition2 on #domcondition2.maxsumofcomppct_R = #domcondition.sumofcomppct_r AND #domcondition.mukey = #domcondition2.mukey\n"\
-            " order by  #domcondition.areasymbol,#domcondition.musym, #domcondition.mukey\n"\
+            " GROUP BY  areasymbol, mapunit.mukey, musym, " + ssurgoFld + ") AS dc\n"\
+            " WHERE dc.sumofcomppct_r = dc.maxsumofcomppct_R\n"\
+            " order by  dc.areasymbol, dc.musym, dc.mukey\n"\
 
         # This is for Jason Nemecek's
         elif aggregationMethod == 'By Component':
-            pQry = "SELECT areasymbol, musym, muname, mu.mukey/1  AS mukey,\n"\
-            " (SELECT TOP 1 COUNT_BIG(*)\n"\
-            " FROM mapunit\n"\
-            " INNER JOIN component ON component.mukey=mapunit.mukey AND mapunit.mukey = mu.mukey) AS comp_count,\n"\
-            " (SELECT TOP 1 COUNT_BIG(*)\n"\
-            " FROM mapunit\n"\
-            " INNER JOIN component ON component.mukey=mapunit.mukey AND mapunit.mukey = mu.mukey\n"\
-            " AND majcompflag = 'Yes') AS count_maj_comp,\n"\
-            " (SELECT TOP 1 COUNT_BIG(*)\n"\
-            " FROM mapunit\n"\
-            " INNER JOIN component ON component.mukey=mapunit.mukey AND mapunit.mukey = mu.mukey\n"\
-            " AND hydricrating = 'Yes' ) AS all_hydric,\n"\
-            " (SELECT TOP 1 COUNT_BIG(*)\n"\
-            " FROM mapunit\n"\
-            " INNER JOIN component ON component.mukey=mapunit.mukey AND mapunit.mukey = mu.mukey\n"\
-            " AND majcompflag = 'Yes' AND hydricrating = 'Yes') AS maj_hydric,\n"\
-            " (SELECT TOP 1 COUNT_BIG(*)\n"\
-            " FROM mapunit\n"\
-            " INNER JOIN component ON component.mukey=mapunit.mukey AND mapunit.mukey = mu.mukey\n"\
-            " AND majcompflag = 'Yes' AND hydricrating != 'Yes') AS maj_not_hydric,\n"\
-            " (SELECT TOP 1 COUNT_BIG(*)\n"\
-            " FROM mapunit\n"\
-            " INNER JOIN component ON component.mukey=mapunit.mukey AND mapunit.mukey = mu.mukey\n"\
-            " AND majcompflag != 'Yes' AND hydricrating  = 'Yes' ) AS hydric_inclusions,\n"\
-            " (SELECT TOP 1 COUNT_BIG(*)\n"\
-            " FROM mapunit\n"\
-            " INNER JOIN component ON component.mukey=mapunit.mukey AND mapunit.mukey = mu.mukey\n"\
-            " AND hydricrating  != 'Yes') AS all_not_hydric,\n"\
-            " (SELECT TOP 1 COUNT_BIG(*)\n"\
-            " FROM mapunit\n"\
-            " INNER JOIN component ON component.mukey=mapunit.mukey AND mapunit.mukey = mu.mukey\n"\
-            " AND hydricrating  IS NULL ) AS hydric_null\n"\
-            " INTO #main_query\n"\
-            " FROM legend AS l\n"\
-            " INNER JOIN  mapunit AS mu ON mu.lkey = l.lkey AND mu.mukey IN (" + keys + ")\n"\
-            " SELECT  areasymbol, musym, muname, mukey,\n"\
+            # Component counts of each mapunit from one pass over its components using
+            # conditional aggregation (one GROUP BY) instead of a subquery per count.  Mapunits
+            # without components keep a row of nulls from the outer join, which counts as nothing.
+            pQry = "SELECT areasymbol, musym, muname, mukey,\n"\
             " CASE WHEN comp_count = all_not_hydric + hydric_null THEN  'Nonhydric'\n"\
             " WHEN comp_count = all_hydric  THEN 'Hydric'\n"\
             " WHEN comp_count != all_hydric AND count_maj_comp = maj_hydric THEN 'Predominantly Hydric'\n"\
             " WHEN hydric_inclusions >= 0.5 AND  maj_hydric < 0.5 THEN  'Predominantly Nonydric'\n"\
             " WHEN maj_not_hydric >= 0.5  AND  maj_hydric >= 0.5 THEN 'Partially Hydric' ELSE 'Error' END AS hydric_rating\n"\
-            " FROM #main_query\n"\
+            " FROM (SELECT areasymbol, musym, muname, mu.mukey/1  AS mukey,\n"\
+            " COUNT(c.cokey) AS comp_count,\n"\
+            " SUM(CASE WHEN majcompflag = 'Yes' THEN 1 ELSE 0 END) AS count_maj_comp,\n"\
+            " SUM(CASE WHEN hydricrating = 'Yes' THEN 1 ELSE 0 END) AS all_hydric,\n"\
+            " SUM(CASE WHEN majcompflag = 'Yes' AND hydricrating = 'Yes' THEN 1 ELSE 0 END) AS maj_hydric,\n"\
+            " SUM(CASE WHEN majcompflag = 'Yes' AND hydricrating != 'Yes' THEN 1 ELSE 0 END) AS maj_not_hydric,\n"\
+            " SUM(CASE WHEN majcompflag != 'Yes' AND hydricrating = 'Yes' THEN 1 ELSE 0 END) AS hydric_inclusions,\n"\
+            " SUM(CASE WHEN hydricrating != 'Yes' THEN 1 ELSE 0 END) AS all_not_hydric,\n"\
+            " SUM(CASE WHEN c.cokey IS NOT NULL AND hydricrating IS NULL THEN 1 ELSE 0 END) AS hydric_null\n"\
+            " FROM legend AS l\n"\
+            " INNER JOIN  mapunit AS mu ON mu.lkey = l.lkey AND mu.mukey IN (" + keys + ")\n"\
+            " LEFT OUTER JOIN component AS c ON c.mukey = mu.mukey\n"\
+            " GROUP BY areasymbol, musym, muname, mu.mukey) AS main_query\n"\
 
 
         elif aggregationMethod == 'comonth':
@@ -1052,7 +1369,7 @@ def lookupSSURGOFieldName(ssurgoProperty,returnAlias=False):
         errorMsg()
 
 # ==============================================================================================================================
-def addSSURGOpropertyFld(layer, fldNames, fldInfo):
+def addSSURGOpropertyFld(layer, fldNames, fldInfo, fldAliases=None):
 
     try:
 ##        AddMsgAndPrint(str(fldNames),1)
@@ -1087,11 +1404,13 @@ def addSSURGOpropertyFld(layer, fldNames, fldInfo):
         if arcpy.Exists(layer):
 
             layerFlds = [f.name.lower() for f in arcpy.ListFields(layer,"*")]
+            fldDescriptions = list()  # [name, type, alias, length] of every field to add in one AddFields call
 
             for i, fldName in enumerate(fldNames):
 
                 if fldName.lower() in layerFlds:
                     continue
+                layerFlds.append(fldName.lower())
 
                 vals = fldInfo[i].split(",")
                 length = int(vals[1].split("=")[1])
@@ -1104,7 +1423,12 @@ def addSSURGOpropertyFld(layer, fldNames, fldInfo):
                     dataType = 'text'
                     length = 30
 
-                arcpy.AddField_management(layer, fldName, dataType, precision, scale, length)
+                # Precision and scale are not used by file geodatabase fields
+                fldAlias = fldAliases.get(fldName) if fldAliases else None
+                fldDescriptions.append([fldName, dataType.upper(), fldAlias or fldName, length if dataType == 'text' else ''])
+
+            if fldDescriptions:
+                arcpy.management.AddFields(layer, fldDescriptions)
 
         else:
             AddMsgAndPrint(".\n" + str(layer) + " Does Not Exist.  Could not add fields",2)
@@ -1117,21 +1441,19 @@ def addSSURGOpropertyFld(layer, fldNames, fldInfo):
         return False
 
 # ==============================================================================================================================
-def getSDATabularRequest(sqlQuery,layerPath):
+def submitSDAquery(sqlQuery):
     # Description
-    # This function sends an SQL query to Soil Data Access and appends the results to a
-    # layer.
+    # This function sends an SQL query to Soil Data Access and returns the result tables.
+    # A query made up of several SELECT statements returns one table per statement,
+    # named 'Table', 'Table1', 'Table2'...
 
     # Parameters
     # sqlQuery - A valid SDA SQL statement in ascii format
-    # layerPath - Directory path to an existing spatial layer or table where the SDA results
-    #             will be appended to.  The field names returned in the metadata portion
-    #             of the JSON request will automatically be added to the layer
 
     # Returns
-    # This function returns True if SDA results were successfully appended to the input
-    # layer.  False otherwise.
-    # Return Flase if an HTTP Error occurred such as a bad query, server timeout or no
+    # This function returns a dictionary of result tables.  Each table is a list of lists;
+    # the first list is the column names and the second is the column info.
+    # Return False if an HTTP Error occurred such as a bad query, server timeout or no
     # response from server
 
     try:
@@ -1147,103 +1469,170 @@ def getSDATabularRequest(sqlQuery,layerPath):
         request["format"] = "JSON+COLUMNNAME+METADATA"
         request["query"] = sqlQuery
 
-        #json.dumps = serialize obj (request dictionary) to a JSON formatted str
-        data = json.dumps(request)
+        # Send request to SDA Tabular service as a POST over the shared keep-alive connection
+        # and convert the returned JSON string into a Python dictionary.
+        responseStatus, qData = postJSON(url, request, idempotent=True)
 
-        # Send request to SDA Tabular service using urllib library
-        # because we are passing the "data" argument, this is a POST request, not a GET
+        return qData
 
-        # ArcMap Request
-        #req = urllib.Request(url, data)
-        #response = urllib.urlopen(req)
+    except socket.timeout as e:
+        AddMsgAndPrint('.\nSoil Data Access timeout error',2)
+        return False
 
-        # ArcPro Request
-        data = data.encode('ascii')
-        response = urllib.request.urlopen(url,data)
+    except socket.error as e:
+        AddMsgAndPrint('.\nSocket error: ' + str(e),2)
+        return False
 
-        # read query results
-        queryResults = response.read()
+    except HTTPError as e:
+        AddMsgAndPrint('.\nHTTP Error' + str(e),2)
+        return False
 
-        # Convert the returned JSON string into a Python dictionary.
-        qData = json.loads(queryResults)
+    except URLError as e:
+        AddMsgAndPrint('.\nURL Error' + str(e),2)
+        return False
 
-        # if dictionary key "Table" is found
-        if "Table" in qData:
+    except:
+        errorMsg()
+        return False
 
-            # extract 'Data' List from dictionary to create list of lists
-            queryData = qData["Table"]
+# ==============================================================================================================================
+def getSDATabularBatch(sqlQueries,propertyFldNames):
+    # Description
+    # This function sends several SQL queries to Soil Data Access in a single request and
+    # splits the returned tables ('Table', 'Table1', ...) back out per query.  Only queries
+    # that do not create temp tables (#table) can share a request.
+
+    # Parameters
+    # sqlQueries - list of SDA SQL statements
+    # propertyFldNames - the SSURGO field name of the property each query returns.  It is
+    #                    the last column of that query's table and is used to check that
+    #                    every table came back in order.
+
+    # Returns
+    # This function returns a list with the result table of each query, in the order of
+    # sqlQueries.  If the tables cannot be matched to the queries the queries are sent one
+    # at a time instead, and a failed query returns None.
+
+    qData = submitSDAquery(";\n".join(sqlQueries))
+    tableNames = ["Table"] + ["Table" + str(i) for i in range(1,len(sqlQueries))]
+
+    if qData and all(name in qData for name in tableNames) and len(qData) == len(tableNames):
+        tables = [qData[name] for name in tableNames]
+        if [table[0][-1].lower() for table in tables] == [fld.lower() for fld in propertyFldNames]:
+            return tables
+
+    # An empty or failed statement shifts or drops the tables; send the queries individually
+    if len(sqlQueries) > 1:
+        AddMsgAndPrint(".\nCombined Soil Data Access request could not be split by property.  Sending queries individually",1)
+
+    tables = []
+    for sqlQuery in sqlQueries:
+        qData = submitSDAquery(sqlQuery)
+        tables.append(qData["Table"] if qData and "Table" in qData else None)
+    return tables
+
+# ==============================================================================================================================
+def joinSDATables(queryTables,layerPath):
+    # Description
+    # This function joins the result tables of one or more SDA property queries to a layer
+    # by mukey.  The new fields of every table are added in one AddFields call and all
+    # property values are written in a single UpdateCursor pass.
+
+    # Parameters
+    # queryTables - list of SDA result tables (list of lists) with column names and column
+    #               info as the first 2 lists.  The property of interest is the last column.
+    #               When 2 tables return the same property field, the later table wins.
+    # layerPath - Directory path to an existing spatial layer or table where the SDA results
+    #             will be appended to.  The field names returned in the metadata portion
+    #             of the JSON request will automatically be added to the layer
+
+    # Returns
+    # This function returns True if SDA results were successfully appended to the input
+    # layer.  False otherwise.
 
-##            # remove the column names and column info lists from propRes list above
-##            # Last element represents info for specific property
-##            # [u'areasymbol', u'musym', u'muname', u'mukey', u'drainagecl']
-##            # [u'ColumnOrdinal=0,ColumnSize=20,NumericPrecision=255,NumericScale=255,ProviderType=VarChar,IsLong=False,ProviderSpecificDataType=System.Data.SqlTypes.SqlString,DataTypeName=varchar',
-##            columnNames = list()   # ['drainagecl']
-##            columnInfo = list()
-##            columnNames.append(propRes.pop(0)[-1])
-##            columnInfo.append(propRes.pop(0)[-1])
-
-            columnNames = queryData.pop(0)       # Isolate column names and remove from queryData
-            columnInfo = queryData.pop(0)        # Isolate column info and remove from queryData
+    try:
+        fldNames = list()       # every column of every table, in order
+        fldInfo = list()
+        fldAliases = dict()     # property field name: expanded SSURGO name
+        propertyFlds = list()   # property field of each table, i.e. 'drainagecl'
+        propertyDicts = list()  # {mukey: property value} of each property field
+
+        for queryData in queryTables:
+
+            # [u'areasymbol', u'musym', u'muname', u'mukey', u'drainagecl']
+            # [u'ColumnOrdinal=0,ColumnSize=20,NumericPrecision=255,NumericScale=255,ProviderType=VarChar,IsLong=False,ProviderSpecificDataType=System.Data.SqlTypes.SqlString,DataTypeName=varchar',
+            columnNames = queryData[0]
+            columnInfo = queryData[1]
             mukeyIndex = columnNames.index('mukey') # list index of where 'mukey' is found
-            propertyIndex = len(columnNames) -1     # list index of where property of interest is found; normally last place
-            propertyFldName = columnNames[propertyIndex] # SSURGO field name of the property of interest
+            propertyFldName = columnNames[-1]       # SSURGO field name of the property of interest; normally last place
 
-            # Add fields in columnNames to layerPath
-            if not addSSURGOpropertyFld(layerPath, columnNames, columnInfo):
-                return False
+            for fldName, info in zip(columnNames, columnInfo):
+                if fldName not in fldNames:
+                    fldNames.append(fldName)
+                    fldInfo.append(info)
 
             # Get the expanded SSURGO field name of the property of interest
             fieldAlias = lookupSSURGOFieldName(propertyFldName,returnAlias=True)
-
-            # Update the field alias if possible
             if fieldAlias:
-                arcpy.AlterField_management(layerPath,propertyFldName,"#",fieldAlias)
-
-            # rearrange queryData list into a dictionary of lists with the
-            # mukey as key and tabular info as a list of values.  This will be used
-            # in the UpdateCursor to lookup tabular info by MUKEY
-            # '455428': [u'MN161','L110E','Lester-Ridgeton complex, 18 to 25 percent slopes','B']
-            propertyDict = dict()
+                fldAliases[propertyFldName] = fieldAlias
 
-            for item in queryData:
-                propertyDict[item[mukeyIndex]] = item
+            # '455428': 'B'
+            propertyDict = dict([(row[mukeyIndex], row[-1]) for row in queryData[2:]])
 
-            # columnNames = [u'areasymbol', u'musym', u'muname', u'mukey', u'drainagecl']
-            with arcpy.da.UpdateCursor(layerPath, columnNames) as cursor:
-                for row in cursor:
-                    mukey = row[mukeyIndex]
+            if propertyFldName in propertyFlds:
+                propertyDicts[propertyFlds.index(propertyFldName)] = propertyDict
+            else:
+                propertyFlds.append(propertyFldName)
+                propertyDicts.append(propertyDict)
 
-                    # lookup property info by MUKEY; Only update the property of interest
-                    # No need to keep updating fields such as areasymbol, musym....etc
-                    propertyVal = propertyDict[mukey][propertyIndex]
-                    row[propertyIndex] = propertyVal
+        # Add fields in columnNames to layerPath
+        if not addSSURGOpropertyFld(layerPath, fldNames, fldInfo, fldAliases):
+            return False
 
-                    cursor.updateRow(row)
+        # Update the alias of property fields that were already in the layer
+        for fld in arcpy.ListFields(layerPath):
+            if fld.name in fldAliases and fld.aliasName != fldAliases[fld.name]:
+                arcpy.AlterField_management(layerPath,fld.name,"#",fldAliases[fld.name])
 
-            return True
+        # lookup property info by MUKEY; Only update the properties of interest
+        # No need to keep updating fields such as areasymbol, musym....etc
+        with arcpy.da.UpdateCursor(layerPath, ['mukey'] + propertyFlds) as cursor:
+            for row in cursor:
+                mukey = row[0]
+                cursor.updateRow([mukey] + [propertyDict.get(mukey) for propertyDict in propertyDicts])
 
-        else:
-            AddMsgAndPrint(".\nFailed to get tabular data (getSDATabularRequest)",2)
-            return False
+        return True
 
-    except socket.timeout as e:
-        AddMsgAndPrint('.\nSoil Data Access timeout error',2)
+    except:
+        errorMsg()
         return False
 
-    except socket.error as e:
-        AddMsgAndPrint('.\nSocket error: ' + str(e),2)
-        return False
+# ==============================================================================================================================
+def getSDATabularRequest(sqlQuery,layerPath):
+    # Description
+    # This function sends an SQL query to Soil Data Access and appends the results to a
+    # layer.
 
-    except HTTPError as e:
-        AddMsgAndPrint('.\nHTTP Error' + str(e),2)
-        return False
+    # Parameters
+    # sqlQuery - A valid SDA SQL statement in ascii format
+    # layerPath - Directory path to an existing spatial layer or table where the SDA results
+    #             will be appended to.  The field names returned in the metadata portion
+    #             of the JSON request will automatically be added to the layer
 
-    except URLError as e:
-        AddMsgAndPrint('.\nURL Error' + str(e),2)
-        return False
+    # Returns
+    # This function returns True if SDA results were successfully appended to the input
+    # layer.  False otherwise.
+    # Return Flase if an HTTP Error occurred such as a bad query, server timeout or no
+    # response from server
 
-    except:
-        errorMsg()
+    qData = submitSDAquery(sqlQuery)
+
+    # if dictionary key "Table" is found
+    if qData and "Table" in qData:
+        return joinSDATables([qData["Table"]],layerPath)
+
+    else:
+        AddMsgAndPrint(".\nFailed to get tabular data (getSDATabularRequest)",2)
         return False
 
 # ==============================================================================================================================
@@ -1270,13 +1659,13 @@ def AddSSURGOLayersToArcGISPro(ssurgoFC,listOfProperties):
             # heading must be populated.  For the SSURGO_WCT Tool, the group heading
             # name used was the Field Alias Name of the renderer field.
             fieldAlias = ""
-            if rendererFld[0] in [f.name for f in arcpy.ListFields(ssurgoFC)]:
-                fieldAlias = [f.aliasName for f in arcpy.ListFields(ssurgoFC,rendererFld[0] + "*")][0]
+            if rendererFld[0] in fcFieldAliases:
+                fieldAlias = fcFieldAliases[rendererFld[0]]
             else:
                 return None
 
             # These are the values found in the FC being symbolized
-            uniqueFCvalues = list(set([row[0] for row in arcpy.da.SearchCursor(ssurgoFC,rendererFld)]))
+            uniqueFCvalues = list(fcUniqueValues[rendererFld[0]])
 
             uniqueRendererValues = list() # list of unique values in the symbology renderer
             valuesToAdd = list()          # list of values that need to be added to renderer
@@ -1332,7 +1721,11 @@ def AddSSURGOLayersToArcGISPro(ssurgoFC,listOfProperties):
 
         # isolate the property names (remove aggregation method)
         propertyNames = [soilproperty.split('-')[0] for soilproperty in listOfProperties]
-        lyrxToAddToArcPro = []
+
+        # Layer definitions of the .lyrx files that will be added to ArcGIS Pro, combined into one layer document
+        layerDefinitions = []
+        binaryReferences = dict()
+        layerDocument = None
 
         # Update the connection properties for the .lyrx files that will be added to ArcGIS Pro
         for soilproperty in listOfProperties:
@@ -1344,20 +1737,29 @@ def AddSSURGOLayersToArcGISPro(ssurgoFC,listOfProperties):
 
             lyrxPath = os.path.join(scriptPath,"SSURGO_WCT_" + propName + "_" + aggMethod + ".lyrx")
 
-            if arcpy.Exists(lyrxPath):
-                lyrxObject = arcpy.mp.LayerFile(lyrxPath).listLayers()[0]  # create a layer object
+            if os.path.exists(lyrxPath):
+                lyrxDocument = readLyrxDefinition(lyrxPath)
+                if layerDocument is None:
+                    layerDocument = lyrxDocument
+
+                # Layer definitions of different .lyrx files can share the same URI
+                lyrxDefinition = lyrxDocument['layerDefinitions'][0]
+                lyrxDefinition['uRI'] = "CIMPATH=ssurgo_wct/" + propName.lower() + "_" + aggMethod.lower() + ".xml"
 
                 # Connection Property Dictionary
-                # {'dataset': 'SSURGO_WCT',
-                #  'workspace_factory': 'File Geodatabase',
-                #  'connection_info': {'database': 'E:\\python_scripts\\GitHub\\SSURGO_WCT\\Wetland_Workspace.gdb'}}
-                lyrxConnectProperties = lyrxObject.connectionProperties
+                # {'type': 'CIMStandardDataConnection',
+                #  'workspaceConnectionString': 'DATABASE=..\\..\\..\\Temp\\SSURGO_WCT.gdb',
+                #  'workspaceFactory': 'FileGDB',
+                #  'dataset': 'SSURGO_Mapunits', 'datasetType': 'esriDTFeatureClass'}
+                lyrxConnectProperties = lyrxDefinition['featureTable']['dataConnection']
 
                 # update CP dictionary database and dataset keys
-                lyrxConnectProperties['connection_info']['database'] = os.path.dirname(ssurgoFC)
+                lyrxConnectProperties['workspaceConnectionString'] = "DATABASE=" + os.path.dirname(ssurgoFC)
                 lyrxConnectProperties['dataset'] = os.path.basename(ssurgoFC)
-                lyrxObject.updateConnectionProperties(lyrxObject.connectionProperties,lyrxConnectProperties)
-                lyrxToAddToArcPro.append(lyrxObject)
+                layerDefinitions.append(lyrxDefinition)
+
+                for binaryReference in lyrxDocument.get('binaryReferences',[]):
+                    binaryReferences[binaryReference['uRI']] = binaryReference
 
             # The layer is missing a .lyrx.  Exception is Ecological class ID and Type
             else:
@@ -1365,6 +1767,51 @@ def AddSSURGOLayersToArcGISPro(ssurgoFC,listOfProperties):
                     AddMsgAndPrint('.\t' + soilproperty + " is missing .lyrx file",1)
                     AddMsgAndPrint('.\t' + str(lyrxPath),2)
 
+        if not layerDefinitions:
+            return
+
+        # Write the layers to one .lyrx in the scratch folder.  Each layer added to a group is placed
+        # on top, so the layers are listed in reverse to keep the order they were added in before.
+        layerDocument['layers'] = [lyrxDefinition['uRI'] for lyrxDefinition in reversed(layerDefinitions)]
+        layerDocument['layerDefinitions'] = layerDefinitions
+        layerDocument['binaryReferences'] = list(binaryReferences.values())
+        layerDocument.pop('elevationSurfaces',None)
+
+        ssurgoLayersPath = os.path.join(arcpy.env.scratchFolder,"SSURGO_WCT_Layers.lyrx")
+        with open(ssurgoLayersPath,'w',encoding='utf-8') as lyrxFile:
+            json.dump(layerDocument,lyrxFile)
+        ssurgoLayerFile = arcpy.mp.LayerFile(ssurgoLayersPath)
+
+        # Unique values of every renderer field, read from the SSURGO layer in one pass
+        fcFieldAliases = {f.name: f.aliasName for f in arcpy.ListFields(ssurgoFC)}
+        rendererFields = list()
+        for newLayer in ssurgoLayerFile.listLayers():
+            sym = newLayer.symbology
+            if hasattr(sym,'renderer') and sym.renderer.type == 'UniqueValueRenderer':
+                rendererFld = sym.renderer.fields[0]
+                if rendererFld in fcFieldAliases and not rendererFld in rendererFields:
+                    rendererFields.append(rendererFld)
+
+        fcUniqueValues = {fld: set() for fld in rendererFields}
+        if rendererFields:
+            with arcpy.da.SearchCursor(ssurgoFC,rendererFields) as cursor:
+                for row in cursor:
+                    for fld, val in zip(rendererFields,row):
+                        fcUniqueValues[fld].add(val)
+
+        # Update symbology for the SSURGO_WCT layers before they are added
+        for newLayer in ssurgoLayerFile.listLayers():
+            arcpy.SetProgressorLabel("Updating symbology for " + newLayer.name)
+            UpdateLyrxSymbology(newLayer)
+
+            # Turn off visibility for every layer except the SSURGO Mapunits layer
+            if not newLayer.name == "SSURGO Mapunits":
+                newLayer.showLabels = False
+                newLayer.transparency = 50
+                newLayer.visible = False
+
+        ssurgoLayerFile.save()
+
         aprx = arcpy.mp.ArcGISProject("CURRENT")
 
         # 'SSURGO Layers' group layer object
@@ -1372,36 +1819,22 @@ def AddSSURGOLayersToArcGISPro(ssurgoFC,listOfProperties):
         groupLayerObject = arcpy.mp.LayerFile(groupLayerPath).listLayers()[0]
         groupLayerName = groupLayerObject.longName  # 'SSURGO Layers'
 
-        # Boolean to determine if 'SSURGO Layers' group exists in ArcGIS Pro Session
-        bGroupLayerExists = False
-        bAddedLyrxFilesToPro = False
-
-        # This is the map object where the lyrx files were added to
+        # This is the map object and 'SSURGO Layers' group the lyrx files are added to
         mapObject = ""
+        mapGroupLayer = ""
 
-        # Add Layer to existing ArcGIS Pro 'SSURGO Layers' Group
+        # Look for an existing 'SSURGO Layers' Group in the ArcGIS Pro Session
         for map in aprx.listMaps():
             for mapLyr in map.listLayers():
-
-                # 'SSURGO Layers' group exists in Pro Session
-                # Add the layers in lyrxToAddToArcPro list to ArcPro
                 if mapLyr.longName == groupLayerName and mapLyr.isGroupLayer:
-                    bGroupLayerExists = True
                     mapObject = map
-
-                    for lyrx in lyrxToAddToArcPro:
-                        map.addLayerToGroup(mapLyr,lyrx)
-                        bAddedLyrxFilesToPro = True
-                        arcpy.SetProgressorLabel("Adding Layer to ArcGIS Pro: " + lyrx.name)
-                        #AddMsgAndPrint("Adding Layer to ArcGIS Pro: " + lyrx.name)
-
+                    mapGroupLayer = mapLyr
+                break
+            if mapObject:
                 break
-        del map
-
-        # Get existing group layer object
-        if not bGroupLayerExists:
 
-            # Add group layer to ArcGIS Pro Session
+        # Add group layer to ArcGIS Pro Session
+        if not mapObject:
             aprxMap = aprx.activeMap
             mapObject = aprxMap
             aprxMap.addLayer(groupLayerObject, 'TOP')
@@ -1409,46 +1842,130 @@ def AddSSURGOLayersToArcGISPro(ssurgoFC,listOfProperties):
             # Get added group layer
             mapGroupLayer = [lyr for lyr in aprxMap.listLayers(groupLayerName)][0]
 
-            # 'SSURGO Layers' group exists in Pro Session
-            # Add the layers in lyrxToAddToArcPro list to ArcPro
-            for lyrx in lyrxToAddToArcPro:
-                aprxMap.addLayerToGroup(mapGroupLayer,lyrx)
-                #map.addLayerToGroup(mapGroupLayer,lyrx)
-                bAddedLyrxFilesToPro = True
-                arcpy.SetProgressorLabel("Adding Layer to ArcGIS Pro: " + lyrx.name)
-                #AddMsgAndPrint("Adding Layer to ArcGIS Pro: " + lyrx.name)
+        # Add all of the SSURGO_WCT layers to the 'SSURGO Layers' group at once
+        arcpy.SetProgressorLabel("Adding Layers to ArcGIS Pro")
+        mapObject.addLayerToGroup(mapGroupLayer,ssurgoLayerFile)
 
-        # Update symbology for newly added SSURGO_WCT layers
-        aprx = arcpy.mp.ArcGISProject("CURRENT")
-        for lyr in mapObject.listLayers():
+    except:
+        errorMsg()
+        AddMsgAndPrint(".\nCouldn't Add Layers to your ArcGIS Pro Session",1)
+        pass
+
+# ==============================================================================================================================
+def readLyrxDefinition(lyrxPath):
+
+    # Description:
+    # Returns a copy of the parsed layer document of a .lyrx file.  The parsed documents are
+    # kept in lyrxDefinitions for the ArcGIS Pro session and read again only if the file changes.
+
+    lyrxModified = os.path.getmtime(lyrxPath)
+
+    if not lyrxPath in lyrxDefinitions or lyrxDefinitions[lyrxPath][0] != lyrxModified:
+        with open(lyrxPath,encoding='utf-8-sig') as lyrxFile:
+            lyrxDefinitions[lyrxPath] = (lyrxModified, json.load(lyrxFile))
+
+    return copy.deepcopy(lyrxDefinitions[lyrxPath][1])
+
+# ==============================================================================================================================
+def getSSURGOgeometryFromLocal(aoiWKT,localDatabase):
+    # Description
+    # This function returns the SSURGO mapunit polygons under the AOI from a local SSURGO
+    # database (SQLite export) instead of Soil Data Access.  The mupolygon feature class of the
+    # database is clipped to the AOI and the mapunit attributes are read from its tables.
+
+    # Parameters
+    # aoiWKT - WKT polygon of the AOI in WGS84
+    # localDatabase - path to the local SSURGO database
+
+    # Returns
+    # This function returns a dictionary in the same form as the SDA response to the
+    # GetClippedMapunits query: {"Table": [column names, column info, rows...]} with the
+    # polygon WKT as the last column.
+    # This function returns False if the database has no mupolygon feature class or no
+    # mapunits were found under the AOI.
+
+    try:
+        workspace = arcpy.env.workspace
+        arcpy.env.workspace = localDatabase
+        mupolygon = [fc for fc in arcpy.ListFeatureClasses() if fc.lower().endswith('mupolygon')]
+        arcpy.env.workspace = workspace
+        if not mupolygon:
+            AddMsgAndPrint(".\n" + localDatabase + " does not contain a mupolygon feature class",2)
+            return False
+
+        AddMsgAndPrint(".\nClipping SSURGO mapunit polygons from " + os.path.basename(localDatabase))
+        wgs84 = arcpy.SpatialReference(4326)
+        clipFC = "memory\\localMupolygon"
+        if arcpy.Exists(clipFC):
+            arcpy.Delete_management(clipFC)
+        arcpy.analysis.Clip(os.path.join(localDatabase,mupolygon[0]),arcpy.FromWKT(aoiWKT,wgs84),clipFC)
+
+        with arcpy.da.SearchCursor(clipFC,['mukey','SHAPE@WKT'],spatial_reference=wgs84) as rows:
+            polygons = [(str(mukey),wkt) for mukey, wkt in rows if wkt]
+        arcpy.Delete_management(clipFC)
+
+        if not polygons:
+            AddMsgAndPrint(".\nNo SSURGO mapunits were found under the AOI in " + os.path.basename(localDatabase),2)
+            return False
+
+        # Mapunit attributes and versions in the same columns the SDA query returns
+        attTable = mapunitAttributes(localDatabase,set([mukey for mukey, wkt in polygons]))
+        mukeyAttributes = dict([(row[3],row) for row in attTable[2:]])
 
-            # This is the 'SSURGO Layers' Group
-            # iterate through the nested layers and up
-            # the symbology
-            if lyr.longName == groupLayerName and lyr.isGroupLayer:
-                for newLayer in lyr.listLayers():
-                    UpdateLyrxSymbology(newLayer)
+        queryData = [attTable[0] + ['geom'], attTable[1] + ['']]
+        for mukey, wkt in polygons:
+            if mukey in mukeyAttributes:
+                queryData.append(mukeyAttributes[mukey] + [wkt])
 
-                    # Turn off visibility for every layer except the SSURGO Mapunits layer
-                    if not newLayer.name == "SSURGO Mapunits":
-                        newLayer.showLabels = False
-                        newLayer.transparency = 50
-                        newLayer.visible = False
+        return {"Table": queryData}
 
     except:
         errorMsg()
-        AddMsgAndPrint(".\nCouldn't Add Layers to your ArcGIS Pro Session",1)
-        pass
+        return False
 
+# ==============================================================================================================================
+def getLocalTabularData(soilProperty,aggregationMethod,mukeyList,localDatabase):
+    # Description
+    # This function computes a SSURGO property for a list of mapunits from a local SSURGO
+    # database with the same aggregation compileSQLquery would send to SDA.
+
+    # Parameters
+    # soilProperty - The name of the SSURGO Property, i.e. Hydric Rating
+    # aggregationMethod - 1 of the aggregation methods of compileSQLquery
+    # mukeyList - Python list of MUKEYs
+    # localDatabase - path to the local SSURGO database
+
+    # Returns
+    # This function returns a table in the same form as an SDA result table: a list of lists
+    # with the column names and column info as the first 2 lists.
+    # This function returns False if the property could not be computed.
+
+    try:
+        ssurgoFld = lookupSSURGOFieldName(soilProperty).strip()
+
+        # The horizon aggregations use the same depth range and min/max function as their SDA queries
+        if aggregationMethod in ('Weighted Average','Dominant Component (Numeric)'):
+            return aggregateProperty(localDatabase,ssurgoFld,aggregationMethod,mukeyList,topDepth=tDep,bottomDepth=bDep)
+        elif aggregationMethod == "Min\\Max":
+            return aggregateProperty(localDatabase,ssurgoFld,aggregationMethod,mukeyList,minMaxFunction=mmC)
+        else:
+            return aggregateProperty(localDatabase,ssurgoFld,aggregationMethod,mukeyList)
+
+    except:
+        errorMsg()
+        return False
 
 # ==============================================================================================================================
-def start(aoi,soilPropertyList,outputWS):
+def start(aoi,soilPropertyList,outputWS,localDatabase=None):
 
     # propertyList = ['Drainage Class - Dominant Condition',
     #                 'Hydric Condition - Dominant Condition',
     #                 'Hydric Rating - Dominant Condition',
     #                 'Hydrologic Group - Dominant Condition']
 
+    # localDatabase - optional local SSURGO database (SQLite export with a mupolygon feature class).
+    #                 When it is set the mapunits and properties come from it and SDA is not used.
+
     try:
 
         # --------------- This section is for Ecological Classification
@@ -1508,7 +2025,7 @@ def start(aoi,soilPropertyList,outputWS):
 
         # get SSURGO polgyons from SDA
         #outSSURGOlayer = r'E:\Temp\scratch.gdb\SSURGO_Mapunits'
-        outSSURGOlayer = getSSURGOgeometryFromSDA(aoi, outputWS, "SSURGO_Mapunits")
+        outSSURGOlayer = getSSURGOgeometryFromSDA(aoi, outputWS, "SSURGO_Mapunits", localDatabase)
 
         if not outSSURGOlayer:
             AddMsgAndPrint(".\nFailed to get SSURGO from Soil Data Access",2)
@@ -1516,8 +2033,15 @@ def start(aoi,soilPropertyList,outputWS):
 
         listOfMukeys = list(set([row[0] for row in arcpy.da.SearchCursor(outSSURGOlayer,["MUKEY"])]))
 
+        # Tabular version of the survey area of each mapunit; cached property values are only valid for this version
+        mukeyVersions = {row[0]: row[1] for row in arcpy.da.SearchCursor(outSSURGOlayer,["MUKEY","tabularversion"])}
+
         if listOfMukeys:
 
+            propertyQueries = list()  # [(soilproperty, aggMethod, theQuery)...] in the order of soilPropertyList
+            propertyCache = dict()    # index of propertyQueries: (cached column names and info, {mukey: cached rows})
+            propertyTables = dict()   # index of propertyQueries: result table
+
             for soilproperty in soilPropertyList:
 
                 propSplit = soilproperty.split('-')  # ['Hydric Classification Presence ', ' Mapunit Aggregate']
@@ -1528,9 +2052,73 @@ def start(aoi,soilPropertyList,outputWS):
                 #AddMsgAndPrint(soilproperty)
                 #AddMsgAndPrint(aggMethod)
 
-                theQuery = compileSQLquery(soilproperty,aggMethod,listOfMukeys)
+                # Offline mode: compute the property from the local SSURGO database
+                if localDatabase:
+                    AddMsgAndPrint(".\tComputing " + soilproperty + " - " + aggMethod + " from " + os.path.basename(localDatabase))
+                    propertyCache[len(propertyQueries)] = (None,dict())
+                    propertyTables[len(propertyQueries)] = getLocalTabularData(soilproperty,aggMethod,listOfMukeys,localDatabase)
+                    propertyQueries.append((soilproperty,aggMethod,None))
+                    continue
+
+                # Only query SDA for the mapunits whose values aren't cached for their current tabular version
+                cachedColumns, cachedRows = readPropertyCache(soilproperty,aggMethod,mukeyVersions)
+                missingMukeys = [mukey for mukey in listOfMukeys if mukey not in cachedRows]
+                propertyCache[len(propertyQueries)] = (cachedColumns,cachedRows)
+
+                if missingMukeys or not cachedColumns:
+                    theQuery = compileSQLquery(soilproperty,aggMethod,missingMukeys)
+                else:
+                    theQuery = None
+                    AddMsgAndPrint(".\tUsing cached " + soilproperty + " - " + aggMethod + " values")
                 #AddMsgAndPrint(str(theQuery),1)
-                tbRequest = getSDATabularRequest(theQuery,outSSURGOlayer)
+                propertyQueries.append((soilproperty,aggMethod,theQuery))
+
+            # Queries that don't create temp tables are sent to SDA together in one request.
+            # The rest would collide on their temp table names and are sent as separate requests.
+            # All requests run concurrently, at most maxSDAWorkers at a time.
+            batchIndexes = [i for i, (soilproperty, aggMethod, theQuery) in enumerate(propertyQueries)
+                            if theQuery and aggMethod in batchAggregationMethods]
+
+            with ThreadPoolExecutor(max_workers=maxSDAWorkers) as executor:
+                if batchIndexes:
+                    batchFuture = executor.submit(getSDATabularBatch,
+                                                  [propertyQueries[i][2] for i in batchIndexes],
+                                                  [lookupSSURGOFieldName(propertyQueries[i][0]).strip() for i in batchIndexes])
+
+                queryFutures = dict()
+                for i, (soilproperty, aggMethod, theQuery) in enumerate(propertyQueries):
+                    if theQuery and i not in batchIndexes:
+                        queryFutures[i] = executor.submit(submitSDAquery, theQuery)
+
+                if batchIndexes:
+                    propertyTables.update(zip(batchIndexes,batchFuture.result()))
+
+                for i, future in queryFutures.items():
+                    qData = future.result()
+                    propertyTables[i] = qData["Table"] if qData and "Table" in qData else None
+
+            # Join the results to the SSURGO layer in the order of the property list once every request is done
+            queryTables = list()
+            for i, (soilproperty, aggMethod, theQuery) in enumerate(propertyQueries):
+                cachedColumns, cachedRows = propertyCache[i]
+                queryTable = propertyTables.get(i)
+
+                # Results computed from a local database are not cached
+                if queryTable and not localDatabase:
+                    writePropertyCache(soilproperty,aggMethod,queryTable,mukeyVersions)
+                    queryTable = queryTable + [row for rows in cachedRows.values() for row in rows]
+                elif theQuery is None and cachedColumns:
+                    queryTable = cachedColumns + [row for rows in cachedRows.values() for row in rows]
+
+                if queryTable:
+                    queryTables.append(queryTable)
+                else:
+                    AddMsgAndPrint(".\nFailed to get tabular data for " + soilproperty + " - " + aggMethod,2)
+
+            if queryTables:
+                joinSDATables(queryTables,outSSURGOlayer)
+
+            for soilproperty, aggMethod, theQuery in propertyQueries:
                 updateMetadataDescription(soilproperty,outSSURGOlayer)
 
             # Add EDIT URL field if ecoclassname or ecoclassid fields are present
@@ -1560,8 +2148,12 @@ def getEditURL(ecoID):
 
         else:
             AddMsgAndPrint(".\nFailed to get a list of MUKEYs from " + os.path.basename(outSSURGOlayer),2)
+            writeLayerMetadata(outSSURGOlayer)
             return False
 
+        # Write the metadata gathered during the run in one save
+        writeLayerMetadata(outSSURGOlayer)
+
         # Adding the SSURGO polygons to the list so that it can be automatically added to ArcGISPro
         # The physical layer name will not be altered.
         soilPropertyList.append(os.path.basename(outSSURGOlayer) + " - Polygons")
@@ -1573,11 +2165,40 @@ def getEditURL(ecoID):
         errorMsg()
 
 # ====================================== Main Body ==================================
-import sys, os, time, urllib, json, traceback, socket, arcpy, datetime
+import sys, os, time, urllib, json, traceback, socket, arcpy, datetime, math, copy
 from arcpy import metadata as md
 
 from urllib.error import HTTPError, URLError
 from urllib.request import Request
+from concurrent.futures import ThreadPoolExecutor
+from wetland_http import postJSON
+from wetland_ssurgo_cache import cacheSurveyArea, clipSurveyAreas, isSurveyAreaCached, readPropertyCache, writePropertyCache
+from wetland_ssurgo_local import aggregateProperty, mapunitAttributes
+
+# compileSQLquery aggregation methods whose queries have no temp tables and can share one SDA request
+batchAggregationMethods = ['Mapunit Aggregate','Dominant Component (Category)','Dominant Condition','Min\\Max',
+                           'By Component','coecoclass']
+
+# Maximum number of SDA requests in flight at once, to keep load on Soil Data Access reasonable
+maxSDAWorkers = 3
+
+# Clip SSURGO mapunit polygons from the local survey area cache instead of having SDA clip them
+cacheSSURGOgeometry = True
+
+# Mapunit polygons per SDA request when a survey area is downloaded into the cache
+cachePageSize = 2000
+
+# Largest width or height of an AOI tile sent to SDA, in decimal degrees (about 5 km)
+maxTileDegrees = 0.05
+
+# Distance from a tile edge, in decimal degrees, within which polygon boundaries are treated as cut by the tile
+tileEdgeTolerance = 0.000001
+
+# Metadata edits gathered per layer path during a run and written once by writeLayerMetadata
+layerMetadata = dict()
+
+# Parsed SSURGO_WCT_*.lyrx layer documents by path: (file modified time, layer document)
+lyrxDefinitions = dict()
 
 if __name__ == '__main__':
 
@@ -1585,6 +2206,7 @@ if __name__ == '__main__':
         feature = arcpy.GetParameterAsText(0) #
         propertyList = arcpy.GetParameter(1)  # python List of SSURGO Properties
         outLoc = arcpy.GetParameterAsText(2)  # Must be a FGDB
+        localDB = arcpy.GetParameterAsText(3) if arcpy.GetArgumentCount() > 3 else ''  # Optional local SSURGO database
 
 ##        feature = r'E:\Temp\SSURGO_WCT.gdb\WSS_aoi'
 ##        propertyList = ['Hydric Classification Presence - Mapunit Aggregate']
@@ -1599,7 +2221,7 @@ if __name__ == '__main__':
 ##                         'Hydric Rating - Component Count']
 ##        outLoc = r'E:\Temp\scratch.gdb'
 
-        outputLayer = start(feature,propertyList,outLoc)
+        outputLayer = start(feature,propertyList,outLoc,localDB or None)
 
 
     except:
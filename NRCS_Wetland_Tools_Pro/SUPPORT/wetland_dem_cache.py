@@ -0,0 +1,115 @@
+from hashlib import sha1
+from os import environ, makedirs, path
+from sqlite3 import Error, connect
+from time import time
+
+from arcpy import ExecuteError, Exists, Raster
+from arcpy.da import SearchCursor
+from arcpy.management import CopyRaster, CreateFileGDB, Delete
+
+
+# Base DEMs extracted for a tract (the projected tempDEM before it is clipped to the project AOI), kept per user so a
+# re-run with the same source, AOI, coordinate system and cell size skips the download or mosaic of the DEMs. The
+# least recently used DEMs are removed once the cache grows past cacheMaxBytes. The cache never stops a run: a cache
+# that cannot be read is a miss, and a DEM that cannot be stored is skipped.
+cacheFolder = path.join(environ.get('LOCALAPPDATA') or path.expanduser('~'), 'NRCS_Wetland_Tools')
+demCacheFile = path.join(cacheFolder, 'dem_cache.sqlite')
+demCacheGDB = path.join(cacheFolder, 'dem_cache.gdb')
+cacheMaxBytes = 4 * 1024 ** 3
+
+
+def _connect():
+    makedirs(cacheFolder, exist_ok=True)
+    conn = connect(demCacheFile, timeout=30)
+    conn.execute('''CREATE TABLE IF NOT EXISTS dems (
+                        key TEXT PRIMARY KEY, name TEXT, bytes INTEGER, lastused REAL)''')
+    return conn
+
+
+def _sourceSignature(source):
+    ''' Source text of a cache key: a service url as is, and the path and modified time of each file, so a changed
+    layer file or DEM is not matched.'''
+    sources = [source] if isinstance(source, str) else list(source)
+    signature = []
+    for item in sources:
+        itemPath = item
+        # Rasters in a geodatabase are dated by the geodatabase folder
+        while itemPath and not path.exists(itemPath) and path.dirname(itemPath) != itemPath:
+            itemPath = path.dirname(itemPath)
+        modified = path.getmtime(itemPath) if itemPath and path.exists(itemPath) else ''
+        signature.append(f"{item}|{modified}")
+    return ';'.join(signature)
+
+
+def demCacheKey(source, aoi, spatialReference, cellSize=''):
+    ''' Returns the cache key of a base DEM: the DEM source (a service or layer file, or a list of DEM files), the
+    geometry of the AOI features, the output coordinate system and the cell size.'''
+    key = sha1()
+    key.update(_sourceSignature(source).encode())
+    with SearchCursor(aoi, ['SHAPE@WKT']) as cursor:
+        for wkt, in cursor:
+            key.update((wkt or '').encode())
+    key.update(str(spatialReference).encode())
+    key.update(str(cellSize).encode())
+    return key.hexdigest()
+
+
+def readDEMCache(key, outRaster):
+    ''' Copies the cached base DEM of a key to outRaster. Returns False if the key is not cached or the cache cannot be
+    read, after removing any partial copy.'''
+    try:
+        conn = _connect()
+        try:
+            row = conn.execute('SELECT name FROM dems WHERE key = ?', (key,)).fetchone()
+            if not row or not Exists(path.join(demCacheGDB, row[0])):
+                return False
+            CopyRaster(path.join(demCacheGDB, row[0]), outRaster)
+            with conn:
+                conn.execute('UPDATE dems SET lastused = ? WHERE key = ?', (time(), key))
+            return True
+        finally:
+            conn.close()
+    except (Error, OSError, ExecuteError, RuntimeError):
+        try:
+            if Exists(outRaster):
+                Delete(outRaster)
+        except (ExecuteError, RuntimeError):
+            pass
+        return False
+
+
+def writeDEMCache(key, raster):
+    ''' Stores a copy of a base DEM under a key and removes the least recently used DEMs while the cache is larger
+    than cacheMaxBytes. A DEM larger than the cache on its own is not stored. Returns False if the DEM could not be
+    stored, such as when the cache geodatabase is locked by another session or the disk is full.'''
+    try:
+        ras = Raster(raster)
+        demBytes = ras.width * ras.height * 4
+        if demBytes > cacheMaxBytes:
+            return False
+
+        if not Exists(demCacheGDB):
+            makedirs(cacheFolder, exist_ok=True)
+            CreateFileGDB(cacheFolder, path.basename(demCacheGDB))
+
+        name = 'dem_' + key
+        conn = _connect()
+        try:
+            CopyRaster(raster, path.join(demCacheGDB, name))
+            with conn:
+                conn.execute('INSERT OR REPLACE INTO dems VALUES (?, ?, ?, ?)', (key, name, demBytes, time()))
+
+            # Evict the least recently used DEMs
+            cachedBytes = 0
+            for oldKey, oldName, oldBytes in conn.execute('SELECT key, name, bytes FROM dems ORDER BY lastused DESC').fetchall():
+                cachedBytes += oldBytes
+                if cachedBytes > cacheMaxBytes:
+                    if Exists(path.join(demCacheGDB, oldName)):
+                        Delete(path.join(demCacheGDB, oldName))
+                    with conn:
+                        conn.execute('DELETE FROM dems WHERE key = ?', (oldKey,))
+        finally:
+            conn.close()
+        return True
+    except (Error, OSError, ExecuteError, RuntimeError):
+        return False
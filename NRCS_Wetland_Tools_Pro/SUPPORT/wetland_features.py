@@ -0,0 +1,455 @@
+from calendar import timegm
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from hashlib import sha1
+from json import dumps, loads
+from os import path
+from urllib.error import HTTPError
+
+from arcpy import Describe, Exists, ListFields, SpatialReference
+from arcpy.da import InsertCursor, SearchCursor, UpdateCursor
+from arcpy.management import AddFields, CopyFeatures, CopyRows, CreateFeatureclass, CreateTable, Delete, Dissolve, Project
+
+from wetland_http import postForm, postFormData
+from wetland_pbf import decodeFeatureCollection
+
+
+# Layer properties (maxRecordCount, fields, ...) by layer url, read once per session
+_layerInfo = {}
+
+# Query geometry parameters by (dataset path, projected on the server), with the fingerprint of the features they were built from
+_queryGeometry = {}
+
+# Off by default. When True, query polygons are unioned in memory and sent in the input's own spatial reference (inSR),
+# and features are returned in that spatial reference (outSR), leaving the reprojection to the feature service. When
+# False, the input is projected to Web Mercator and dissolved on disk, and features come back in the layer's own
+# spatial reference. Tools can turn it on here or per call with getQueryGeometry(projectOnServer=True).
+serverProjection = False
+
+# Esri JSON field types and the field types used to recreate them. Object ID fields are created with the feature class,
+# and geometry, blob, raster, and XML fields are not carried over, the same as JSONToFeatures.
+_fieldTypes = {'esriFieldTypeSmallInteger': 'SHORT',
+               'esriFieldTypeInteger': 'LONG',
+               'esriFieldTypeBigInteger': 'BIGINTEGER',
+               'esriFieldTypeSingle': 'FLOAT',
+               'esriFieldTypeDouble': 'DOUBLE',
+               'esriFieldTypeString': 'TEXT',
+               'esriFieldTypeDate': 'DATE',
+               'esriFieldTypeGUID': 'GUID',
+               'esriFieldTypeGlobalID': 'GUID'}
+
+_geometryTypes = {'esriGeometryPoint': 'POINT',
+                  'esriGeometryMultipoint': 'MULTIPOINT',
+                  'esriGeometryPolyline': 'POLYLINE',
+                  'esriGeometryPolygon': 'POLYGON'}
+
+_epoch = datetime(1970, 1, 1)
+
+# Request feature pages as protocol buffers (f=pbf) from layers that list PBF in supportedQueryFormats
+usePbf = True
+
+maxQueryWorkers = 4
+maxEditWorkers = 4
+
+
+def getLayerInfo(RESTurl, useToken=True):
+    ''' Returns the layer resource JSON of a hosted feature service layer, caching it for the session.'''
+    if RESTurl not in _layerInfo:
+        status, results = postForm(RESTurl, {'f': 'json'}, useToken, idempotent=True)
+        if 'error' in results:
+            return results
+        _layerInfo[RESTurl] = results
+    return _layerInfo[RESTurl]
+
+
+def datasetFingerprint(fc):
+    ''' Returns a hash of the object IDs and geometry of a feature class, or of the selected features of a layer, so
+    that a cached query geometry is rebuilt whenever the input changes.'''
+    digest = sha1()
+    with SearchCursor(fc, ['OID@', 'SHAPE@WKB']) as cursor:
+        for oid, wkb in cursor:
+            digest.update(str(oid).encode('ascii'))
+            digest.update(wkb or b'')
+    return digest.hexdigest()
+
+
+def _unionShapes(fc):
+    ''' Returns the union of the shapes of a polygon feature class or layer as a single arcpy geometry.'''
+    union = None
+    with SearchCursor(fc, ['SHAPE@']) as cursor:
+        for row in cursor:
+            if row[0] is None:
+                continue
+            union = row[0] if union is None else union.union(row[0])
+    return union
+
+
+def getQueryGeometry(fc, ws, projectOnServer=None):
+    ''' Returns the geometry, geometryType, inSR, and (with server projection) outSR parameters of a REST query that
+    intersects the input polygons.
+
+    By default the input is projected to Web Mercator and dissolved through temporary feature classes in ws. With
+    projectOnServer=True (or the serverProjection setting turned on) the shapes are unioned in memory and sent in their
+    own spatial reference, and the feature service projects both the query geometry and the returned features. Either
+    result is cached by dataset path and fingerprint, so every query and delete for an unchanged input reuses it.'''
+    if projectOnServer is None:
+        projectOnServer = serverProjection
+    key = (Describe(fc).catalogPath, projectOnServer)
+    fingerprint = datasetFingerprint(fc)
+    if key in _queryGeometry and _queryGeometry[key][0] == fingerprint:
+        return dict(_queryGeometry[key][1])
+
+    if projectOnServer:
+        jsonPolygon = _unionShapes(fc).JSON
+    else:
+        wmas_fc = path.join(ws, "wmas_fc")
+        wmas_dis = path.join(ws, "wmas_dis_fc")
+        Project(fc, wmas_fc, SpatialReference(3857))
+        Dissolve(wmas_fc, wmas_dis, "", "", "MULTI_PART", "")
+        jsonPolygon = [row[0] for row in SearchCursor(wmas_dis, ['SHAPE@JSON'])][0]
+        for item in [wmas_fc, wmas_dis]:
+            if Exists(item):
+                Delete(item)
+
+    geometryParams = {'geometry': jsonPolygon, 'geometryType': 'esriGeometryPolygon'}
+    inSR = loads(jsonPolygon).get('spatialReference')
+    if inSR:
+        geometryParams['inSR'] = dumps(inSR)
+        if projectOnServer:
+            geometryParams['outSR'] = dumps(inSR)
+
+    _queryGeometry[key] = (fingerprint, geometryParams)
+    return dict(geometryParams)
+
+
+def _postQuery(query_url, params, useToken, pbf):
+    ''' Posts a query as f=pbf when pbf is set and decodes the protocol buffer response. Error responses and anything
+    that cannot be decoded are requested again as f=json, which also reports the server's error message.'''
+    if pbf:
+        try:
+            status, headers, data = postFormData(query_url, dict(params, f='pbf'), useToken, idempotent=True)
+            if 'json' not in (headers.get('Content-Type') or ''):
+                return status, decodeFeatureCollection(data)
+        except (HTTPError, ValueError):
+            pass
+    return postForm(query_url, dict(params, f='json'), useToken, idempotent=True)
+
+
+def _queryPage(query_url, objectIds, oidField, pageParams, useToken, pbf=False):
+    ''' Fetches the features for one batch of object IDs. If the server stops short with exceededTransferLimit, the
+    object IDs that were not returned are requested again until the batch is complete.'''
+    features = []
+    remaining = objectIds
+    while remaining:
+        params = dict(pageParams, objectIds=','.join(str(oid) for oid in remaining))
+        status, results = _postQuery(query_url, params, useToken, pbf)
+        if 'error' in results:
+            return status, results
+        features.extend(results['features'])
+        if not results.get('exceededTransferLimit') or not results['features']:
+            break
+        returned = {feature['attributes'][oidField] for feature in results['features']}
+        remaining = [oid for oid in remaining if oid not in returned]
+    results['features'] = features
+    results.pop('exceededTransferLimit', None)
+    return status, results
+
+
+def _spatialReference(srJSON):
+    ''' Returns an arcpy SpatialReference for an Esri JSON spatialReference object.'''
+    if srJSON.get('wkt'):
+        sr = SpatialReference()
+        sr.loadFromString(srJSON['wkt'])
+        return sr
+    return SpatialReference(srJSON.get('latestWkid') or srJSON['wkid'])
+
+
+def createFromResults(results, outFC):
+    ''' Creates an empty feature class, or a table if the results have no geometry, with the geometry type, spatial
+    reference, and fields of a query response. Returns the (name, isDate) pairs of the created fields for insertRows.'''
+    out_path, out_name = path.split(outFC)
+    if results.get('geometryType'):
+        CreateFeatureclass(out_path, out_name, _geometryTypes[results['geometryType']],
+                           has_m='ENABLED' if results.get('hasM') else 'DISABLED',
+                           has_z='ENABLED' if results.get('hasZ') else 'DISABLED',
+                           spatial_reference=_spatialReference(results.get('spatialReference', {'wkid': 4326})))
+    else:
+        CreateTable(out_path, out_name)
+
+    fieldSpec = []
+    descriptions = []
+    for field in results.get('fields', []):
+        fieldType = _fieldTypes.get(field['type'])
+        if not fieldType:
+            continue
+        length = (field.get('length') or 255) if fieldType == 'TEXT' else ''
+        descriptions.append([field['name'], fieldType, field.get('alias') or field['name'], length])
+        fieldSpec.append((field['name'], fieldType == 'DATE'))
+    if descriptions:
+        AddFields(outFC, descriptions)
+    return fieldSpec
+
+
+def insertRows(outFC, fieldSpec, features, hasGeometry=True):
+    ''' Writes the features of a query response to a feature class or table made by createFromResults. Dates are
+    converted from epoch milliseconds.'''
+    names = [name for name, isDate in fieldSpec]
+    if hasGeometry:
+        names.append('SHAPE@JSON')
+    with InsertCursor(outFC, names) as cursor:
+        for feature in features:
+            attributes = feature.get('attributes') or {}
+            row = []
+            for name, isDate in fieldSpec:
+                value = attributes.get(name)
+                if isDate and value is not None:
+                    value = _epoch + timedelta(milliseconds=value)
+                row.append(value)
+            if hasGeometry:
+                geometry = feature.get('geometry')
+                row.append(dumps(geometry) if geometry else None)
+            cursor.insertRow(row)
+
+
+def queryFeatures(RESTurl, params, outFC, useToken=True):
+    ''' Runs a query against a hosted feature service layer and writes every matching feature to outFC. The matching
+    object IDs are requested first, then fetched in maxRecordCount batches on a bounded thread pool. Each page is
+    inserted into a memory workspace feature class as it arrives, and the result is copied to outFC once. Returns the
+    response status and either the error results or a dictionary with the count and the server object IDs of the
+    features.'''
+    query_url = RESTurl + "/query"
+
+    id_params = dict(params, f='json', returnIdsOnly='true')
+    status, results = postForm(query_url, id_params, useToken, idempotent=True)
+    if 'error' in results:
+        return status, results
+
+    objectIds = sorted(results.get('objectIds') or [])
+    if not objectIds:
+        return status, {'count': 0, 'objectIds': []}
+    oidField = results['objectIdFieldName']
+
+    layerInfo = getLayerInfo(RESTurl, useToken)
+    if 'error' in layerInfo:
+        return status, layerInfo
+    pageSize = layerInfo.get('maxRecordCount') or 1000
+    batches = [objectIds[i:i + pageSize] for i in range(0, len(objectIds), pageSize)]
+
+    # The object IDs already carry the spatial and attribute filter, so the pages only need the output settings
+    pageParams = {key: value for key, value in params.items() if key in ('outFields', 'outSR', 'returnGeometry', 'returnZ', 'returnM')}
+    pbf = usePbf and 'PBF' in (layerInfo.get('supportedQueryFormats') or '').upper()
+    layerFields = {field['name']: field for field in layerInfo.get('fields', [])}
+
+    temp_fc = 'memory\\wetland_query'
+    if Exists(temp_fc):
+        Delete(temp_fc)
+    with ThreadPoolExecutor(max_workers=min(maxQueryWorkers, len(batches))) as executor:
+        pages = executor.map(lambda batch: _queryPage(query_url, batch, oidField, pageParams, useToken, pbf), batches)
+
+        # Pages come back in batch order while later batches are still downloading. Cursors stay on this thread.
+        for page_number, (page_status, page) in enumerate(pages):
+            if 'error' in page:
+                if Exists(temp_fc):
+                    Delete(temp_fc)
+                return page_status, page
+            if page_number == 0:
+                # Protocol buffer fields carry no string length, so take it and any missing alias from the layer
+                for field in page['fields']:
+                    layerField = layerFields.get(field['name'], {})
+                    field.setdefault('length', layerField.get('length'))
+                    field['alias'] = field.get('alias') or layerField.get('alias')
+                hasGeometry = bool(page.get('geometryType'))
+                fieldSpec = createFromResults(page, temp_fc)
+            insertRows(temp_fc, fieldSpec, page['features'], hasGeometry)
+
+    if hasGeometry:
+        CopyFeatures(temp_fc, outFC)
+    else:
+        CopyRows(temp_fc, outFC)
+    Delete(temp_fc)
+    return status, {'count': len(objectIds), 'objectIds': objectIds}
+
+
+def queryObjectIds(RESTurl, params, useToken=True):
+    ''' Returns the response status and either the error results or {'objectIds': [...]} for the features of a hosted
+    layer matching a query.'''
+    status, results = postForm(RESTurl + "/query", dict(params, f='json', returnIdsOnly='true'), useToken,
+                               idempotent=True)
+    if 'error' in results:
+        return status, results
+    return status, {'objectIds': sorted(results.get('objectIds') or [])}
+
+
+def queryObjectIdsConcurrent(queries, useToken=True):
+    ''' Submits a list of (RESTurl, params) object ID queries on a bounded thread pool. Returns the (status, results) of
+    each query in the order given.'''
+    if not queries:
+        return []
+    with ThreadPoolExecutor(max_workers=min(maxQueryWorkers, len(queries))) as executor:
+        return list(executor.map(lambda query: queryObjectIds(*query, useToken), queries))
+
+
+def splitLayerUrl(RESTurl):
+    ''' Splits a hosted layer url into its FeatureServer url and layer id.'''
+    service_url, layer_id = RESTurl.rstrip('/').rsplit('/', 1)
+    return service_url, int(layer_id)
+
+
+def readFeatures(fc, layerInfo):
+    ''' Reads a local feature class into (key, hash, feature) tuples for a hosted layer. Local fields are matched to the
+    layer's editable fields by name, geometry is projected to the layer's spatial reference, and dates become epoch ms.
+    The key is the local GlobalID, or the ObjectID if there is none, and the hash covers the geometry and attributes.'''
+    layer_fields = {field['name'].lower(): field['name'] for field in layerInfo['fields']
+                    if field.get('editable', True) and field['type'] not in ('esriFieldTypeOID', 'esriFieldTypeGlobalID')}
+    local_fields = [field.name for field in ListFields(fc) if field.name.lower() in layer_fields]
+    globalid_fields = ListFields(fc, field_type='GlobalID')
+    key_field = globalid_fields[0].name if globalid_fields else 'OID@'
+    layer_sr = layerInfo['extent']['spatialReference']
+    out_sr = SpatialReference(layer_sr.get('latestWkid', layer_sr.get('wkid')))
+
+    features = []
+    with SearchCursor(fc, [key_field, 'SHAPE@JSON'] + local_fields, spatial_reference=out_sr) as cursor:
+        for row in cursor:
+            geometry = loads(row[1])
+            geometry.pop('spatialReference', None)
+            attributes = {}
+            for name, value in zip(local_fields, row[2:]):
+                if isinstance(value, datetime):
+                    value = timegm(value.timetuple()) * 1000
+                attributes[layer_fields[name.lower()]] = value
+            feature = {'geometry': geometry, 'attributes': attributes}
+            feature_hash = sha1(dumps(feature, sort_keys=True).encode('utf-8')).hexdigest()
+            features.append((str(row[0]), feature_hash, feature))
+    return features
+
+
+def _layerEdits(edits, RESTurl):
+    ''' Returns the staged edits of a hosted layer, starting an empty set if there are none yet.'''
+    return edits.setdefault(RESTurl, {'adds': [], 'addKeys': [], 'updates': [], 'deletes': [], 'manifest': {}, 'tracked': False})
+
+
+def _stageDeletes(layer_edits, deletes):
+    for oid in deletes:
+        if oid not in layer_edits['deletes']:
+            layer_edits['deletes'].append(oid)
+
+
+def addLayerEdits(edits, RESTurl, fcs=(), deletes=(), useToken=True):
+    ''' Stages edits for a hosted layer: the features of each local feature class as adds and a list of server object
+    IDs as deletes. Nothing is sent until applyEdits. Returns the layer info error results if the layer can't be read.'''
+    layerInfo = getLayerInfo(RESTurl, useToken)
+    if 'error' in layerInfo:
+        return layerInfo
+    layer_edits = _layerEdits(edits, RESTurl)
+    for fc in fcs:
+        for key, feature_hash, feature in readFeatures(fc, layerInfo):
+            layer_edits['adds'].append(feature)
+            layer_edits['addKeys'].append(None)
+    _stageDeletes(layer_edits, deletes)
+    return {'adds': len(layer_edits['adds']), 'deletes': len(layer_edits['deletes'])}
+
+
+def addLayerFeatures(edits, RESTurl, fc, manifest=None, useToken=True):
+    ''' Stages the features of a project feature class for a hosted layer and tracks them for the upload manifest. Given
+    the manifest of the last upload ({key: (hash, server oid)}), only new features are added, changed features are
+    updated, and features no longer present locally are deleted. Without a manifest every feature is added.'''
+    layerInfo = getLayerInfo(RESTurl, useToken)
+    if 'error' in layerInfo:
+        return layerInfo
+    layer_edits = _layerEdits(edits, RESTurl)
+    layer_edits['tracked'] = True
+    oidField = layerInfo['objectIdField']
+    manifest = manifest or {}
+
+    keys = set()
+    for key, feature_hash, feature in readFeatures(fc, layerInfo):
+        keys.add(key)
+        if key in manifest:
+            old_hash, oid = manifest[key]
+            if old_hash != feature_hash:
+                feature['attributes'][oidField] = oid
+                layer_edits['updates'].append(feature)
+            layer_edits['manifest'][key] = (feature_hash, oid)
+        else:
+            layer_edits['adds'].append(feature)
+            layer_edits['addKeys'].append((key, feature_hash))
+    _stageDeletes(layer_edits, [oid for key, (old_hash, oid) in manifest.items() if key not in keys])
+    return {'adds': len(layer_edits['adds']), 'updates': len(layer_edits['updates']), 'deletes': len(layer_edits['deletes'])}
+
+
+def _applyServiceEdits(service_url, service_edits, useToken):
+    ''' Sends the staged edits of one FeatureServer as a single applyEdits request with rollbackOnFailure.'''
+    params = {'f': 'json',
+              'edits': dumps(service_edits),
+              'rollbackOnFailure': 'true'}
+    return postForm(service_url + "/applyEdits", params, useToken)
+
+
+def applyEdits(edits, useToken=True):
+    ''' Sends staged layer edits as one applyEdits request per FeatureServer, so each service takes all of its adds,
+    updates and deletes or none of them. The services are sent concurrently on a bounded thread pool. Returns a list of
+    (service url, status, results) in the order the services were first staged.'''
+    services = {}
+    for RESTurl, layer_edits in edits.items():
+        if layer_edits['adds'] or layer_edits['updates'] or layer_edits['deletes']:
+            service_url, layer_id = splitLayerUrl(RESTurl)
+            services.setdefault(service_url, []).append({'id': layer_id,
+                                                         'adds': layer_edits['adds'],
+                                                         'updates': layer_edits['updates'],
+                                                         'deletes': layer_edits['deletes']})
+    if not services:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(maxEditWorkers, len(services))) as executor:
+        responses = executor.map(lambda service: _applyServiceEdits(*service, useToken), services.items())
+        return [(service_url, status, results) for service_url, (status, results) in zip(services, responses)]
+
+
+def buildManifest(edits, responses):
+    ''' Returns the manifest {layer url: {key: (hash, server oid)}} of the tracked project features after a successful
+    applyEdits, from the staged edits and the object IDs the server assigned to the added features.'''
+    add_results = {}
+    for service_url, status, results in responses:
+        for layer_results in results:
+            add_results[(service_url, layer_results['id'])] = layer_results.get('addResults', [])
+
+    manifest = {}
+    for RESTurl, layer_edits in edits.items():
+        entries = dict(layer_edits['manifest'])
+        for add_key, add_result in zip(layer_edits['addKeys'], add_results.get(splitLayerUrl(RESTurl), [])):
+            if add_key:
+                entries[add_key[0]] = (add_key[1], add_result['objectId'])
+        if layer_edits['tracked']:
+            manifest[RESTurl] = entries
+    return manifest
+
+
+def readManifest(table, job_id):
+    ''' Reads the upload manifest of a job as {layer url: {key: (hash, server oid)}}.'''
+    manifest = {}
+    if Exists(table):
+        with SearchCursor(table, ['layer_url', 'feature_key', 'feature_hash', 'server_oid'], f"job_id = '{job_id}'") as cursor:
+            for RESTurl, key, feature_hash, oid in cursor:
+                manifest.setdefault(RESTurl, {})[key] = (feature_hash, oid)
+    return manifest
+
+
+def writeManifest(table, job_id, manifest):
+    ''' Replaces the manifest rows of the uploaded layers of a job, and drops the rows of any other job.'''
+    if not Exists(table):
+        CreateTable(path.dirname(table), path.basename(table))
+        AddFields(table, [['job_id', 'TEXT', 'Job ID', 128],
+                          ['layer_url', 'TEXT', 'Layer URL', 512],
+                          ['feature_key', 'TEXT', 'Feature Key', 64],
+                          ['feature_hash', 'TEXT', 'Feature Hash', 40],
+                          ['server_oid', 'LONG', 'Server Object ID']])
+
+    with UpdateCursor(table, ['job_id', 'layer_url']) as cursor:
+        for row in cursor:
+            if row[0] != job_id or row[1] in manifest:
+                cursor.deleteRow()
+
+    with InsertCursor(table, ['job_id', 'layer_url', 'feature_key', 'feature_hash', 'server_oid']) as cursor:
+        for RESTurl, entries in manifest.items():
+            for key, (feature_hash, oid) in entries.items():
+                cursor.insertRow([job_id, RESTurl, key, feature_hash, oid])
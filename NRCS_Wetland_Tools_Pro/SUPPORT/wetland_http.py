@@ -0,0 +1,196 @@
+from gzip import decompress
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from io import BytesIO
+from json import dumps, loads
+from ssl import create_default_context
+from threading import Lock
+from time import monotonic
+from urllib.error import HTTPError
+from urllib.parse import urlencode, urljoin, urlsplit
+from urllib.request import getproxies, proxy_bypass
+
+
+# Idle keep-alive connections, keyed by (scheme, host, port). Connections are checked out for a single request and
+# returned afterwards, so the pools are safe to share between worker threads.
+_pools = {}
+_poolLock = Lock()
+_portalToken = None
+_sslContext = None
+
+maxIdlePerHost = 8
+defaultTimeout = 600
+
+# Seconds a pooled connection may have been idle and still carry a request that can't be resent, such as applyEdits.
+# Older connections may have been dropped by the server, so those requests open a new one instead.
+maxIdleForEdits = 5
+
+
+def setPortalToken(tokenInfo):
+    ''' Stores the token returned by getPortalTokenInfo so that every request made with useToken=True carries it.'''
+    global _portalToken
+    _portalToken = tokenInfo['token'] if tokenInfo else None
+
+
+def closeConnections():
+    ''' Closes every pooled connection.'''
+    with _poolLock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        for conn in pool:
+            conn.close()
+
+
+def _newConnection(scheme, host, port, timeout):
+    ''' Opens a connection to a host, tunneling through the system proxy when one is configured for the scheme.'''
+    global _sslContext
+    proxy = getproxies().get(scheme)
+    if proxy and proxy_bypass(host):
+        proxy = None
+
+    if scheme == 'https':
+        if _sslContext is None:
+            _sslContext = create_default_context()
+        if proxy:
+            proxy_url = urlsplit(proxy)
+            conn = HTTPSConnection(proxy_url.hostname, proxy_url.port or 8080, timeout=timeout, context=_sslContext)
+            conn.set_tunnel(host, port)
+        else:
+            conn = HTTPSConnection(host, port, timeout=timeout, context=_sslContext)
+    else:
+        if proxy:
+            proxy_url = urlsplit(proxy)
+            conn = HTTPConnection(proxy_url.hostname, proxy_url.port or 8080, timeout=timeout)
+        else:
+            conn = HTTPConnection(host, port, timeout=timeout)
+    conn.proxied = bool(proxy) and scheme == 'http'
+    return conn
+
+
+def _checkoutConnection(key, timeout, maxIdle=None):
+    ''' Returns an idle pooled connection for the host, or a new one, and whether it was reused. Pooled connections
+    idle longer than maxIdle seconds are closed instead of reused.'''
+    stale = []
+    conn = None
+    with _poolLock:
+        pool = _pools.get(key)
+        while pool:
+            candidate = pool.pop()
+            if maxIdle is not None and monotonic() - candidate.lastUsed > maxIdle:
+                stale.append(candidate)
+                continue
+            conn = candidate
+            break
+    for candidate in stale:
+        candidate.close()
+    if conn is None:
+        return _newConnection(*key, timeout), False
+    conn.timeout = timeout
+    if conn.sock is not None:
+        conn.sock.settimeout(timeout)
+    return conn, True
+
+
+def _releaseConnection(key, conn):
+    ''' Returns a connection to its host pool, or closes it when the pool is full.'''
+    conn.lastUsed = monotonic()
+    with _poolLock:
+        pool = _pools.setdefault(key, [])
+        if len(pool) < maxIdlePerHost:
+            pool.append(conn)
+            return
+    conn.close()
+
+
+def httpRequest(url, body=None, headers=None, method=None, timeout=None, idempotent=None):
+    ''' Sends a request over a pooled keep-alive connection. Returns the status code, response headers, and body, with
+    gzip content decoded. Raises HTTPError for 4xx and 5xx responses, matching urllib.request.urlopen.
+
+    A request that fails on a reused connection after it was sent is only resent if it is idempotent, which defaults
+    to True for GET requests. POSTs that only read, such as queries, can pass idempotent=True. Other requests only
+    reuse connections idle for less than maxIdleForEdits seconds, so they rarely meet a connection the server dropped.'''
+    method = method or ('POST' if body is not None else 'GET')
+    if idempotent is None:
+        idempotent = method in ('GET', 'HEAD')
+    timeout = timeout or defaultTimeout
+    req_headers = {'Accept-Encoding': 'gzip', 'Connection': 'keep-alive', 'User-Agent': 'NRCS-Wetland-Tools'}
+    if headers:
+        req_headers.update(headers)
+
+    for redirects in range(6):
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parts.hostname, port)
+        path = parts.path or '/'
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        # A pooled connection may have been dropped by the server while idle. Retry once on a fresh connection, unless
+        # the request was already sent and resending it could repeat an edit.
+        for attempt in range(2):
+            conn, reused = _checkoutConnection(key, timeout, None if idempotent else maxIdleForEdits)
+            target = url if conn.proxied else path
+            sent = False
+            received = False
+            try:
+                conn.request(method, target, body, req_headers)
+                sent = True
+                resp = conn.getresponse()
+                data = resp.read()
+                received = True
+            except (ConnectionError, HTTPException):
+                if not reused or attempt or (sent and not idempotent):
+                    raise
+            finally:
+                if not received:
+                    conn.close()
+            if received:
+                break
+
+        if resp.getheader('Content-Encoding', '').lower() == 'gzip':
+            data = decompress(data)
+        if resp.will_close:
+            conn.close()
+        else:
+            _releaseConnection(key, conn)
+
+        if resp.status in (301, 302, 303, 307, 308) and resp.getheader('Location'):
+            url = urljoin(url, resp.getheader('Location'))
+            if resp.status in (301, 302, 303) and method == 'POST':
+                method, body = 'GET', None
+                req_headers.pop('Content-Type', None)
+            continue
+
+        if resp.status >= 400:
+            raise HTTPError(url, resp.status, resp.reason, resp.headers, BytesIO(data))
+        return resp.status, resp.headers, data
+
+    raise HTTPError(url, resp.status, 'Too many redirects', resp.headers, BytesIO(data))
+
+
+def postFormData(url, params, useToken=True, timeout=None, idempotent=False):
+    ''' POSTs form encoded parameters to an ArcGIS REST endpoint and returns the status code, response headers, and the
+    undecoded body, for responses that are not JSON such as f=pbf. The stored portal token is attached unless useToken is
+    False. Pass idempotent=True for requests that only read, so they can be resent on a dropped connection.'''
+    params = dict(params)
+    if useToken and _portalToken:
+        params['token'] = _portalToken
+    body = urlencode(params).encode('ascii')
+    return httpRequest(url, body, {'Content-Type': 'application/x-www-form-urlencoded'}, timeout=timeout,
+                       idempotent=idempotent)
+
+
+def postForm(url, params, useToken=True, timeout=None, idempotent=False):
+    ''' POSTs form encoded parameters to an ArcGIS REST endpoint and returns the status code and the decoded JSON.
+    The stored portal token is attached unless useToken is False.'''
+    status, headers, data = postFormData(url, params, useToken, timeout, idempotent)
+    return status, loads(data)
+
+
+def postJSON(url, payload, timeout=None, idempotent=False):
+    ''' POSTs a JSON document, such as a Soil Data Access request, and returns the status code and the decoded JSON.'''
+    body = dumps(payload).encode('ascii')
+    status, headers, data = httpRequest(url, body, {'Content-Type': 'application/json'}, timeout=timeout,
+                                        idempotent=idempotent)
+    return status, loads(data)
@@ -0,0 +1,170 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.client import HTTPException
+from json import dumps, load, loads
+from math import ceil, floor
+from os import path
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import sleep
+
+from arcpy import Describe, SpatialReference, env
+from arcpy.management import MosaicToNewRaster, SetRasterProperties
+
+from wetland_http import postFormData
+
+
+# Downloads the DEM under an AOI from an ArcGIS image service through exportImage. The extent is split into tiles no
+# larger than the service's maximum image size, aligned to the service's own pixel grid, and the tiles are fetched on
+# a pool of threads. Each tile is written to disk as it arrives and the tiles are mosaicked into one local raster, so the
+# extent is never held in memory. Requests go through a fetcher, fetcher(url, params) returning the response body, so
+# a stand-in server or client can replace wetland_http.
+
+# Largest rows and columns of an exportImage tile, when the service allows more
+maxTileSize = 4000
+
+# Concurrent exportImage requests
+maxDownloadWorkers = 6
+
+# Attempts per tile before the download fails
+downloadRetries = 3
+
+# NoData value requested from the service
+exportNoData = -9999
+
+
+def postFetcher(url, params):
+    ''' Default fetcher: POSTs the parameters over the pooled connections of wetland_http, without the portal token,
+    and returns the response body.'''
+    status, headers, data = postFormData(url, params, useToken=False, idempotent=True)
+    return data
+
+
+def imageServiceURL(source):
+    ''' Returns the REST url of an image service from a service url or an image service layer file, or None if the
+    source is neither.'''
+    url = None
+    if source.lower().endswith('.lyrx'):
+        with open(source, encoding='utf-8-sig') as f:
+            lyrx = load(f)
+        for layerDefinition in lyrx.get('layerDefinitions', []):
+            url = layerDefinition.get('dataConnection', {}).get('url')
+            if url:
+                break
+    elif source.lower().startswith(('http://', 'https://')):
+        url = source
+
+    if not url or not url.rstrip('/').endswith('ImageServer'):
+        return None
+    url = url.rstrip('/')
+    # Layer files store the SOAP url of the service
+    if '/rest/services/' not in url:
+        url = url.replace('/services/', '/rest/services/', 1)
+    return url
+
+
+def _response(data):
+    ''' Raises the error of a JSON error response returned in place of an image.'''
+    if data[:1] == b'{':
+        result = loads(data)
+        if 'error' in result:
+            raise RuntimeError(f"{result['error'].get('code')}: {result['error'].get('message')}")
+        return result
+    return data
+
+
+def exportTiles(serviceInfo, extent):
+    ''' Returns the grid covering an extent in the service's coordinate system, snapped to the service's pixels, and
+    the (first row, first column, rows, columns) of its exportImage tiles.'''
+    cellWidth = serviceInfo['pixelSizeX']
+    cellHeight = serviceInfo['pixelSizeY']
+    originX = serviceInfo['extent']['xmin']
+    originY = serviceInfo['extent']['ymax']
+
+    firstCol = floor((extent.XMin - originX) / cellWidth)
+    firstRow = floor((originY - extent.YMax) / cellHeight)
+    columns = ceil((extent.XMax - originX) / cellWidth) - firstCol
+    rows = ceil((originY - extent.YMin) / cellHeight) - firstRow
+    gridInfo = {'xMin': originX + firstCol * cellWidth,
+                'yMax': originY - firstRow * cellHeight,
+                'cellWidth': cellWidth,
+                'cellHeight': cellHeight,
+                'rows': rows,
+                'columns': columns}
+
+    tileWidth = min(serviceInfo.get('maxImageWidth') or maxTileSize, maxTileSize)
+    tileHeight = min(serviceInfo.get('maxImageHeight') or maxTileSize, maxTileSize)
+    tiles = [(row, col, min(tileHeight, rows - row), min(tileWidth, columns - col))
+             for row in range(0, rows, tileHeight) for col in range(0, columns, tileWidth)]
+    return gridInfo, tiles
+
+
+def _fetchTile(url, params, fetcher, tilePath):
+    ''' Downloads one exportImage tile to a file, retrying failed requests.'''
+    for attempt in range(downloadRetries):
+        try:
+            data = _response(fetcher(url, params))
+            if not isinstance(data, bytes):
+                raise RuntimeError('The image service did not return an image')
+            with open(tilePath, 'wb') as f:
+                f.write(data)
+            return tilePath
+        except (OSError, HTTPException, RuntimeError):
+            if attempt == downloadRetries - 1:
+                raise
+            sleep(2 ** attempt)
+
+
+def downloadImageService(source, aoi, outRaster, fetcher=None, workers=None):
+    ''' Downloads the pixels of an image service (a service url or image service layer file) under the extent of aoi
+    as float32 GeoTIFF tiles and mosaics them into one raster in the service's coordinate system and cell size.'''
+    fetcher = fetcher or postFetcher
+    url = imageServiceURL(source)
+    if url is None:
+        raise ValueError(f"{source} is not an image service")
+
+    serviceInfo = _response(fetcher(url, {'f': 'json'}))
+    serviceSR = SpatialReference()
+    if serviceInfo['spatialReference'].get('latestWkid') or serviceInfo['spatialReference'].get('wkid'):
+        serviceSR = SpatialReference(serviceInfo['spatialReference'].get('latestWkid') or serviceInfo['spatialReference']['wkid'])
+    else:
+        serviceSR.loadFromString(serviceInfo['spatialReference']['wkt'])
+
+    extent = Describe(aoi).extent
+    if extent.spatialReference.exportToString() != serviceSR.exportToString():
+        extent = extent.projectAs(serviceSR)
+
+    gridInfo, tiles = exportTiles(serviceInfo, extent)
+
+    serviceSRJSON = dumps(serviceInfo['spatialReference'])
+    tileFolder = mkdtemp(dir=env.scratchFolder if env.scratchFolder and path.isdir(env.scratchFolder) else None)
+    try:
+        with ThreadPoolExecutor(workers or maxDownloadWorkers) as pool:
+            futures = []
+            for index, (row, col, rows, cols) in enumerate(tiles):
+                xMin = gridInfo['xMin'] + col * gridInfo['cellWidth']
+                yMax = gridInfo['yMax'] - row * gridInfo['cellHeight']
+                params = {'bbox': f"{xMin},{yMax - rows * gridInfo['cellHeight']},{xMin + cols * gridInfo['cellWidth']},{yMax}",
+                          'bboxSR': serviceSRJSON,
+                          'imageSR': serviceSRJSON,
+                          'size': f"{cols},{rows}",
+                          'format': 'tiff',
+                          'pixelType': 'F32',
+                          'noData': exportNoData,
+                          'noDataInterpretation': 'esriNoDataMatchAny',
+                          'interpolation': 'RSP_NearestNeighbor',
+                          'compression': 'LZ77',
+                          'f': 'image'}
+                tilePath = path.join(tileFolder, f"tile_{index}.tif")
+                futures.append(pool.submit(_fetchTile, f"{url}/exportImage", params, fetcher, tilePath))
+
+            # Any failed tile fails the download
+            tilePaths = [future.result() for future in as_completed(futures)]
+
+        # The tiles share the service's pixel grid, so the mosaic only copies their cells
+        for tilePath in tilePaths:
+            SetRasterProperties(tilePath, nodata=f"1 {exportNoData}")
+        MosaicToNewRaster(sorted(tilePaths), path.dirname(outRaster), path.basename(outRaster), serviceSR,
+                          '32_BIT_FLOAT', gridInfo['cellWidth'], 1, 'FIRST')
+    finally:
+        rmtree(tileFolder, ignore_errors=True)
+    return outRaster
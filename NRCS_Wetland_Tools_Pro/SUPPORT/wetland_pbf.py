@@ -0,0 +1,297 @@
+from struct import unpack
+
+
+# Decoder for the Esri FeatureCollection protocol buffer format returned by feature service queries with f=pbf. The
+# output has the same shape as the f=json response, so the query client can use either format interchangeably.
+
+_geometryTypes = {0: 'esriGeometryPoint',
+                  1: 'esriGeometryMultipoint',
+                  2: 'esriGeometryPolyline',
+                  3: 'esriGeometryPolygon',
+                  4: 'esriGeometryMultiPatch',
+                  127: None}
+
+_fieldTypes = {0: 'esriFieldTypeSmallInteger',
+               1: 'esriFieldTypeInteger',
+               2: 'esriFieldTypeSingle',
+               3: 'esriFieldTypeDouble',
+               4: 'esriFieldTypeString',
+               5: 'esriFieldTypeDate',
+               6: 'esriFieldTypeOID',
+               7: 'esriFieldTypeGeometry',
+               8: 'esriFieldTypeBlob',
+               9: 'esriFieldTypeRaster',
+               10: 'esriFieldTypeGUID',
+               11: 'esriFieldTypeGlobalID',
+               12: 'esriFieldTypeXML',
+               13: 'esriFieldTypeBigInteger'}
+
+
+def _readVarint(buf, pos):
+    result = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _zigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def _signed(value):
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _messageFields(buf):
+    ''' Yields the field number, wire type, and value of each field of a protocol buffer message. Varints are returned
+    as unsigned integers and every other wire type as a memoryview of its bytes.'''
+    pos = 0
+    end = len(buf)
+    while pos < end:
+        key, pos = _readVarint(buf, pos)
+        number, wireType = key >> 3, key & 7
+        if wireType == 0:
+            value, pos = _readVarint(buf, pos)
+        elif wireType == 1:
+            value = buf[pos:pos + 8]
+            pos += 8
+        elif wireType == 2:
+            length, pos = _readVarint(buf, pos)
+            value = buf[pos:pos + length]
+            pos += length
+        elif wireType == 5:
+            value = buf[pos:pos + 4]
+            pos += 4
+        else:
+            raise ValueError(f"Unsupported protocol buffer wire type {wireType}")
+        if pos > end:
+            raise ValueError("Truncated protocol buffer message")
+        yield number, wireType, value
+
+
+def _varints(wireType, value):
+    ''' Returns the values of a repeated varint field, packed or not.'''
+    if wireType != 2:
+        return [value]
+    values = []
+    pos = 0
+    end = len(value)
+    while pos < end:
+        item, pos = _readVarint(value, pos)
+        values.append(item)
+    return values
+
+
+def _string(value):
+    return bytes(value).decode('utf-8')
+
+
+def _double(value):
+    return unpack('<d', value)[0]
+
+
+def _value(buf):
+    ''' Decodes an attribute Value message. An empty message is a null.'''
+    for number, wireType, value in _messageFields(buf):
+        if number == 1:
+            return _string(value)
+        if number == 2:
+            return unpack('<f', value)[0]
+        if number == 3:
+            return _double(value)
+        if number in (4, 8):
+            return _zigzag(value)
+        if number in (5, 7):
+            return value
+        if number == 6:
+            return _signed(value)
+        if number == 9:
+            return bool(value)
+    return None
+
+
+def _spatialReference(buf):
+    sr = {}
+    for number, wireType, value in _messageFields(buf):
+        if number == 1 and value:
+            sr['wkid'] = value
+        elif number == 2 and value:
+            sr['latestWkid'] = value
+        elif number == 3 and value:
+            sr['vcsWkid'] = value
+        elif number == 4 and value:
+            sr['latestVcsWkid'] = value
+        elif number == 5:
+            sr['wkt'] = _string(value)
+    return sr
+
+
+def _field(buf):
+    field = {'name': '', 'type': _fieldTypes[0], 'alias': ''}
+    for number, wireType, value in _messageFields(buf):
+        if number == 1:
+            field['name'] = _string(value)
+        elif number == 2:
+            field['type'] = _fieldTypes.get(value, 'esriFieldTypeString')
+        elif number == 3:
+            field['alias'] = _string(value)
+    return field
+
+
+def _transform(buf):
+    ''' Decodes the quantization Transform as (upperLeft, scales, translates), with x, y, m, z ordering.'''
+    upperLeft = True
+    scales = [1.0, 1.0, 1.0, 1.0]
+    translates = [0.0, 0.0, 0.0, 0.0]
+    for number, wireType, value in _messageFields(buf):
+        if number == 1:
+            upperLeft = value == 0
+        elif number in (2, 3):
+            target = scales if number == 2 else translates
+            for index, wire, item in _messageFields(value):
+                target[index - 1] = _double(item)
+    return upperLeft, scales, translates
+
+
+def _geometry(buf, geometryType, hasZ, hasM, transform):
+    ''' Decodes a Geometry message to Esri JSON. Coordinates are quantized integers, delta encoded within each part and
+    interleaved as x, y[, z][, m]. The transform maps them back to map units, with y measured down from the top for an
+    upper left origin.'''
+    lengths = []
+    coords = []
+    for number, wireType, value in _messageFields(buf):
+        if number == 2:
+            lengths.extend(_varints(wireType, value))
+        elif number == 3:
+            coords.extend(_zigzag(item) for item in _varints(wireType, value))
+
+    upperLeft, scales, translates = transform
+    dims = [(scales[0], translates[0]), (-scales[1] if upperLeft else scales[1], translates[1])]
+    if hasZ:
+        dims.append((scales[3], translates[3]))
+    if hasM:
+        dims.append((scales[2], translates[2]))
+    size = len(dims)
+    if not lengths:
+        lengths = [len(coords) // size]
+
+    parts = []
+    index = 0
+    for length in lengths:
+        running = [0] * size
+        part = []
+        for vertex in range(length):
+            point = []
+            for dim, (scale, translate) in enumerate(dims):
+                running[dim] += coords[index + dim]
+                point.append(translate + running[dim] * scale)
+            index += size
+            part.append(point)
+        parts.append(part)
+
+    if geometryType == 'esriGeometryPoint':
+        if not parts or not parts[0]:
+            return None
+        geometry = dict(zip(('x', 'y', 'z' if hasZ else 'm', 'm'), parts[0][0]))
+    elif geometryType == 'esriGeometryMultipoint':
+        geometry = {'points': [point for part in parts for point in part]}
+    elif geometryType == 'esriGeometryPolyline':
+        geometry = {'paths': parts}
+    elif geometryType == 'esriGeometryPolygon':
+        geometry = {'rings': parts}
+    else:
+        raise ValueError(f"Unsupported geometry type {geometryType}")
+    if hasZ:
+        geometry['hasZ'] = True
+    if hasM:
+        geometry['hasM'] = True
+    return geometry
+
+
+def _feature(buf, fields, geometryType, hasZ, hasM, transform):
+    values = []
+    geometry = None
+    for number, wireType, value in _messageFields(buf):
+        if number == 1:
+            values.append(_value(value))
+        elif number == 2:
+            geometry = _geometry(value, geometryType, hasZ, hasM, transform)
+        elif number == 3:
+            raise ValueError("Shape buffer geometry is not supported")
+    feature = {'attributes': {field['name']: value for field, value in zip(fields, values)}}
+    if geometryType:
+        feature['geometry'] = geometry
+    return feature
+
+
+def _featureResult(buf):
+    results = {}
+    fields = []
+    features = []
+    hasZ = hasM = False
+    # proto3 leaves out default values, so a result without a geometry type is a point layer (esriGeometryTypePoint = 0)
+    geometryType = _geometryTypes[0]
+    transform = (True, [1.0, 1.0, 1.0, 1.0], [0.0, 0.0, 0.0, 0.0])
+
+    # Features can only be decoded once the fields, geometry type, and transform are known, so they are kept aside
+    for number, wireType, value in _messageFields(buf):
+        if number == 1:
+            results['objectIdFieldName'] = _string(value)
+        elif number == 3:
+            results['globalIdFieldName'] = _string(value)
+        elif number == 7:
+            geometryType = _geometryTypes.get(value)
+        elif number == 8:
+            results['spatialReference'] = _spatialReference(value)
+        elif number == 9:
+            results['exceededTransferLimit'] = bool(value)
+        elif number == 10:
+            hasZ = bool(value)
+        elif number == 11:
+            hasM = bool(value)
+        elif number == 12:
+            transform = _transform(value)
+        elif number == 13:
+            fields.append(_field(value))
+        elif number == 15:
+            features.append(value)
+
+    if geometryType:
+        results['geometryType'] = geometryType
+    results['hasZ'] = hasZ
+    results['hasM'] = hasM
+    results['fields'] = fields
+    results['features'] = [_feature(feature, fields, geometryType, hasZ, hasM, transform) for feature in features]
+    return results
+
+
+def decodeFeatureCollection(data):
+    ''' Decodes a FeatureCollectionPBuffer query response into the dictionary an f=json query returns: features with
+    attributes and Esri JSON geometry, fields, geometryType, spatialReference, and exceededTransferLimit. Count and
+    object ID responses decode to {'count': n} and {'objectIdFieldName': ..., 'objectIds': [...]}. Raises ValueError if
+    the data cannot be decoded.'''
+    try:
+        buf = memoryview(data)
+        for number, wireType, value in _messageFields(buf):
+            if number != 2:
+                continue
+            for resultType, wire, result in _messageFields(value):
+                if resultType == 1:
+                    return _featureResult(result)
+                if resultType == 2:
+                    return {'count': next((item for index, w, item in _messageFields(result) if index == 1), 0)}
+                if resultType == 3:
+                    ids = {'objectIdFieldName': '', 'objectIds': []}
+                    for index, w, item in _messageFields(result):
+                        if index == 1:
+                            ids['objectIdFieldName'] = _string(item)
+                        elif index == 3:
+                            ids['objectIds'].extend(_varints(w, item))
+                    return ids
+    except (IndexError, KeyError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid feature collection protocol buffer: {e}")
+    raise ValueError("Feature collection protocol buffer has no query result")
@@ -0,0 +1,91 @@
+from json import dump, load
+from os import environ, makedirs, path, replace
+from time import time
+
+from arcpy import SpatialReference
+
+from wetland_http import postForm
+
+
+# Township/range and section layers of the NRCS PLSS service
+tr_svc = 'https://gis.sc.egov.usda.gov/appserver/rest/services/cadastral/plss/MapServer/0/query'
+sec_svc = 'https://gis.sc.egov.usda.gov/appserver/rest/services/cadastral/plss/MapServer/1/query'
+
+# Lookups are kept on disk per user, keyed by the point rounded to about a meter (5 decimal degrees) and the service urls
+cacheFile = path.join(environ.get('LOCALAPPDATA') or path.expanduser('~'), 'NRCS_Wetland_Tools', 'plss_cache.json')
+cacheDays = 30
+cacheDigits = 5
+
+
+def _readCache():
+    try:
+        with open(cacheFile) as infile:
+            return load(infile)
+    except (OSError, ValueError):
+        return {}
+
+
+def _writeCache(cache):
+    ''' Writes the cache without its expired entries. A cache that cannot be written is skipped.'''
+    oldest = time() - cacheDays * 86400
+    cache = {key: entry for key, entry in cache.items() if entry['time'] >= oldest}
+    try:
+        makedirs(path.dirname(cacheFile), exist_ok=True)
+        temp_file = cacheFile + '.tmp'
+        with open(temp_file, 'w') as outfile:
+            dump(cache, outfile)
+        replace(temp_file, cacheFile)
+    except OSError:
+        pass
+
+
+def _queryAttributes(url, jsonPoint, outFields):
+    ''' Returns the attributes of the first feature under the point, {} if there is none, or None if the query failed.'''
+    params = {'f': 'json',
+              'geometry': jsonPoint,
+              'geometryType': 'esriGeometryPoint',
+              'returnGeometry': 'false',
+              'outFields': outFields}
+    responseStatus, results = postForm(url, params, useToken=False, idempotent=True)
+    if 'error' in results:
+        return None
+    if not results.get('features'):
+        return {}
+    return results['features'][0]['attributes']
+
+
+def lookupPLSS(point):
+    ''' Returns the township, range, section, and principal meridian text for a PointGeometry, '' if the point is not in
+    a PLSS section, or None if a PLSS query failed. Results are cached on disk for cacheDays, so a repeat export of
+    the same location makes no requests.'''
+    wgs_point = point.projectAs(SpatialReference(4326)).firstPoint
+    key = f"{round(wgs_point.X, cacheDigits)},{round(wgs_point.Y, cacheDigits)},{tr_svc},{sec_svc}"
+    cache = _readCache()
+    entry = cache.get(key)
+    if entry and entry['time'] >= time() - cacheDays * 86400:
+        return entry['text']
+
+    trs_text = ''
+    jsonPoint = point.JSON
+    tr_atts = _queryAttributes(tr_svc, jsonPoint, 'PRINMER,TWNSHPNO,TWNSHPDIR,RANGENO,RANGEDIR')
+    if tr_atts is None:
+        return None
+    if tr_atts:
+        mer_txt = tr_atts['PRINMER']
+        town_no = int(tr_atts['TWNSHPNO'])
+        town_dir = tr_atts['TWNSHPDIR']
+        range_no = int(tr_atts['RANGENO'])
+        range_dir = tr_atts['RANGEDIR']
+
+        if len(mer_txt) > 0 and town_no > 0 and range_no > 0:
+            sec_atts = _queryAttributes(sec_svc, jsonPoint, 'FRSTDIVNO')
+            if sec_atts is None:
+                return None
+            if sec_atts:
+                section_no = int(sec_atts['FRSTDIVNO'])
+                if section_no > 0:
+                    trs_text = "Location: T" + str(town_no) + town_dir + ", R" + str(range_no) + range_dir + ", Sec " + str(section_no) + "\n" + mer_txt
+
+    cache[key] = {'time': time(), 'text': trs_text}
+    _writeCache(cache)
+    return trs_text
@@ -0,0 +1,643 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from heapq import heapify, heappop, heappush
+from math import ceil, floor, radians
+from multiprocessing import set_executable
+from os import cpu_count, path
+from sys import exec_prefix, executable, modules
+from types import ModuleType
+
+import numpy as np
+
+from arcpy import ListTransformations, NumPyArrayToRaster, Point, PointGeometry, Raster, RasterToNumPyArray, \
+    SpatialReference
+from arcpy.da import SearchCursor
+from arcpy.management import DefineProjection
+
+
+# Block-tiled NumPy counterparts of the Spatial Analyst focal mean, slope, hillshade and fill tools. Rasters are read in
+# tiles with a halo of overlapping cells so each tile can be processed on its own, the tiles are processed across a
+# pool of worker processes, and the results are assembled in memory and written once. Local DEMs are mosaicked the
+# same way, reading only the windows of each DEM under the AOI.
+
+# Rows and columns of a processing tile, not counting its halo
+tileSize = 2048
+
+# Largest number of worker processes; one core is left to ArcGIS Pro
+maxRasterWorkers = max(1, min(4, (cpu_count() or 2) - 1))
+
+
+def rasterInfo(raster):
+    ''' Returns the grid of a raster: its lower left and upper left coordinates, cell size, rows, columns and
+    spatial reference.'''
+    ras = Raster(raster)
+    return {'xMin': ras.extent.XMin,
+            'yMin': ras.extent.YMin,
+            'yMax': ras.extent.YMax,
+            'cellWidth': ras.meanCellWidth,
+            'cellHeight': ras.meanCellHeight,
+            'rows': ras.height,
+            'columns': ras.width,
+            'spatialReference': ras.spatialReference}
+
+
+def rasterTiles(info, size=None):
+    ''' Yields the (first row, first column, rows, columns) of the tiles covering a raster grid.'''
+    size = size or tileSize
+    for row in range(0, info['rows'], size):
+        for col in range(0, info['columns'], size):
+            yield row, col, min(size, info['rows'] - row), min(size, info['columns'] - col)
+
+
+def readBlock(raster, info, row, col, rows, cols, halo):
+    ''' Reads a tile of a raster as float32 with halo cells on every side. NoData, and halo cells beyond the edge of
+    the raster, are NaN. Returns the block and its padding: the number of halo rows or columns beyond the top,
+    bottom, left and right edges of the raster.'''
+    top = max(row - halo, 0)
+    left = max(col - halo, 0)
+    bottom = min(row + rows + halo, info['rows'])
+    right = min(col + cols + halo, info['columns'])
+
+    corner = Point(info['xMin'] + left * info['cellWidth'], info['yMax'] - bottom * info['cellHeight'])
+    block = RasterToNumPyArray(raster, corner, right - left, bottom - top, np.nan).astype(np.float32)
+
+    padding = (top - (row - halo), row + rows + halo - bottom, left - (col - halo), col + cols + halo - right)
+    return np.pad(block, (padding[:2], padding[2:]), constant_values=np.nan), padding
+
+
+def maskPadding(block, padding):
+    ''' Sets the cells of a block beyond the edges of its raster back to NaN.'''
+    top, bottom, left, right = padding
+    block[:top] = np.nan
+    block[block.shape[0] - bottom:] = np.nan
+    block[:, :left] = np.nan
+    block[:, block.shape[1] - right:] = np.nan
+    return block
+
+
+def writeRaster(array, info, outRaster, noData=None):
+    ''' Writes an array covering a raster grid to a raster dataset. NaN cells of float arrays are NoData.'''
+    lowerLeft = Point(info['xMin'], info['yMax'] - array.shape[0] * info['cellHeight'])
+    if noData is None:
+        ras = NumPyArrayToRaster(array, lowerLeft, info['cellWidth'], info['cellHeight'])
+    else:
+        ras = NumPyArrayToRaster(array, lowerLeft, info['cellWidth'], info['cellHeight'], noData)
+    ras.save(outRaster)
+    DefineProjection(outRaster, info['spatialReference'])
+    return outRaster
+
+
+@contextmanager
+def _workerPool(workers):
+    ''' Process pool for the block functions. Script tools run at module level, so the main module is hidden from the
+    worker processes to keep them from running the tool again. Under ArcGIS Pro sys.executable is ArcGISPro.exe, so
+    the workers are started with the python of its environment.'''
+    if not path.basename(executable).lower().startswith('python'):
+        set_executable(path.join(exec_prefix, 'pythonw.exe'))
+    mainModule = modules['__main__']
+    modules['__main__'] = ModuleType('__main__')
+    try:
+        with ProcessPoolExecutor(workers) as executor:
+            yield executor
+    finally:
+        modules['__main__'] = mainModule
+
+
+def processRaster(raster, blockFunction, halo, *args, workers=None):
+    ''' Runs blockFunction(block, padding, *args) over a raster in tiles read with halo cells of overlap (see
+    readBlock). blockFunction must be a module level function returning a tuple of arrays of the block's shape. The
+    halos are cropped, the tiles are assembled, and a list of full size arrays is returned with the raster info. Tiles
+    are spread over a process pool of up to maxRasterWorkers; at most two tiles per worker are held in memory while
+    waiting.'''
+    info = rasterInfo(raster)
+    tiles = list(rasterTiles(info))
+    workers = min(workers or maxRasterWorkers, len(tiles))
+    outputs = []
+
+    def placeTile(tile, results):
+        row, col, rows, cols = tile
+        for i, result in enumerate(results):
+            if len(outputs) <= i:
+                outputs.append(np.full((info['rows'], info['columns']), np.nan, dtype=result.dtype)
+                               if result.dtype.kind == 'f' else np.zeros((info['rows'], info['columns']), dtype=result.dtype))
+            outputs[i][row:row + rows, col:col + cols] = result[halo:halo + rows, halo:halo + cols]
+
+    if workers < 2:
+        for tile in tiles:
+            placeTile(tile, blockFunction(*readBlock(raster, info, *tile, halo), *args))
+        return outputs, info
+
+    with _workerPool(workers) as executor:
+        pending = {}
+        for tile in tiles:
+            if len(pending) >= 2 * workers:
+                done, notDone = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    placeTile(pending.pop(future), future.result())
+            pending[executor.submit(blockFunction, *readBlock(raster, info, *tile, halo), *args)] = tile
+        for future in list(pending):
+            placeTile(pending.pop(future), future.result())
+
+    return outputs, info
+
+
+def _boxSum(array, radius):
+    ''' Sum of each (2 * radius + 1) square window of an array from its integral image. Cells beyond the edge count
+    as 0.'''
+    size = 2 * radius + 1
+    integral = np.zeros((array.shape[0] + size, array.shape[1] + size))
+    integral[1:, 1:] = np.pad(array, radius).cumsum(0).cumsum(1)
+    return integral[size:, size:] - integral[:-size, size:] - integral[size:, :-size] + integral[:-size, :-size]
+
+
+def focalMean(block, radius=1):
+    ''' Mean of the data cells of each square window, like FocalStatistics RECTANGLE (2 * radius + 1) CELL MEAN DATA.
+    A cell is NaN only if its whole window is NaN.'''
+    valid = ~np.isnan(block)
+    sums = _boxSum(np.where(valid, block, 0).astype(np.float64), radius)
+    counts = _boxSum(valid.astype(np.float64), radius)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan).astype(np.float32)
+
+
+def hornGradients(block, cellWidth, cellHeight, zFactor=1):
+    ''' East and south rates of change of each cell from its 3 x 3 neighborhood (Horn 1981), as computed by Slope and
+    Hillshade. NaN neighbors take the value of the center cell; NaN cells stay NaN.'''
+    padded = np.pad(block, 1, constant_values=np.nan)
+    rows, cols = block.shape
+
+    def neighbor(dRow, dCol):
+        values = padded[1 + dRow:1 + dRow + rows, 1 + dCol:1 + dCol + cols]
+        return np.where(np.isnan(values), block, values)
+
+    a, b, c = neighbor(-1, -1), neighbor(-1, 0), neighbor(-1, 1)
+    d, f = neighbor(0, -1), neighbor(0, 1)
+    g, h, i = neighbor(1, -1), neighbor(1, 0), neighbor(1, 1)
+
+    dzdx = ((c + 2 * f + i) - (a + 2 * d + g)) / (8 * cellWidth) * zFactor
+    dzdy = ((g + 2 * h + i) - (a + 2 * b + c)) / (8 * cellHeight) * zFactor
+    return dzdx, dzdy
+
+
+def slopePercent(block, cellWidth, cellHeight, zFactor=1):
+    ''' Slope in percent rise, like Slope PERCENT_RISE.'''
+    dzdx, dzdy = hornGradients(block, cellWidth, cellHeight, zFactor)
+    return (np.sqrt(dzdx ** 2 + dzdy ** 2) * 100).astype(np.float32)
+
+
+def hillshade(block, cellWidth, cellHeight, zFactor=1, azimuth=315, altitude=45):
+    ''' Hillshade brightness from 0 to 255 for a light source at azimuth and altitude in degrees, like Hillshade
+    without shadows. NaN cells are -1.'''
+    dzdx, dzdy = hornGradients(block, cellWidth, cellHeight, zFactor)
+    zenith = radians(90 - altitude)
+    azimuthMath = radians((360 - azimuth + 90) % 360)
+
+    slope = np.arctan(np.sqrt(dzdx ** 2 + dzdy ** 2))
+    aspect = np.arctan2(dzdy, -dzdx)
+    aspect = np.where(aspect < 0, aspect + 2 * np.pi, aspect)
+
+    shade = 255 * (np.cos(zenith) * np.cos(slope) + np.sin(zenith) * np.sin(slope) * np.cos(azimuthMath - aspect))
+    shade = np.clip(np.round(shade), 0, 255)
+    return np.where(np.isnan(block), -1, shade).astype(np.int16)
+
+
+def smoothSlopeBlock(block, padding, cellWidth, cellHeight, zFactor):
+    ''' Block function returning the 3 x 3 mean of a DEM block and the percent slope of the smoothed block. Needs a
+    halo of 2 cells.'''
+    smooth = maskPadding(focalMean(block), padding)
+    return smooth, slopePercent(smooth, cellWidth, cellHeight, zFactor)
+
+
+def hillshadeBlock(block, padding, cellWidth, cellHeight, zFactor, azimuth=315, altitude=45):
+    ''' Block function returning the hillshade of a DEM block. Needs a halo of 1 cell.'''
+    return (hillshade(block, cellWidth, cellHeight, zFactor, azimuth, altitude),)
+
+
+def smoothAndSlope(dem, outSmooth, outSlope, zFactor):
+    ''' Writes the 3 x 3 mean of a DEM to outSmooth and the percent slope of the smoothed DEM to outSlope.'''
+    info = rasterInfo(dem)
+    (smooth, slope), info = processRaster(dem, smoothSlopeBlock, 2, info['cellWidth'], info['cellHeight'], zFactor)
+    writeRaster(smooth, info, outSmooth)
+    writeRaster(slope, info, outSlope)
+
+
+def createHillshade(dem, outHillshade, zFactor, azimuth=315, altitude=45):
+    ''' Writes the hillshade of a DEM to outHillshade.'''
+    info = rasterInfo(dem)
+    (shade,), info = processRaster(dem, hillshadeBlock, 1, info['cellWidth'], info['cellHeight'], zFactor, azimuth, altitude)
+    writeRaster(shade, info, outHillshade, -1)
+
+
+# Depression label of the cells outside the raster and of NoData cells, which every depression finally drains to
+_outside = 1
+
+
+def _priorityFlood(block, atEdges, labelStart):
+    ''' Priority-Flood (Barnes et al. 2014) of a DEM tile without epsilon gradients. The tile is flooded inwards from
+    its perimeter cells and from cells next to NoData, with a FIFO queue for cells raised to the current spill level.
+    Each flood region is labeled from labelStart up, and the lowest spill elevation between each pair of touching
+    regions, or between a region and the outside of the raster, is recorded.
+
+    atEdges tells which of the top, bottom, left and right sides of the tile are edges of the raster; the other sides
+    border tiles whose regions are connected by _resolveSpills.
+
+    Returns the filled elevations and region labels of the tile, the spill elevations {(label, label): elevation}, and
+    the next free label.'''
+    rows, cols = block.shape
+    width = cols + 2
+    dem = np.pad(block.astype(np.float64), 1, constant_values=np.nan)
+
+    # Frame of the tile: raster edges drain to the outside, sides shared with another tile (-1) are not followed
+    labels = np.zeros(dem.shape, dtype=np.int64)
+    labels[0], labels[-1], labels[:, 0], labels[:, -1] = -1, -1, -1, -1
+    for side, frame in zip(atEdges, ((0, slice(None)), (-1, slice(None)), (slice(None), 0), (slice(None), -1))):
+        if side:
+            labels[frame] = _outside
+    labels[1:-1, 1:-1][np.isnan(block)] = _outside
+
+    # Seed the cells that touch the frame or NoData
+    border = labels != 0
+    touching = np.zeros(dem.shape, dtype=bool)
+    touching[1:-1, 1:-1] = (border[:-2, :-2] | border[:-2, 1:-1] | border[:-2, 2:] | border[1:-1, :-2] | border[1:-1, 2:] |
+                            border[2:, :-2] | border[2:, 1:-1] | border[2:, 2:])
+    seeds = np.flatnonzero(touching & ~border)
+
+    elevations = dem.ravel().tolist()
+    filled = list(elevations)
+    label = labels.ravel().tolist()
+    offsets = (-width - 1, -width, -width + 1, -1, 1, width - 1, width, width + 1)
+
+    heap = [(elevations[i], i) for i in seeds.tolist()]
+    heapify(heap)
+    pit = deque()
+    spills = dict()
+    nextLabel = labelStart
+
+    while heap or pit:
+        cell = pit.popleft() if pit else heappop(heap)[1]
+        cellLabel = label[cell]
+        if cellLabel == 0:
+            cellLabel = label[cell] = nextLabel
+            nextLabel += 1
+        level = filled[cell]
+
+        for offset in offsets:
+            neighbor = cell + offset
+            neighborLabel = label[neighbor]
+            if neighborLabel:
+                if neighborLabel > 0 and neighborLabel != cellLabel:
+                    spill = level if neighborLabel == _outside else max(level, filled[neighbor])
+                    key = (cellLabel, neighborLabel) if cellLabel < neighborLabel else (neighborLabel, cellLabel)
+                    if spill < spills.get(key, np.inf):
+                        spills[key] = spill
+                continue
+            label[neighbor] = cellLabel
+            if elevations[neighbor] <= level:
+                filled[neighbor] = level
+                pit.append(neighbor)
+            else:
+                heappush(heap, (elevations[neighbor], neighbor))
+
+    filled = np.array(filled).reshape(dem.shape)[1:-1, 1:-1]
+    labels = np.array(label, dtype=np.int64).reshape(dem.shape)[1:-1, 1:-1]
+    labels[np.isnan(block)] = 0
+    return filled, labels, spills, nextLabel
+
+
+def _depthBlock(block, filled, zFactor):
+    ''' Depth of the filled cells of a block in the units of zFactor; cells that were not filled are NaN.'''
+    depth = (filled - block * zFactor).astype(np.float32)
+    depth[~(depth > 0)] = np.nan
+    return depth
+
+
+def fillLabelsBlock(block, padding, atEdges, labelStart, zFactor):
+    ''' Block function for the first pass of a tiled fill. Returns the spill elevations of the tile's flood regions
+    and the labels and filled elevations along the tile's top, bottom, left and right sides. NoData cells on the sides
+    are labeled as outside, since the cells next to them across the border drain into them.'''
+    filled, labels, spills, nextLabel = _priorityFlood(block * zFactor, atEdges, labelStart)
+    labels[np.isnan(block)] = _outside
+    sides = [(labels[0], filled[0]), (labels[-1], filled[-1]), (labels[:, 0], filled[:, 0]), (labels[:, -1], filled[:, -1])]
+    return spills, [(sideLabels.copy(), sideFilled.copy()) for sideLabels, sideFilled in sides]
+
+
+def fillDepthBlock(block, padding, atEdges, labelStart, zFactor, labelElevations=None):
+    ''' Block function returning the depression depth of a tile. labelElevations are the spill elevations of the
+    tile's flood regions from labelStart up, as resolved across tiles; without them the tile is filled on its own.'''
+    filled, labels, spills, nextLabel = _priorityFlood(block * zFactor, atEdges, labelStart)
+    if labelElevations is not None:
+        regions = labels >= labelStart
+        filled[regions] = np.maximum(filled[regions], labelElevations[labels[regions] - labelStart])
+    return (_depthBlock(block, filled, zFactor),)
+
+
+def _resolveSpills(spills):
+    ''' Spill elevation of every flood region: the lowest elevation at which it can drain to the outside of the raster
+    through the regions it touches. Returns {label: elevation}.'''
+    graph = dict()
+    for (first, second), spill in spills.items():
+        graph.setdefault(first, []).append((second, spill))
+        graph.setdefault(second, []).append((first, spill))
+
+    elevations = {_outside: -np.inf}
+    heap = [(-np.inf, _outside)]
+    done = set()
+    while heap:
+        elevation, region = heappop(heap)
+        if region in done:
+            continue
+        done.add(region)
+        for neighbor, spill in graph.get(region, []):
+            neighborElevation = max(elevation, spill)
+            if neighborElevation < elevations.get(neighbor, np.inf):
+                elevations[neighbor] = neighborElevation
+                heappush(heap, (neighborElevation, neighbor))
+    return elevations
+
+
+def _connectSides(spills, firstSides, secondSides):
+    ''' Records the spill elevations between the flood regions of two facing rows of cells on either side of a tile
+    border, each given as (labels, filled elevations), including diagonal neighbors.'''
+    firstLabels, firstFilled = firstSides
+    secondLabels, secondFilled = secondSides
+    for shift in (-1, 0, 1):
+        a = slice(max(0, -shift), len(firstLabels) - max(0, shift))
+        b = slice(max(0, shift), len(secondLabels) - max(0, -shift))
+        labelPairs = np.stack((firstLabels[a], secondLabels[b]))
+        spillElevations = np.fmax(firstFilled[a], secondFilled[b])
+        touching = (labelPairs[0] != labelPairs[1]) & ~np.isnan(spillElevations)
+        for first, second, spill in zip(labelPairs[0][touching].tolist(), labelPairs[1][touching].tolist(), spillElevations[touching].tolist()):
+            key = (first, second) if first < second else (second, first)
+            if spill < spills.get(key, np.inf):
+                spills[key] = spill
+
+
+def fillDepths(dem, outDepths, zFactor=1, workers=None):
+    ''' Writes the depth of the depressions of a DEM, like Fill followed by subtracting the DEM and keeping the cells
+    above 0, with elevations multiplied by zFactor. The DEM is filled with Priority-Flood in tiles; when it spans more
+    than one tile, the spill elevations of the tiles' flood regions are resolved along the tile borders and each tile
+    is filled again up to its regions' spill elevations.'''
+    info = rasterInfo(dem)
+    tiles = list(rasterTiles(info))
+    workers = min(workers or maxRasterWorkers, len(tiles))
+    tileCells = tileSize * tileSize
+
+    def tileArgs(index, tile):
+        row, col, rows, cols = tile
+        atEdges = (row == 0, row + rows == info['rows'], col == 0, col + cols == info['columns'])
+        return atEdges, 2 + index * tileCells, zFactor
+
+    depth = np.full((info['rows'], info['columns']), np.nan, dtype=np.float32)
+
+    def placeTile(tile, results):
+        row, col, rows, cols = tile
+        depth[row:row + rows, col:col + cols] = results[0]
+
+    def runTiles(blockFunction, extraArgs, collect):
+        if workers < 2:
+            for index, tile in enumerate(tiles):
+                collect(tile, blockFunction(*readBlock(dem, info, *tile, 0), *tileArgs(index, tile), *extraArgs(index)))
+            return
+        with _workerPool(workers) as executor:
+            pending = {}
+            for index, tile in enumerate(tiles):
+                if len(pending) >= 2 * workers:
+                    done, notDone = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(pending.pop(future), future.result())
+                pending[executor.submit(blockFunction, *readBlock(dem, info, *tile, 0), *tileArgs(index, tile), *extraArgs(index))] = tile
+            for future in list(pending):
+                collect(pending.pop(future), future.result())
+
+    # A single tile drains only to the outside of the raster and is filled in one pass
+    if len(tiles) == 1:
+        runTiles(fillDepthBlock, lambda index: (), placeTile)
+        writeRaster(depth, info, outDepths)
+        return outDepths
+
+    # First pass: flood regions of each tile, their spill elevations and the region labels along the tile sides
+    spills = dict()
+    sides = dict()
+
+    def collectSides(tile, results):
+        tileSpills, tileSides = results
+        for key, spill in tileSpills.items():
+            if spill < spills.get(key, np.inf):
+                spills[key] = spill
+        sides[tile[:2]] = tileSides
+
+    runTiles(fillLabelsBlock, lambda index: (), collectSides)
+
+    # Connect the regions across each border between tile rows and between tile columns
+    tileRows = sorted(set(tile[0] for tile in tiles))
+    tileCols = sorted(set(tile[1] for tile in tiles))
+    for upper, lower in zip(tileRows, tileRows[1:]):
+        _connectSides(spills, [np.concatenate([sides[(upper, col)][1][i] for col in tileCols]) for i in (0, 1)],
+                      [np.concatenate([sides[(lower, col)][0][i] for col in tileCols]) for i in (0, 1)])
+    for left, right in zip(tileCols, tileCols[1:]):
+        _connectSides(spills, [np.concatenate([sides[(row, left)][3][i] for row in tileRows]) for i in (0, 1)],
+                      [np.concatenate([sides[(row, right)][2][i] for row in tileRows]) for i in (0, 1)])
+    del sides
+
+    # Second pass: fill each tile up to the resolved spill elevations of its regions
+    elevations = _resolveSpills(spills)
+    del spills
+    tileElevations = [np.full(tile[2] * tile[3], -np.inf) for tile in tiles]
+    for region, elevation in elevations.items():
+        if region >= 2:
+            index, offset = divmod(region - 2, tileCells)
+            tileElevations[index][offset] = elevation
+    del elevations
+
+    runTiles(fillDepthBlock, lambda index: (tileElevations[index],), placeTile)
+    writeRaster(depth, info, outDepths)
+    return outDepths
+
+
+# Control points per side of the output grid used to fit the transformation from the output grid to a DEM in another
+# coordinate system
+_controlPoints = 9
+
+
+def _spatialReference(sr):
+    if isinstance(sr, str):
+        spatialReference = SpatialReference()
+        spatialReference.loadFromString(sr)
+        return spatialReference
+    return sr
+
+
+def _coordinateTransform(outSR, sourceSR, gridInfo, transformation=None):
+    ''' Returns a function mapping x and y arrays in outSR to sourceSR. Between different coordinate systems a second
+    order polynomial is fitted to control points across the output grid projected with projectAs, which is exact to
+    well under a cell over the extent of a tract.'''
+    if outSR.exportToString() == sourceSR.exportToString():
+        return lambda x, y: (x, y)
+
+    # Use the first of the given transformations (a list or ; delimited string) that applies between the two
+    if transformation:
+        names = transformation.split(';') if isinstance(transformation, str) else list(transformation)
+        available = ListTransformations(outSR, sourceSR)
+        transformation = next((name for name in names if name in available), None)
+
+    width = gridInfo['columns'] * gridInfo['cellWidth']
+    height = gridInfo['rows'] * gridInfo['cellHeight']
+    x0 = gridInfo['xMin'] + width / 2
+    y0 = gridInfo['yMax'] - height / 2
+    scale = max(width, height) / 2 or 1
+
+    controlX, controlY = np.meshgrid(np.linspace(gridInfo['xMin'], gridInfo['xMin'] + width, _controlPoints),
+                                     np.linspace(gridInfo['yMax'] - height, gridInfo['yMax'], _controlPoints))
+    projected = []
+    for x, y in zip(controlX.ravel().tolist(), controlY.ravel().tolist()):
+        point = PointGeometry(Point(x, y), outSR)
+        point = point.projectAs(sourceSR, transformation) if transformation else point.projectAs(sourceSR)
+        projected.append((point.firstPoint.X, point.firstPoint.Y))
+    projected = np.array(projected)
+
+    def terms(x, y):
+        u = (x - x0) / scale
+        v = (y - y0) / scale
+        return np.stack((np.ones_like(u), u, v, u * u, u * v, v * v), -1)
+
+    coefficients = np.linalg.lstsq(terms(controlX.ravel(), controlY.ravel()), projected, rcond=None)[0]
+    return lambda x, y: tuple(np.moveaxis(terms(x, y) @ coefficients, -1, 0))
+
+
+def _bilinear(block, rows, cols):
+    ''' Bilinear interpolation of a block at fractional row and column positions of cell centers. NaN and missing
+    neighbors are left out and the weights of the others rescaled; positions without a neighbor are NaN.'''
+    row0 = np.floor(rows).astype(np.int64)
+    col0 = np.floor(cols).astype(np.int64)
+    rowWeight = rows - row0
+    colWeight = cols - col0
+
+    total = np.zeros(rows.shape)
+    weights = np.zeros(rows.shape)
+    for dRow, dCol, weight in ((0, 0, (1 - rowWeight) * (1 - colWeight)), (0, 1, (1 - rowWeight) * colWeight),
+                               (1, 0, rowWeight * (1 - colWeight)), (1, 1, rowWeight * colWeight)):
+        r = row0 + dRow
+        c = col0 + dCol
+        inside = (r >= 0) & (r < block.shape[0]) & (c >= 0) & (c < block.shape[1])
+        values = np.full(rows.shape, np.nan)
+        values[inside] = block[r[inside], c[inside]]
+        valid = ~np.isnan(values)
+        total[valid] += values[valid] * weight[valid]
+        weights[valid] += weight[valid]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(weights > 0, total / weights, np.nan)
+
+
+def _polygonMask(rings, gridInfo):
+    ''' True for the cells of a grid whose centers are inside the polygon rings (lists of (x, y) vertices, holes
+    included, even-odd rule), like the mask of ExtractByMask.'''
+    edges = []
+    for ring in rings:
+        ring = np.array(ring, dtype=np.float64)
+        edges.append(np.hstack((ring, np.roll(ring, -1, 0))))
+    edges = np.vstack(edges)
+    edges = edges[edges[:, 1] != edges[:, 3]]
+
+    xCenters = gridInfo['xMin'] + (np.arange(gridInfo['columns']) + 0.5) * gridInfo['cellWidth']
+    mask = np.zeros((gridInfo['rows'], gridInfo['columns']), dtype=bool)
+    for row in range(gridInfo['rows']):
+        y = gridInfo['yMax'] - (row + 0.5) * gridInfo['cellHeight']
+        crossing = edges[(edges[:, 1] > y) != (edges[:, 3] > y)]
+        if len(crossing):
+            x = crossing[:, 0] + (y - crossing[:, 1]) * (crossing[:, 2] - crossing[:, 0]) / (crossing[:, 3] - crossing[:, 1])
+            mask[row] = np.searchsorted(np.sort(x), xCenters) % 2 == 1
+    return mask
+
+
+def mosaicWindows(rasters, aoi, outRaster, outSR, transformation=None):
+    ''' Mosaics the cells of rasters under the polygons of an AOI into one float32 raster in outSR, like ExtractByMask
+    of each raster followed by MosaicToNewRaster MEAN at the largest input cell size, without copying the inputs. The
+    output grid covers the AOI and is resampled once: each raster is read only in the windows under the output grid, a
+    strip of tileSize rows at a time, and interpolated bilinearly. transformation is the geographic transformation
+    used for rasters in another geographic coordinate system. Returns outRaster.'''
+    outSR = _spatialReference(outSR)
+
+    rings = []
+    xMin = yMin = np.inf
+    xMax = yMax = -np.inf
+    with SearchCursor(aoi, ['SHAPE@'], spatial_reference=outSR) as cursor:
+        for shape, in cursor:
+            xMin, yMin = min(xMin, shape.extent.XMin), min(yMin, shape.extent.YMin)
+            xMax, yMax = max(xMax, shape.extent.XMax), max(yMax, shape.extent.YMax)
+            for part in shape:
+                ring = []
+                for pnt in part:
+                    if pnt:
+                        ring.append((pnt.X, pnt.Y))
+                    elif ring:
+                        rings.append(ring)
+                        ring = []
+                if ring:
+                    rings.append(ring)
+    if not rings:
+        raise ValueError(f"{aoi} has no polygons")
+
+    # Each raster's grid and its cell size in the units of outSR
+    sources = []
+    for raster in rasters:
+        info = rasterInfo(raster)
+        sourceSR = info['spatialReference']
+        info['outCellSize'] = info['cellWidth'] * sourceSR.metersPerUnit / outSR.metersPerUnit
+        sources.append((raster, info))
+    cellSize = max(info['outCellSize'] for raster, info in sources)
+
+    # Output grid over the AOI, aligned to multiples of the cell size
+    gridXMin = floor(xMin / cellSize) * cellSize
+    gridYMax = ceil(yMax / cellSize) * cellSize
+    gridInfo = {'xMin': gridXMin,
+                'yMax': gridYMax,
+                'cellWidth': cellSize,
+                'cellHeight': cellSize,
+                'rows': max(1, ceil((gridYMax - yMin) / cellSize)),
+                'columns': max(1, ceil((xMax - gridXMin) / cellSize)),
+                'spatialReference': outSR}
+    gridInfo['yMin'] = gridYMax - gridInfo['rows'] * cellSize
+
+    total = np.zeros((gridInfo['rows'], gridInfo['columns']))
+    count = np.zeros((gridInfo['rows'], gridInfo['columns']), dtype=np.uint8)
+    xCenters = gridInfo['xMin'] + (np.arange(gridInfo['columns']) + 0.5) * cellSize
+
+    for raster, info in sources:
+        toSource = _coordinateTransform(outSR, info['spatialReference'], gridInfo, transformation)
+
+        for stripRow in range(0, gridInfo['rows'], tileSize):
+            stripRows = min(tileSize, gridInfo['rows'] - stripRow)
+            yCenters = gridInfo['yMax'] - (np.arange(stripRow, stripRow + stripRows) + 0.5) * cellSize
+            x, y = toSource(*np.meshgrid(xCenters, yCenters))
+
+            # Fractional row and column of the output cell centers in the raster, where cell centers are whole numbers
+            cols = (x - info['xMin']) / info['cellWidth'] - 0.5
+            rows = (info['yMax'] - y) / info['cellHeight'] - 0.5
+            inside = (cols >= -0.5) & (cols <= info['columns'] - 0.5) & (rows >= -0.5) & (rows <= info['rows'] - 0.5)
+            if not inside.any():
+                continue
+
+            # Window of the raster under the strip
+            left = max(int(np.floor(cols[inside].min())), 0)
+            right = min(int(np.floor(cols[inside].max())) + 2, info['columns'])
+            top = max(int(np.floor(rows[inside].min())), 0)
+            bottom = min(int(np.floor(rows[inside].max())) + 2, info['rows'])
+            corner = Point(info['xMin'] + left * info['cellWidth'], info['yMax'] - bottom * info['cellHeight'])
+            block = RasterToNumPyArray(raster, corner, right - left, bottom - top, np.nan).astype(np.float64)
+
+            values = np.full(rows.shape, np.nan)
+            values[inside] = _bilinear(block, rows[inside] - top, cols[inside] - left)
+            valid = ~np.isnan(values)
+            total[stripRow:stripRow + stripRows][valid] += values[valid]
+            count[stripRow:stripRow + stripRows][valid] += 1
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mosaic = np.where(count > 0, total / count, np.nan).astype(np.float32)
+    mosaic[~_polygonMask(rings, gridInfo)] = np.nan
+    if np.isnan(mosaic).all():
+        raise ValueError("The input rasters do not cover the AOI")
+
+    writeRaster(mosaic, gridInfo, outRaster)
+    return outRaster
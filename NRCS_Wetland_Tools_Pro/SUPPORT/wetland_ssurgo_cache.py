@@ -0,0 +1,139 @@
+from json import dumps, loads
+from os import environ, makedirs, path
+from sqlite3 import Error, connect
+
+from arcpy import Exists, SpatialReference
+from arcpy.analysis import Clip
+from arcpy.da import InsertCursor, SearchCursor
+from arcpy.management import AddField, CreateFeatureclass, CreateFileGDB, Delete
+
+
+# Soil property results from Soil Data Access, kept per user and reused while the survey area's tabular version is
+# unchanged. Each map unit keeps only the rows of its latest tabular version, so the cache does not grow over time.
+cacheFolder = path.join(environ.get('LOCALAPPDATA') or path.expanduser('~'), 'NRCS_Wetland_Tools')
+tabularCacheFile = path.join(cacheFolder, 'ssurgo_cache.sqlite')
+
+# Map unit polygons of whole survey areas, one feature class per areasymbol, with the cached spatial version of each
+# survey area recorded in the SQLite cache
+spatialCacheGDB = path.join(cacheFolder, 'ssurgo_cache.gdb')
+
+
+def _connect():
+    makedirs(cacheFolder, exist_ok=True)
+    conn = connect(tabularCacheFile, timeout=30)
+    conn.execute('''CREATE TABLE IF NOT EXISTS property_columns (
+                        property TEXT, aggmethod TEXT, columns TEXT, columninfo TEXT,
+                        PRIMARY KEY (property, aggmethod))''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS property_values (
+                        property TEXT, aggmethod TEXT, mukey TEXT, tabularversion TEXT, rows TEXT,
+                        PRIMARY KEY (property, aggmethod, mukey))''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS survey_areas (
+                        areasymbol TEXT PRIMARY KEY, spatialversion TEXT)''')
+    return conn
+
+
+def readPropertyCache(soilProperty, aggMethod, mukeyVersions):
+    ''' Returns the cached SDA column names and column info of a property query, or None if the property has not been
+    cached, and a dictionary of the cached result rows by mukey for the mukeys whose tabular version matches
+    mukeyVersions ({mukey: tabularversion}). A cache that cannot be read is treated as empty.'''
+    try:
+        conn = _connect()
+        try:
+            columns = conn.execute('SELECT columns, columninfo FROM property_columns WHERE property = ? AND aggmethod = ?',
+                                   (soilProperty, aggMethod)).fetchone()
+            if not columns:
+                return None, {}
+            cachedRows = {}
+            cursor = conn.execute('SELECT mukey, tabularversion, rows FROM property_values WHERE property = ? AND aggmethod = ?',
+                                  (soilProperty, aggMethod))
+            for mukey, version, rows in cursor:
+                if mukey in mukeyVersions and str(mukeyVersions[mukey]) == version:
+                    cachedRows[mukey] = loads(rows)
+            return [loads(columns[0]), loads(columns[1])], cachedRows
+        finally:
+            conn.close()
+    except (Error, OSError, ValueError):
+        return None, {}
+
+
+def writePropertyCache(soilProperty, aggMethod, table, mukeyVersions):
+    ''' Stores an SDA result table (column names, column info, then rows) for a property query, tagging each map unit's
+    rows with its tabular version. Rows of map units without a known tabular version are not stored.'''
+    columnNames = table[0]
+    if 'mukey' not in columnNames:
+        return
+    mukeyIndex = columnNames.index('mukey')
+
+    rowsByMukey = {}
+    for row in table[2:]:
+        rowsByMukey.setdefault(row[mukeyIndex], []).append(row)
+
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute('INSERT OR REPLACE INTO property_columns VALUES (?, ?, ?, ?)',
+                             (soilProperty, aggMethod, dumps(table[0]), dumps(table[1])))
+                conn.executemany('INSERT OR REPLACE INTO property_values VALUES (?, ?, ?, ?, ?)',
+                                 [(soilProperty, aggMethod, mukey, str(mukeyVersions[mukey]), dumps(rows))
+                                  for mukey, rows in rowsByMukey.items() if mukeyVersions.get(mukey) is not None])
+        finally:
+            conn.close()
+    except (Error, OSError):
+        pass
+
+
+def _surveyAreaFC(areasymbol):
+    return path.join(spatialCacheGDB, 'mupolygon_' + areasymbol)
+
+
+def isSurveyAreaCached(areasymbol, spatialversion):
+    ''' Returns True if the map unit polygons of a survey area are cached at the given spatial version.'''
+    try:
+        conn = _connect()
+        try:
+            row = conn.execute('SELECT spatialversion FROM survey_areas WHERE areasymbol = ?', (areasymbol,)).fetchone()
+        finally:
+            conn.close()
+    except (Error, OSError):
+        return False
+    return bool(row) and row[0] == str(spatialversion) and Exists(_surveyAreaFC(areasymbol))
+
+
+def cacheSurveyArea(areasymbol, spatialversion, polygons):
+    ''' Replaces the cached map unit polygons of a survey area with a list of (mukey, WGS84 WKT) rows and records the
+    spatial version they belong to.'''
+    if not Exists(spatialCacheGDB):
+        makedirs(cacheFolder, exist_ok=True)
+        CreateFileGDB(cacheFolder, path.basename(spatialCacheGDB))
+
+    areaFC = _surveyAreaFC(areasymbol)
+    if Exists(areaFC):
+        Delete(areaFC)
+    CreateFeatureclass(spatialCacheGDB, path.basename(areaFC), 'POLYGON', spatial_reference=SpatialReference(4326))
+    AddField(areaFC, 'mukey', 'TEXT', field_length=30)
+    with InsertCursor(areaFC, ['mukey', 'SHAPE@WKT']) as cursor:
+        for mukey, wkt in polygons:
+            cursor.insertRow([str(mukey), wkt])
+
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO survey_areas VALUES (?, ?)', (areasymbol, str(spatialversion)))
+    finally:
+        conn.close()
+
+
+def clipSurveyAreas(areasymbols, aoi):
+    ''' Clips the cached map unit polygons of survey areas to an AOI geometry. Returns a list of (mukey, WKT) rows.'''
+    polygons = []
+    clipFC = 'memory\\ssurgo_cache_clip'
+    for areasymbol in areasymbols:
+        if Exists(clipFC):
+            Delete(clipFC)
+        Clip(_surveyAreaFC(areasymbol), aoi, clipFC)
+        with SearchCursor(clipFC, ['mukey', 'SHAPE@WKT']) as cursor:
+            polygons.extend((mukey, wkt) for mukey, wkt in cursor if wkt)
+    if Exists(clipFC):
+        Delete(clipFC)
+    return polygons
@@ -0,0 +1,460 @@
+from os import path
+from sqlite3 import connect
+
+import numpy as np
+
+
+# Offline counterpart of the Soil Data Access queries of getSSURGO_WCT_ArcGISpro. The SSURGO tables are read from a
+# local SQLite export of the SSURGO database and every compileSQLquery aggregation is computed with NumPy group-bys.
+# Results are returned in the layout of an SDA "JSON+COLUMNNAME+METADATA" table (column names, column info, then rows
+# of text values) with the same columns as the SDA query, so they can be joined to the SSURGO layer the same way.
+
+# SDA data type and size of the columns returned by the SDA queries
+_sdaColumns = {'areasymbol': ('varchar', 20),
+               'musym': ('varchar', 6),
+               'muname': ('varchar', 240),
+               'mukey': ('int', 4),
+               'saversion': ('int', 4),
+               'surveyareadate': ('varchar', 10),
+               'spatialversion': ('int', 4),
+               'spatialdate': ('varchar', 10),
+               'tabularversion': ('int', 4),
+               'tabulardate': ('varchar', 10),
+               'hydric_rating': ('varchar', 22),
+               'ecoclassid': ('varchar', 30),
+               'hydclprs': ('smallint', 2),
+               'wtdepannmin': ('smallint', 2)}
+
+# ProviderType, NumericPrecision and NumericScale reported by SDA for each data type
+_sdaTypes = {'varchar': ('VarChar', 255, 255),
+             'int': ('Int', 10, 255),
+             'smallint': ('SmallInt', 5, 255),
+             'decimal': ('Decimal', 5, 2),
+             'float': ('Float', 15, 255)}
+
+# Ponding frequency classes in the order the comonth template prefers them; other classes sort first like NULL in SDA
+_frequencyRank = {'frequent': 1, 'common': 1, 'occasional': 2, 'rare': 3, 'none': 4, None: 4}
+
+_hydricRatings = ['Nonhydric', 'Hydric', 'Predominantly Hydric', 'Predominantly Nonydric', 'Partially Hydric', 'Error']
+
+
+def _connect(database, mukeys):
+    ''' Opens the local SSURGO database and loads the mukeys of interest into the temp table wct_mukeys.'''
+    if not path.isfile(database):
+        raise ValueError(f"Local SSURGO database {database} does not exist")
+    conn = connect(database)
+    conn.execute('CREATE TEMP TABLE wct_mukeys (mukey PRIMARY KEY)')
+    conn.executemany('INSERT OR IGNORE INTO wct_mukeys VALUES (?)', [(str(mukey),) for mukey in mukeys])
+    return conn
+
+
+def _columnInfo(columnNames, propertyType):
+    info = []
+    for ordinal, name in enumerate(columnNames):
+        dataType, size = _sdaColumns.get(name, propertyType)
+        providerType, precision, scale = _sdaTypes[dataType]
+        info.append(f"ColumnOrdinal={ordinal},ColumnSize={size},NumericPrecision={precision},NumericScale={scale},"
+                    f"ProviderType={providerType},IsLong=False,DataTypeName={dataType}")
+    return info
+
+
+def _text(value, decimals=None):
+    ''' Formats a value the way SDA returns it in JSON: text, or None for a null.'''
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if decimals is not None:
+        return f"{value:.{decimals}f}"
+    if isinstance(value, (float, np.floating)):
+        return f"{value:.15g}"
+    return str(value)
+
+
+def _round(values, decimals=2):
+    ''' Rounds half away from zero like a CAST to decimal in SQL Server. The small offset keeps halves that binary
+    floating point stores just below .5 (32.245 is 32.24499...) rounding up as exact decimal arithmetic does.'''
+    scale = 10 ** decimals
+    return np.sign(values) * np.floor(np.abs(values) * scale + 0.5 + 1e-9) / scale
+
+
+def _factorize(values):
+    ''' Returns integer codes of a list of values, None included, and the distinct values in order of their code.'''
+    distinct = {}
+    codes = np.fromiter((distinct.setdefault(value, len(distinct)) for value in values), dtype=np.int64, count=len(values))
+    return codes, list(distinct)
+
+
+def _firstOfGroups(groups, *keys):
+    ''' Returns the index of the first row of each group with the rows of a group ordered by keys, most significant
+    key first.'''
+    order = np.lexsort(tuple(reversed(keys)) + (groups,))
+    sortedGroups = groups[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = sortedGroups[1:] != sortedGroups[:-1]
+    return order[first]
+
+
+def _numbers(values):
+    return np.array([np.nan if value is None else float(value) for value in values], dtype=np.float64)
+
+
+def _lower(values):
+    return np.array(['' if value is None else str(value).strip().lower() for value in values], dtype=str)
+
+
+def _isNull(values):
+    return np.array([value is None for value in values], dtype=bool)
+
+
+def _mapunits(conn):
+    ''' Returns {mukey: (areasymbol, musym, muname)} of the mukeys of interest that are in a legend.'''
+    rows = conn.execute('''SELECT l.areasymbol, m.musym, m.muname, m.mukey FROM legend AS l
+                           INNER JOIN mapunit AS m ON m.lkey = l.lkey
+                           INNER JOIN wct_mukeys AS k ON m.mukey = k.mukey''')
+    return {str(mukey): (areasymbol, musym, muname) for areasymbol, musym, muname, mukey in rows}
+
+
+def _components(conn, mapunits, columns=''):
+    ''' Returns the mukey, cokey and comppct_r columns and any extra component columns of the components of the
+    mapunits, as lists.'''
+    rows = [row for row in conn.execute(f'''SELECT c.mukey, c.cokey, c.comppct_r{columns} FROM component AS c
+                                            INNER JOIN wct_mukeys AS k ON c.mukey = k.mukey''')
+            if str(row[0]) in mapunits]
+    return [list(column) for column in zip(*rows)] if rows else [[] for i in range(3 + columns.count(','))]
+
+
+def _dominantComponents(mukeyCodes, cokeys, comppct):
+    ''' Returns the index of the dominant component of each mapunit: the highest comppct_r, then the lowest cokey.'''
+    return _firstOfGroups(mukeyCodes, -np.nan_to_num(comppct, nan=-1.0), cokeys)
+
+
+def _cokeys(cokeys):
+    return np.array([int(cokey) for cokey in cokeys], dtype=np.int64)
+
+
+def mapunitAggregate(conn, ssurgoFld):
+    rows = conn.execute(f'''SELECT a.mukey, a.musym, a.muname, a.{ssurgoFld} FROM muaggatt AS a
+                            INNER JOIN wct_mukeys AS k ON a.mukey = k.mukey''')
+    return ['mukey', 'musym', 'muname', ssurgoFld], [[_text(value) for value in row] for row in rows]
+
+
+def dominantComponent(conn, ssurgoFld):
+    mapunits = _mapunits(conn)
+    mukeys, cokeys, comppct, values = _components(conn, mapunits, f', c.{ssurgoFld}')
+    mukeyCodes, distinctMukeys = _factorize([str(mukey) for mukey in mukeys])
+
+    rows = []
+    for i in _dominantComponents(mukeyCodes, _cokeys(cokeys), _numbers(comppct)):
+        mukey = distinctMukeys[mukeyCodes[i]]
+        rows.append(list(mapunits[mukey]) + [mukey, _text(values[i])])
+    return ['areasymbol', 'musym', 'muname', 'mukey', ssurgoFld], rows
+
+
+def dominantCondition(conn, ssurgoFld):
+    ''' The value with the largest summed comppct_r in each mapunit. Like the SDA template, which groups by value and
+    comppct_r before summing, components that share a value and a comppct_r count once. Ties go to the value seen
+    first; SDA breaks them arbitrarily.'''
+    mapunits = _mapunits(conn)
+    mukeys, cokeys, comppct, values = _components(conn, mapunits, f', c.{ssurgoFld}')
+    mukeyCodes, distinctMukeys = _factorize([str(mukey) for mukey in mukeys])
+    valueCodes, distinctValues = _factorize(values)
+    pct = np.nan_to_num(_numbers(comppct))
+
+    # Distinct (mapunit, value, comppct_r) rows, summed by mapunit and value
+    triples = np.unique(np.column_stack([mukeyCodes, valueCodes, pct]), axis=0)
+    pairs, pairIndex = np.unique(triples[:, :2], axis=0, return_inverse=True)
+    sums = np.bincount(pairIndex.ravel(), weights=triples[:, 2], minlength=len(pairs))
+    best = _firstOfGroups(pairs[:, 0], -sums, pairs[:, 1])
+
+    rows = []
+    for i in best:
+        mukey = distinctMukeys[int(pairs[i, 0])]
+        rows.append(list(mapunits[mukey]) + [mukey, _text(distinctValues[int(pairs[i, 1])])])
+    return ['areasymbol', 'musym', 'muname', 'mukey', ssurgoFld], rows
+
+
+def byComponent(conn):
+    ''' Hydric rating of each mapunit from the counts of its major, minor, hydric and nonhydric components.'''
+    mapunits = _mapunits(conn)
+    mukeys, cokeys, comppct, majcompflag, hydricrating = _components(conn, mapunits, ', c.majcompflag, c.hydricrating')
+    distinctMukeys = list(mapunits)
+    mukeyIndex = {mukey: i for i, mukey in enumerate(distinctMukeys)}
+    codes = np.array([mukeyIndex[str(mukey)] for mukey in mukeys], dtype=np.int64)
+
+    major = _lower(majcompflag) == 'yes'
+    minor = ~major & ~_isNull(majcompflag)
+    hydric = _lower(hydricrating) == 'yes'
+    hydricNull = _isNull(hydricrating)
+    notHydric = ~hydric & ~hydricNull
+
+    def count(mask=None):
+        return np.bincount(codes, weights=mask, minlength=len(distinctMukeys))
+
+    compCount = count()
+    countMajor = count(major)
+    allHydric = count(hydric)
+    majHydric = count(major & hydric)
+    majNotHydric = count(major & notHydric)
+    hydricInclusions = count(minor & hydric)
+
+    ratings = np.select([compCount == count(notHydric) + count(hydricNull),
+                         compCount == allHydric,
+                         (compCount != allHydric) & (countMajor == majHydric),
+                         (hydricInclusions >= 0.5) & (majHydric < 0.5),
+                         (majNotHydric >= 0.5) & (majHydric >= 0.5)],
+                        np.arange(5), default=5)
+
+    rows = [list(mapunits[mukey]) + [mukey, _hydricRatings[rating]] for mukey, rating in zip(distinctMukeys, ratings)]
+    return ['areasymbol', 'musym', 'muname', 'mukey', 'hydric_rating'], rows
+
+
+def _summedConditions(mukeyCodes, valueCodes, comppct):
+    ''' Sums comppct_r by mapunit and value. Returns the (mapunit code, value code) pairs and their sums.'''
+    pairs, pairIndex = np.unique(np.column_stack([mukeyCodes, valueCodes]), axis=0, return_inverse=True)
+    sums = np.bincount(pairIndex.ravel(), weights=np.nan_to_num(comppct), minlength=len(pairs))
+    return pairs, sums
+
+
+def _largestSums(pairs, sums):
+    ''' Returns a mask of the pairs whose sum is the largest of their mapunit.'''
+    largest = np.full(pairs[:, 0].max() + 1 if len(pairs) else 0, -np.inf)
+    np.maximum.at(largest, pairs[:, 0], sums)
+    return sums == largest[pairs[:, 0]]
+
+
+def coecoclass(conn, ssurgoFld):
+    ''' The NRCS ecological class value(s) with the largest summed comppct_r in each mapunit. Every tied value is
+    returned, as SDA does.'''
+    mapunits = _mapunits(conn)
+    rows = [row for row in conn.execute(f'''SELECT c.mukey, c.comppct_r, e.{ssurgoFld} FROM component AS c
+                                            INNER JOIN wct_mukeys AS k ON c.mukey = k.mukey
+                                            LEFT OUTER JOIN coecoclass AS e ON c.cokey = e.cokey
+                                            AND e.ecoclasstypename LIKE 'NRCS%' ''')
+            if str(row[0]) in mapunits]
+    if not rows:
+        return ['areasymbol', 'mukey', 'musym', ssurgoFld], []
+
+    mukeys, comppct, values = zip(*rows)
+    mukeyCodes, distinctMukeys = _factorize([str(mukey) for mukey in mukeys])
+    valueCodes, distinctValues = _factorize(values)
+    pairs, sums = _summedConditions(mukeyCodes, valueCodes, _numbers(comppct))
+
+    result = []
+    for mukeyCode, valueCode in pairs[_largestSums(pairs, sums)]:
+        mukey = distinctMukeys[mukeyCode]
+        areasymbol, musym, muname = mapunits[mukey]
+        result.append([areasymbol, mukey, musym, _text(distinctValues[valueCode])])
+    return ['areasymbol', 'mukey', 'musym', ssurgoFld], result
+
+
+def comonth(conn, ssurgoFld):
+    ''' The monthly class of each component is its most frequent one; the mapunit gets the class with the largest
+    summed comppct_r, components without monthly rows counting as 'None'. Ties go to the more frequent class.'''
+    mapunits = _mapunits(conn)
+    mukeys, cokeys, comppct = _components(conn, mapunits)
+    monthRows = conn.execute(f'''SELECT m.cokey, m.{ssurgoFld} FROM comonth AS m
+                                 INNER JOIN component AS c ON c.cokey = m.cokey
+                                 INNER JOIN wct_mukeys AS k ON c.mukey = k.mukey''').fetchall()
+
+    # Most frequent class of each component
+    componentClass = {}
+    if monthRows:
+        monthCokeys, classes = zip(*monthRows)
+        classCodes, distinctClasses = _factorize(classes)
+        ranks = np.array([_frequencyRank.get(None if value is None else str(value).lower(), 0) for value in distinctClasses])
+        cokeyCodes, distinctCokeys = _factorize([int(cokey) for cokey in monthCokeys])
+        for i in _firstOfGroups(cokeyCodes, ranks[classCodes]):
+            componentClass[distinctCokeys[cokeyCodes[i]]] = distinctClasses[classCodes[i]]
+
+    values = [componentClass.get(int(cokey)) or 'None' for cokey in cokeys]
+    mukeyCodes, distinctMukeys = _factorize([str(mukey) for mukey in mukeys])
+    valueCodes, distinctValues = _factorize(values)
+    pairs, sums = _summedConditions(mukeyCodes, valueCodes, _numbers(comppct))
+    pairs = pairs[_largestSums(pairs, sums)]
+
+    # Of the classes tied for the largest sum, the most frequent one
+    ranks = np.array([_frequencyRank.get(str(value).lower(), 0) for value in distinctValues])
+    result = []
+    for i in _firstOfGroups(pairs[:, 0], ranks[pairs[:, 1]]):
+        mukey = distinctMukeys[pairs[i, 0]]
+        areasymbol, musym, muname = mapunits[mukey]
+        result.append([areasymbol, mukey, musym, _text(distinctValues[pairs[i, 1]])])
+    return ['areasymbol', 'mukey', 'musym', ssurgoFld], result
+
+
+def _horizons(conn, ssurgoFld, textureGroups=False):
+    ''' Returns the cokey, hzname, hzdept_r, hzdepb_r and property columns of the horizons of the components of the
+    mukeys of interest, with the texture of their representative texture group if textureGroups is set.'''
+    texture = ', t.texture' if textureGroups else ''
+    join = "INNER JOIN chtexturegrp AS t ON t.chkey = h.chkey AND lower(t.rvindicator) = 'yes'" if textureGroups else ''
+    rows = conn.execute(f'''SELECT h.cokey, h.hzname, h.hzdept_r, h.hzdepb_r, h.{ssurgoFld}{texture} FROM chorizon AS h
+                            {join}
+                            INNER JOIN component AS c ON c.cokey = h.cokey
+                            INNER JOIN wct_mukeys AS k ON c.mukey = k.mukey''').fetchall()
+    return [list(column) for column in zip(*rows)] if rows else [[] for i in range(6 if textureGroups else 5)]
+
+
+def minMax(conn, ssurgoFld, minMaxFunction):
+    ''' The minimum or maximum horizon value of the dominant component of each mapunit, leaving out organic surface
+    horizons shallower than 10 cm and horizons with an 'r' in their name.'''
+    mapunits = _mapunits(conn)
+    mukeys, cokeys, comppct = _components(conn, mapunits)
+    mukeyCodes, distinctMukeys = _factorize([str(mukey) for mukey in mukeys])
+    cokeys = _cokeys(cokeys)
+    dominant = _dominantComponents(mukeyCodes, cokeys, _numbers(comppct))
+
+    hzCokeys, hznames, tops, bottoms, values = _horizons(conn, ssurgoFld)
+    names = _lower(hznames)
+    tops = _numbers(tops)
+    values = _numbers(values)
+    excluded = ((np.char.find(names, 'o') >= 0) & (tops < 10)) | (np.char.find(names, 'r') >= 0)
+    keep = ~excluded & ~np.isnan(values)
+
+    componentValue = {}
+    if keep.any():
+        hzCodes, distinctCokeys = _factorize([int(cokey) for cokey in np.asarray(hzCokeys, dtype=object)[keep]])
+        sign = -1.0 if minMaxFunction.upper() == 'MAX' else 1.0
+        for i in _firstOfGroups(hzCodes, sign * values[keep]):
+            componentValue[distinctCokeys[hzCodes[i]]] = values[keep][i]
+
+    rows = []
+    for i in dominant:
+        mukey = distinctMukeys[mukeyCodes[i]]
+        rows.append(list(mapunits[mukey]) + [mukey, _text(componentValue.get(int(cokeys[i])))])
+    return ['areasymbol', 'musym', 'muname', 'mukey', ssurgoFld], rows
+
+
+def weightedAverage(conn, ssurgoFld, topDepth, bottomDepth, dominantOnly=False):
+    ''' The depth weighted average of a horizon property between topDepth and bottomDepth for each component,
+    weighted by comppct_r over the major components of each mapunit (only the dominant component if dominantOnly is
+    set, and only when it is a major component). Organic, bedrock and "PM", "MPT", "PEAT", "br", "wb", "DOM" and
+    "MUCK" texture horizons are left out, as in the SDA template. Every mapunit gets a row.'''
+    topDepth = float(topDepth)
+    bottomDepth = float(bottomDepth)
+    mapunits = _mapunits(conn)
+    mukeys, cokeys, comppct, majcompflag = _components(conn, mapunits, ', c.majcompflag')
+    mukeyCodes, distinctMukeys = _factorize([str(mukey) for mukey in mukeys])
+    cokeys = _cokeys(cokeys)
+    pct = _numbers(comppct)
+
+    selected = _lower(majcompflag) == 'yes'
+    if dominantOnly:
+        dominant = np.zeros(len(cokeys), dtype=bool)
+        dominant[_dominantComponents(mukeyCodes, cokeys, pct)] = True
+        selected &= dominant
+
+    # Share of each selected component in the summed comppct_r of its mapunit's selected components
+    sumPct = np.bincount(mukeyCodes[selected], weights=np.nan_to_num(pct[selected]), minlength=len(distinctMukeys))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        share = np.where(pct == sumPct[mukeyCodes], 1.0, _round(pct / sumPct[mukeyCodes]))
+    componentShare = dict(zip(cokeys[selected], share[selected]))
+    componentMukey = dict(zip(cokeys[selected], mukeyCodes[selected]))
+
+    hzCokeys, hznames, tops, bottoms, values, textures = _horizons(conn, ssurgoFld, textureGroups=True)
+    names = _lower(hznames)
+    textureUpper = np.char.upper(_lower(textures))
+    tops = _numbers(tops)
+    bottoms = _numbers(bottoms)
+
+    keep = ~_isNull(hznames) & ~_isNull(textures)
+    keep &= (np.char.find(names, 'o') < 0) & (np.char.find(names, 'r') < 0)
+    keep &= ~np.isnan(tops) & (bottoms > topDepth) & (tops < bottomDepth)
+    for pattern in ('PM', 'MPT', 'PEAT', 'BR', 'WB'):
+        keep &= np.char.find(textureUpper, pattern) < 0
+    keep &= ~np.char.endswith(textureUpper, 'DOM') & ~np.char.endswith(textureUpper, 'MUCK')
+    hzCokeys = np.array([int(cokey) for cokey in hzCokeys], dtype=np.int64)
+    keep &= np.isin(hzCokeys, cokeys[selected])
+
+    mapunitValue = np.zeros(len(distinctMukeys))
+    hasValue = np.zeros(len(distinctMukeys), dtype=bool)
+    if keep.any():
+        hzCokeys = hzCokeys[keep]
+        thickness = _round(np.minimum(bottoms[keep], bottomDepth) - np.maximum(tops[keep], topDepth))
+        values = _round(np.nan_to_num(_numbers(values)[keep]))
+        hzCodes, distinctCokeys = _factorize(list(hzCokeys))
+        sumThickness = np.bincount(hzCodes, weights=thickness)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            componentAverage = np.bincount(hzCodes, weights=thickness / sumThickness[hzCodes] * values)
+
+        weighted = np.array([componentShare[cokey] for cokey in distinctCokeys]) * componentAverage
+        owners = np.array([componentMukey[cokey] for cokey in distinctCokeys], dtype=np.int64)
+        mapunitValue = np.bincount(owners, weights=weighted, minlength=len(distinctMukeys))
+        hasValue[owners] = True
+
+    mapunitValue = _round(mapunitValue)
+    mukeyIndex = {mukey: code for code, mukey in enumerate(distinctMukeys)}
+    rows = []
+    for mukey in mapunits:
+        areasymbol, musym, muname = mapunits[mukey]
+        code = mukeyIndex.get(mukey)
+        value = mapunitValue[code] if code is not None and hasValue[code] else None
+        rows.append([areasymbol, musym, muname, mukey, _text(value, decimals=2)])
+    return ['areasymbol', 'musym', 'muname', 'mukey', ssurgoFld], rows
+
+
+def aggregateProperty(database, ssurgoFld, aggregationMethod, mukeys, topDepth=None, bottomDepth=None, minMaxFunction=None):
+    ''' Computes a compileSQLquery aggregation of a SSURGO property for the mukeys from a local SSURGO database.
+    Returns the result as an SDA table: [column names, column info, rows...]. topDepth and bottomDepth are used by the
+    'Weighted Average' and 'Dominant Component (Numeric)' methods and minMaxFunction ('MIN' or 'MAX') by 'Min\\Max'.
+    Raises ValueError for an unknown aggregation method.'''
+    conn = _connect(database, mukeys)
+    try:
+        propertyType = ('varchar', 254)
+        if aggregationMethod == 'Mapunit Aggregate':
+            columns, rows = mapunitAggregate(conn, ssurgoFld)
+        elif aggregationMethod == 'Dominant Component (Category)':
+            columns, rows = dominantComponent(conn, ssurgoFld)
+        elif aggregationMethod == 'Dominant Condition':
+            columns, rows = dominantCondition(conn, ssurgoFld)
+        elif aggregationMethod == 'By Component':
+            columns, rows = byComponent(conn)
+        elif aggregationMethod == 'coecoclass':
+            columns, rows = coecoclass(conn, ssurgoFld)
+        elif aggregationMethod == 'comonth':
+            columns, rows = comonth(conn, ssurgoFld)
+        elif aggregationMethod == 'Min\\Max':
+            columns, rows = minMax(conn, ssurgoFld, minMaxFunction)
+            propertyType = ('float', 8)
+        elif aggregationMethod in ('Weighted Average', 'Dominant Component (Numeric)'):
+            columns, rows = weightedAverage(conn, ssurgoFld, topDepth, bottomDepth,
+                                            dominantOnly=aggregationMethod == 'Dominant Component (Numeric)')
+            propertyType = ('decimal', 17)
+        else:
+            raise ValueError(f"{aggregationMethod} aggregation method is invalid")
+        return [columns, _columnInfo(columns, propertyType)] + rows
+    finally:
+        conn.close()
+
+
+def _isoDate(value):
+    ''' Returns a date as yyyy-mm-dd, like CONVERT(varchar(10), date, 126) in SDA.'''
+    if value is None:
+        return None
+    value = str(value)
+    if len(value) >= 10 and value[2] == '/' and value[5] == '/':
+        return f"{value[6:10]}-{value[0:2]}-{value[3:5]}"
+    return value[:10]
+
+
+def mapunitAttributes(database, mukeys):
+    ''' Returns the mapunit, survey area, spatial and tabular version columns of the SDA geometry query for the mukeys
+    as an SDA table: [column names, column info, rows...].'''
+    conn = _connect(database, mukeys)
+    try:
+        rows = conn.execute('''SELECT L.areasymbol, M.musym, M.muname, M.mukey, SA.saversion, SA.saverest,
+                               S.spatialversion, S.spatialverest, T.tabularversion, T.tabularverest
+                               FROM mapunit AS M
+                               INNER JOIN wct_mukeys AS K ON M.mukey = K.mukey
+                               INNER JOIN legend AS L ON M.lkey = L.lkey
+                               INNER JOIN sacatalog AS SA ON L.areasymbol = SA.areasymbol
+                               INNER JOIN saspatialver AS S ON L.areasymbol = S.areasymbol
+                               INNER JOIN satabularver AS T ON L.areasymbol = T.areasymbol''').fetchall()
+    finally:
+        conn.close()
+
+    columns = ['areasymbol', 'musym', 'muname', 'mukey', 'saversion', 'surveyareadate',
+               'spatialversion', 'spatialdate', 'tabularversion', 'tabulardate']
+    table = [columns, _columnInfo(columns, ('varchar', 254))]
+    for row in rows:
+        table.append([_text(row[0]), _text(row[1]), _text(row[2]), _text(row[3]), _text(row[4]), _isoDate(row[5]),
+                      _text(row[6]), _isoDate(row[7]), _text(row[8]), _isoDate(row[9])])
+    return table
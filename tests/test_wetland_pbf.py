@@ -0,0 +1,131 @@
+from os import path
+from struct import pack
+import sys
+
+import pytest
+
+sys.path.insert(0, path.join(path.dirname(path.dirname(path.abspath(__file__))), 'NRCS_Wetland_Tools_Pro', 'SUPPORT'))
+
+from wetland_pbf import decodeFeatureCollection
+
+
+# Canned FeatureCollectionPBuffer responses, encoded field by field the way a feature service writes them for f=pbf.
+# Default values (geometry type 0, upper left origin, zero counts) are left out, as proto3 does.
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def _key(number, wireType):
+    return _varint(number << 3 | wireType)
+
+
+def _uint(number, value):
+    return _key(number, 0) + _varint(value)
+
+
+def _double(number, value):
+    return _key(number, 1) + pack('<d', value)
+
+
+def _bytes(number, value):
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    return _key(number, 2) + _varint(len(value)) + value
+
+
+def _packed(number, values):
+    return _bytes(number, b''.join(_varint(value) for value in values))
+
+
+def _collection(queryResult):
+    return _bytes(1, '10.91') + _bytes(2, queryResult)
+
+
+def _featureResult(geometryType=None, fields=(), features=(), scale=(1.0, 1.0), translate=(0.0, 0.0)):
+    result = _bytes(1, 'OBJECTID')
+    if geometryType is not None:
+        result += _uint(7, geometryType)
+    result += _bytes(8, _uint(1, 102100) + _uint(2, 3857))
+    result += _bytes(12, _bytes(2, _double(1, scale[0]) + _double(2, scale[1])) +
+                         _bytes(3, _double(1, translate[0]) + _double(2, translate[1])))
+    for name, fieldType in fields:
+        result += _bytes(13, _bytes(1, name) + _uint(2, fieldType))
+    for feature in features:
+        result += _bytes(15, feature)
+    return _collection(_bytes(1, result))
+
+
+def _feature(values, lengths=None, coords=None):
+    feature = b''.join(_bytes(1, value) for value in values)
+    if coords is not None:
+        geometry = _packed(2, lengths) if lengths else b''
+        geometry += _packed(3, [_zigzag(coord) for coord in coords])
+        feature += _bytes(2, geometry)
+    return feature
+
+
+def test_point_layer_without_geometry_type():
+    data = _featureResult(fields=[('OBJECTID', 6), ('name', 4)],
+                          features=[_feature([_uint(5, 7), _bytes(1, 'pt')], coords=[4, 6])],
+                          scale=(0.5, 0.5), translate=(100.0, 200.0))
+    results = decodeFeatureCollection(data)
+    assert results['geometryType'] == 'esriGeometryPoint'
+    assert results['spatialReference'] == {'wkid': 102100, 'latestWkid': 3857}
+    assert results['features'] == [{'attributes': {'OBJECTID': 7, 'name': 'pt'}, 'geometry': {'x': 102.0, 'y': 197.0}}]
+
+
+def test_polygon_with_quantized_deltas():
+    # Square ring from (10, 20) to (12, 22) in map units, quantized at 0.5 from an upper left origin at (0, 30)
+    ring = [20, 20, 4, 0, 0, -4, -4, 0, 0, 4]
+    data = _featureResult(geometryType=3,
+                          fields=[('OBJECTID', 6), ('acres', 3)],
+                          features=[_feature([_uint(5, 1), _double(3, 1.25)], lengths=[5], coords=ring)],
+                          scale=(0.5, 0.5), translate=(0.0, 30.0))
+    results = decodeFeatureCollection(data)
+    assert results['geometryType'] == 'esriGeometryPolygon'
+    feature = results['features'][0]
+    assert feature['attributes'] == {'OBJECTID': 1, 'acres': 1.25}
+    assert feature['geometry'] == {'rings': [[[10.0, 20.0], [12.0, 20.0], [12.0, 22.0], [10.0, 22.0], [10.0, 20.0]]]}
+
+
+def test_no_geometry_result():
+    data = _featureResult(geometryType=127, fields=[('OBJECTID', 6)], features=[_feature([_uint(5, 3)])])
+    results = decodeFeatureCollection(data)
+    assert 'geometryType' not in results
+    assert results['features'] == [{'attributes': {'OBJECTID': 3}}]
+
+
+def test_null_attribute():
+    data = _featureResult(geometryType=3, fields=[('OBJECTID', 6), ('name', 4)],
+                          features=[_feature([_uint(5, 2), b''], lengths=[4], coords=[0, 0, 2, 0, 0, -2, -2, 2])])
+    assert decodeFeatureCollection(data)['features'][0]['attributes'] == {'OBJECTID': 2, 'name': None}
+
+
+def test_count_result():
+    assert decodeFeatureCollection(_collection(_bytes(2, _uint(1, 42)))) == {'count': 42}
+    assert decodeFeatureCollection(_collection(_bytes(2, b''))) == {'count': 0}
+
+
+def test_object_ids_result():
+    data = _collection(_bytes(3, _bytes(1, 'OBJECTID') + _packed(3, [5, 300, 70000])))
+    assert decodeFeatureCollection(data) == {'objectIdFieldName': 'OBJECTID', 'objectIds': [5, 300, 70000]}
+
+
+def test_invalid_data():
+    with pytest.raises(ValueError):
+        decodeFeatureCollection(b'{"error": {"code": 400}}')
+    with pytest.raises(ValueError):
+        decodeFeatureCollection(_collection(_bytes(1, _bytes(13, b'\x0a\x05ab'))))
@@ -0,0 +1,347 @@
+from argparse import ArgumentParser
+from os import path
+from random import Random
+from re import IGNORECASE, compile as compileRegex, sub
+from sqlite3 import connect
+import sys
+from time import perf_counter
+
+sys.path.insert(0, path.join(path.dirname(path.dirname(path.abspath(__file__))), 'NRCS_Wetland_Tools_Pro', 'SUPPORT'))
+
+import getSSURGO_WCT_ArcGISpro as ssurgo
+
+
+# Offline check of the compileSQLquery templates in getSSURGO_WCT_ArcGISpro.py. Every template is compiled for a
+# sample SSURGO database built in SQLite, translated from the T-SQL dialect of Soil Data Access, and timed. Templates
+# that have a previous version in legacyQuery are also run the old way and their results compared, so a rewrite can be
+# checked for query cost and identical results before a release. It is a developer tool and is not shipped with the
+# toolbox. Run it from the ArcGIS Pro Python environment:
+#
+#   python tools/wetland_sda_benchmark.py --mapunits 500 --repeat 5
+
+# (SSURGO property, aggregation method, table the template reads the property column from) of each sample template
+sampleTemplates = [('Drainage Class', 'Dominant Condition', 'component'),
+                   ('Hydric Condition', 'Dominant Condition', 'component'),
+                   ('Hydrologic Soil Group', 'Dominant Component (Category)', 'component'),
+                   ('Hydric Rating', 'By Component', None),
+                   ('Ecological Classification Name', 'coecoclass', 'coecoclass'),
+                   ('Ecological Classification ID', 'coecoclass', 'coecoclass'),
+                   ('Ponding Frequency Class', 'comonth', 'comonth'),
+                   ('Flooding Frequency', 'Mapunit Aggregate', 'muaggatt'),
+                   ('Hydric Classification Presence', 'Mapunit Aggregate', 'muaggatt'),
+                   ('Water Table Depth Annual Minimum', 'Mapunit Aggregate', 'muaggatt'),
+                   ('Total Clay - Rep Value', 'Dominant Component (Numeric)', 'chorizon'),
+                   ('Total Clay - Rep Value', 'Weighted Average', 'chorizon'),
+                   ('Total Clay - Rep Value', 'Min\\Max', 'chorizon')]
+
+# Depth range and min/max function read by the horizon templates from module level names of getSSURGO_WCT_ArcGISpro
+templateSettings = {'tDep': '0', 'bDep': '100', 'mmC': 'MAX'}
+
+# Sample values of the property columns; numeric columns get random numbers instead
+sampleValues = {'drainagecl': ['Well drained', 'Moderately well drained', 'Somewhat poorly drained', 'Poorly drained', None],
+                'hydricon': ['Hydric', 'Not hydric', None],
+                'hydgrp': ['A', 'B', 'C', 'D', 'B/D', None],
+                'ecoclassname': ['Loamy Upland', 'Wet Meadow', 'Sandy', None],
+                'ecoclassid': ['R102AY001', 'R102AY002', 'F102AY003', None],
+                'pondfreqcl': ['None', 'Rare', 'Occasional', 'Frequent', None],
+                'flodfreqdcd': ['None', 'Rare', 'Occasional', 'Frequent', None],
+                'hydclprs': [0, 5, 15, 85, 100, None]}
+
+# SDA compares text without regard to case, so the sample tables do too
+_text = 'TEXT COLLATE NOCASE'
+
+_schema = [f'CREATE TABLE legend (lkey INTEGER PRIMARY KEY, areasymbol {_text})',
+           f'CREATE TABLE mapunit (mukey INTEGER PRIMARY KEY, lkey INTEGER, musym {_text}, muname {_text})',
+           f'''CREATE TABLE component (cokey INTEGER PRIMARY KEY, mukey INTEGER, compname {_text}, comppct_r INTEGER,
+                                       majcompflag {_text}, hydricrating {_text})''',
+           f'CREATE TABLE coecoclass (coecoclasskey INTEGER PRIMARY KEY, cokey INTEGER, ecoclasstypename {_text})',
+           f'CREATE TABLE comonth (comonthkey INTEGER PRIMARY KEY, cokey INTEGER, month {_text})',
+           f'''CREATE TABLE chorizon (chkey INTEGER PRIMARY KEY, cokey INTEGER, hzname {_text}, hzdept_r INTEGER,
+                                      hzdepb_r INTEGER)''',
+           f'CREATE TABLE chtexturegrp (chtgkey INTEGER PRIMARY KEY, chkey INTEGER, texture {_text}, rvindicator {_text})',
+           f'CREATE TABLE muaggatt (mukey INTEGER PRIMARY KEY, musym {_text}, muname {_text})',
+           'CREATE INDEX mapunit_lkey ON mapunit (lkey)',
+           'CREATE INDEX component_mukey ON component (mukey)',
+           'CREATE INDEX coecoclass_cokey ON coecoclass (cokey)',
+           'CREATE INDEX comonth_cokey ON comonth (cokey)',
+           'CREATE INDEX chorizon_cokey ON chorizon (cokey)',
+           'CREATE INDEX chtexturegrp_chkey ON chtexturegrp (chkey)']
+
+
+def createSampleDatabase(mapunits=200, seed=1):
+    ''' Returns an in-memory SQLite connection holding a random sample of the SSURGO tables read by compileSQLquery,
+    with the property column of every sample template. Mapunits without components, tied component percentages,
+    null ratings and non-NRCS ecological classes are all included. The same seed always builds the same data.'''
+    rnd = Random(seed)
+    conn = connect(':memory:')
+    for statement in _schema:
+        conn.execute(statement)
+
+    propertyColumns = {}
+    for soilProperty, aggregationMethod, table in sampleTemplates:
+        if table:
+            propertyColumns.setdefault(table, set()).add(ssurgo.lookupSSURGOFieldName(soilProperty).strip())
+    for table, columns in propertyColumns.items():
+        for column in sorted(columns):
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {_text if column in sampleValues else "REAL"}')
+
+    def values(table):
+        return {column: rnd.choice(sampleValues[column]) if column in sampleValues else round(rnd.uniform(0, 60), 1)
+                for column in sorted(propertyColumns.get(table, ()))}
+
+    def insert(table, row):
+        row.update(values(table))
+        conn.execute(f'INSERT INTO {table} ({", ".join(row)}) VALUES ({", ".join("?" * len(row))})', list(row.values()))
+
+    keys = {'cokey': 0, 'chkey': 0}
+    for lkey in range(1, 4):
+        insert('legend', {'lkey': lkey, 'areasymbol': f'WI{lkey:03d}'})
+
+    for mukey in range(100001, 100001 + mapunits):
+        musym = f'{rnd.choice("ABCDEFGH")}{rnd.randint(1, 99)}'
+        muname = f'Sample mapunit {mukey}'
+        insert('mapunit', {'mukey': mukey, 'lkey': rnd.randint(1, 3), 'musym': musym, 'muname': muname})
+        insert('muaggatt', {'mukey': mukey, 'musym': musym, 'muname': muname})
+
+        for comp in range(rnd.choice([0, 1, 2, 3, 3, 4, 5, 6])):
+            keys['cokey'] += 1
+            cokey = keys['cokey']
+            comppct = rnd.choice([5, 10, 10, 15, 20, 25, 30, 40, 50, 60, 85])
+            insert('component', {'cokey': cokey, 'mukey': mukey, 'compname': f'Series{rnd.randint(1, 40)}',
+                                 'comppct_r': comppct, 'majcompflag': 'Yes' if comppct >= 15 else 'No ',
+                                 'hydricrating': rnd.choice(['Yes', 'No', 'No', None])})
+
+            for eco in range(rnd.randint(0, 2)):
+                insert('coecoclass', {'cokey': cokey,
+                                      'ecoclasstypename': rnd.choice(['NRCS Rangeland Site', 'NRCS Forestland Site',
+                                                                      'Forage Suitability Group'])})
+            for month in ('January', 'April', 'July', 'October'):
+                insert('comonth', {'cokey': cokey, 'month': month})
+
+            depth = 0
+            for hzname in rnd.sample(['Oi', 'Ap', 'A', 'Bt', 'Bw', 'C', 'Cr', 'R'], rnd.randint(1, 5)):
+                keys['chkey'] += 1
+                bottom = depth + rnd.randint(5, 60)
+                insert('chorizon', {'chkey': keys['chkey'], 'cokey': cokey, 'hzname': hzname,
+                                    'hzdept_r': depth, 'hzdepb_r': bottom})
+                insert('chtexturegrp', {'chkey': keys['chkey'], 'rvindicator': 'Yes',
+                                        'texture': rnd.choice(['SIL', 'L', 'SICL', 'FSL', 'MUCK', 'SPM'])})
+                depth = bottom
+
+    conn.commit()
+    return conn
+
+
+def legacyQuery(ssurgoFld, aggregationMethod, keys):
+    ''' Returns the previous version of a compileSQLquery template, before its set-based rewrite, or None if the
+    template has not been rewritten.'''
+    if aggregationMethod == 'coecoclass':
+        return "SELECT areasymbol, mapunit.mukey, musym, SUM(comppct_r) as sumofcomppct_r, " + ssurgoFld + "\n"\
+        " INTO #domcondition\n"\
+        " FROM legend\n"\
+        " JOIN mapunit on mapunit.lkey = legend.lkey\n"\
+        " AND mapunit.mukey IN (" + keys + ")\n"\
+        " JOIN component on component.mukey = mapunit.mukey\n"\
+        " LEFT OUTER JOIN coecoclass ON component.cokey = coecoclass.cokey\n"\
+        " AND ecoclasstypename LIKE 'NRCS%'\n"\
+        " GROUP BY  areasymbol, mapunit.mukey, musym, " + ssurgoFld + "\n"\
+        " order by areasymbol, musym, mapunit.mukey\n"\
+        " SELECT areasymbol, mukey, musym, max(sumofcomppct_r) as maxsumofcomppct_R\n"\
+        " INTO #domcondition2\n"\
+        " from #domcondition\n"\
+        " GROUP BY areasymbol,mukey, musym\n"\
+        " SELECT #domcondition.areasymbol, #domcondition.mukey, #domcondition.musym, #domcondition." + ssurgoFld + "\n"\
+        " FROM #domcondition\n"\
+        " JOIN #domcondition2 on #domcondition2.maxsumofcomppct_R = #domcondition.sumofcomppct_r AND #domcondition.mukey = #domcondition2.mukey\n"\
+        " order by  #domcondition.areasymbol,#domcondition.musym, #domcondition.mukey\n"
+
+    if aggregationMethod == 'By Component':
+        counts = [("", "comp_count"),
+                  (" AND majcompflag = 'Yes'", "count_maj_comp"),
+                  (" AND hydricrating = 'Yes'", "all_hydric"),
+                  (" AND majcompflag = 'Yes' AND hydricrating = 'Yes'", "maj_hydric"),
+                  (" AND majcompflag = 'Yes' AND hydricrating != 'Yes'", "maj_not_hydric"),
+                  (" AND majcompflag != 'Yes' AND hydricrating  = 'Yes'", "hydric_inclusions"),
+                  (" AND hydricrating  != 'Yes'", "all_not_hydric"),
+                  (" AND hydricrating  IS NULL", "hydric_null")]
+        return "SELECT areasymbol, musym, muname, mu.mukey/1  AS mukey,\n" +\
+        ",\n".join(" (SELECT TOP 1 COUNT_BIG(*)\n"
+                   " FROM mapunit\n"
+                   " INNER JOIN component ON component.mukey=mapunit.mukey AND mapunit.mukey = mu.mukey" + condition + ") AS " + name
+                   for condition, name in counts) + "\n"\
+        " INTO #main_query\n"\
+        " FROM legend AS l\n"\
+        " INNER JOIN  mapunit AS mu ON mu.lkey = l.lkey AND mu.mukey IN (" + keys + ")\n"\
+        " SELECT  areasymbol, musym, muname, mukey,\n"\
+        " CASE WHEN comp_count = all_not_hydric + hydric_null THEN  'Nonhydric'\n"\
+        " WHEN comp_count = all_hydric  THEN 'Hydric'\n"\
+        " WHEN comp_count != all_hydric AND count_maj_comp = maj_hydric THEN 'Predominantly Hydric'\n"\
+        " WHEN hydric_inclusions >= 0.5 AND  maj_hydric < 0.5 THEN  'Predominantly Nonydric'\n"\
+        " WHEN maj_not_hydric >= 0.5  AND  maj_hydric >= 0.5 THEN 'Partially Hydric' ELSE 'Error' END AS hydric_rating\n"\
+        " FROM #main_query\n"
+
+    return None
+
+
+_select = compileRegex(r'\bSELECT\b', IGNORECASE)
+_top = compileRegex(r'\bSELECT\s+TOP\s+(\d+)\b', IGNORECASE)
+_into = compileRegex(r'\bINTO\s+(\w+)\s*', IGNORECASE)
+_cast = compileRegex(r'\bCAST\s*\(', IGNORECASE)
+_decimalType = compileRegex(r'\s+AS\s+decimal\s*\(\s*\d+\s*,\s*(\d+)\s*\)\s*$', IGNORECASE)
+
+
+def _depths(sqlQuery):
+    ''' Returns the parenthesis depth of every character of a query, with -1 inside string literals.'''
+    depths = []
+    depth = 0
+    quoted = False
+    for char in sqlQuery:
+        if char == "'":
+            quoted = not quoted
+            depths.append(-1)
+            continue
+        if quoted:
+            depths.append(-1)
+            continue
+        if char == '(':
+            depth += 1
+        depths.append(depth)
+        if char == ')':
+            depth -= 1
+    return depths
+
+
+def _limitTop(statement):
+    ''' Moves each SELECT TOP n to a LIMIT n at the end of its SELECT, innermost last.'''
+    while True:
+        match = _top.search(statement)
+        if not match:
+            return statement
+        depths = _depths(statement)
+        depth = depths[match.start()]
+        end = len(statement)
+        if depth:
+            end = next(i for i in range(match.end(), len(statement)) if statement[i] == ')' and depths[i] == depth)
+        statement = statement[:match.start()] + 'SELECT' + statement[match.end():end] + f' LIMIT {match.group(1)}' + statement[end:]
+
+
+def _roundDecimals(sqlQuery):
+    ''' Replaces each CAST (x AS decimal (p,s)) with ROUND(CAST(x AS REAL), s), which rounds to the scale the way SQL
+    Server does. Inner casts are replaced first.'''
+    for match in reversed(list(_cast.finditer(sqlQuery))):
+        depths = _depths(sqlQuery)
+        opening = match.end() - 1
+        closing = next(i for i in range(match.end(), len(sqlQuery)) if sqlQuery[i] == ')' and depths[i] == depths[opening])
+        inner = sqlQuery[match.end():closing]
+        decimalType = _decimalType.search(inner)
+        if decimalType:
+            sqlQuery = sqlQuery[:match.start()] + f'ROUND(CAST({inner[:decimalType.start()]} AS REAL), {decimalType.group(1)})' + sqlQuery[closing + 1:]
+    return sqlQuery
+
+
+def translateQuery(sqlQuery):
+    ''' Translates an SDA (T-SQL) query of compileSQLquery into a list of SQLite statements. Every top level SELECT
+    starts a new statement, SELECT ... INTO #temp becomes CREATE TEMP TABLE, TOP n becomes LIMIT n and casts to
+    decimal are rounded to their scale.'''
+    sqlQuery = sub(r'#(\w+)', r'tmp_\1', sqlQuery)
+    sqlQuery = sub(r'\bCOUNT_BIG\b', 'COUNT', sqlQuery, flags=IGNORECASE)
+    sqlQuery = sub(r'\bISNULL\s*\(', 'IFNULL(', sqlQuery, flags=IGNORECASE)
+    sqlQuery = _roundDecimals(sqlQuery)
+    sqlQuery = sub(r'\bdecimal\s*\(\s*\d+\s*,\s*\d+\s*\)', 'REAL', sqlQuery, flags=IGNORECASE)
+
+    depths = _depths(sqlQuery)
+    starts = [match.start() for match in _select.finditer(sqlQuery) if depths[match.start()] == 0]
+    statements = []
+    for start, end in zip(starts, starts[1:] + [len(sqlQuery)]):
+        statement = sqlQuery[start:end].strip()
+        statementDepths = _depths(statement)
+        into = next((match for match in _into.finditer(statement) if statementDepths[match.start()] == 0), None)
+        if into:
+            statement = f'CREATE TEMP TABLE {into.group(1)} AS ' + statement[:into.start()] + statement[into.end():]
+        statements.append(_limitTop(statement))
+    return statements
+
+
+def runQuery(conn, sqlQuery):
+    ''' Runs a translated query and returns the column names and rows of its last statement and the elapsed seconds.
+    Temp tables made by the query are dropped afterwards.'''
+    statements = translateQuery(sqlQuery)
+    start = perf_counter()
+    for statement in statements[:-1]:
+        conn.execute(statement)
+    cursor = conn.execute(statements[-1])
+    rows = cursor.fetchall()
+    elapsed = perf_counter() - start
+
+    for (table,) in conn.execute("SELECT name FROM sqlite_temp_master WHERE type = 'table'").fetchall():
+        conn.execute(f'DROP TABLE {table}')
+    return [column[0].lower() for column in cursor.description], rows, elapsed
+
+
+def _bestRun(conn, sqlQuery, repeat):
+    runs = [runQuery(conn, sqlQuery) for run in range(repeat)]
+    columns, rows, elapsed = runs[0]
+    return columns, rows, min(run[2] for run in runs)
+
+
+def sameResults(first, second):
+    ''' Returns True if two (columns, rows) results have the same columns and the same rows in any order.'''
+    return first[0] == second[0] and sorted(map(repr, first[1])) == sorted(map(repr, second[1]))
+
+
+def benchmark(mapunits=200, repeat=3, seed=1):
+    ''' Compiles, runs and times every sample template against a sample database. Returns a list of
+    (property, aggregation method, row count, best seconds, legacy best seconds or None, results equal or None);
+    a template that fails to compile or run has a row count of None.'''
+    for name, value in templateSettings.items():
+        if not hasattr(ssurgo, name):
+            setattr(ssurgo, name, value)
+
+    conn = createSampleDatabase(mapunits, seed)
+    mukeyList = [str(row[0]) for row in conn.execute('SELECT mukey FROM mapunit')]
+    keys = ",".join(mukeyList)
+
+    results = []
+    for soilProperty, aggregationMethod, table in sampleTemplates:
+        sqlQuery = ssurgo.compileSQLquery(soilProperty, aggregationMethod, mukeyList)
+        if not sqlQuery:
+            results.append((soilProperty, aggregationMethod, None, None, None, None))
+            continue
+        try:
+            columns, rows, elapsed = _bestRun(conn, sqlQuery, repeat)
+        except Exception as e:
+            print(f'{soilProperty} - {aggregationMethod} failed: {e}')
+            results.append((soilProperty, aggregationMethod, None, None, None, None))
+            continue
+
+        legacyElapsed = equal = None
+        oldQuery = legacyQuery(ssurgo.lookupSSURGOFieldName(soilProperty).strip(), aggregationMethod, keys)
+        if oldQuery:
+            legacyColumns, legacyRows, legacyElapsed = _bestRun(conn, oldQuery, repeat)
+            equal = sameResults((columns, rows), (legacyColumns, legacyRows))
+        results.append((soilProperty, aggregationMethod, len(rows), elapsed, legacyElapsed, equal))
+
+    conn.close()
+    return results
+
+
+if __name__ == '__main__':
+
+    parser = ArgumentParser(description='Time the SDA query templates of getSSURGO_WCT_ArcGISpro against a sample SQLite database')
+    parser.add_argument('--mapunits', type=int, default=200, help='number of sample mapunits')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per query; the best time is reported')
+    parser.add_argument('--seed', type=int, default=1, help='random seed of the sample data')
+    args = parser.parse_args()
+
+    results = benchmark(args.mapunits, args.repeat, args.seed)
+    print(f"{'Template':<60}{'Rows':>8}{'ms':>10}{'Legacy ms':>12}  Equal")
+    for soilProperty, aggregationMethod, rowCount, elapsed, legacyElapsed, equal in results:
+        template = f'{soilProperty} - {aggregationMethod}'
+        if rowCount is None:
+            print(f'{template:<60}{"failed":>8}')
+            continue
+        legacy = f'{legacyElapsed * 1000:12.1f}' if legacyElapsed is not None else f'{"":>12}'
+        print(f'{template:<60}{rowCount:>8}{elapsed * 1000:10.1f}{legacy}  {"" if equal is None else equal}')
+
+    if any(result[5] is False for result in results):
+        raise SystemExit('Rewritten templates returned different results than their legacy versions')